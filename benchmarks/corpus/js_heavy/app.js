@@ -0,0 +1,49 @@
+// Single page app shell: navigation and content are rendered client side after a delay,
+// like a typical framework app hydrating from an API.
+(function () {
+  var routes = {
+    "/": {
+      title: "Sakura Ramen Bar",
+      body: "<p>Handmade noodles and broth simmered for 18 hours. Open daily from 11:30.</p>"
+    },
+    "/menu.html": {
+      title: "Menu",
+      items: [
+        ["Tonkotsu Ramen", "pork broth, chashu, ajitama, nori", "24.50"],
+        ["Shoyu Ramen", "soy chicken broth, bamboo shoots, spring onion", "22.00"],
+        ["Miso Ramen", "red miso, corn, butter, bean sprouts", "23.50"],
+        ["Gyoza (6 pcs)", "pan fried pork dumplings", "11.00"],
+        ["Edamame", "sea salt", "7.50"]
+      ]
+    },
+    "/drinks.html": {
+      title: "Drinks",
+      items: [
+        ["Asahi Super Dry", "0.33 l", "6.50"],
+        ["Sake (warm or cold)", "1 dl", "9.00"],
+        ["Matcha Lemonade", "homemade", "6.00"],
+        ["Genmaicha", "roasted rice green tea", "5.00"]
+      ]
+    }
+  };
+
+  function render() {
+    var route = routes[location.pathname] || routes["/"];
+    var html = "<nav>" +
+      '<span data-href="/">Home</span> ' +
+      '<span role="link" href="/menu.html">Menu</span> ' +
+      "<a href=\"#\" onclick=\"window.location.href='/drinks.html'; return false;\">Drinks</a> " +
+      '<a href="/jobs.html">Jobs</a>' +
+      "</nav><h1>" + route.title + "</h1>";
+    if (route.items) {
+      html += "<table>" + route.items.map(function (it) {
+        return "<tr><td>" + it[0] + "</td><td>" + it[1] + "</td><td>CHF " + it[2] + "</td></tr>";
+      }).join("") + "</table>";
+    } else {
+      html += route.body;
+    }
+    document.getElementById("app").innerHTML = html;
+  }
+
+  setTimeout(render, 300);
+})();
@@ -0,0 +1,178 @@
+"""
+Offline crawl benchmark: runs SiteCrawler against the recorded corpus served locally and
+reports throughput, navigations and LLM calls per site, wall time per stage and peak RSS
+as JSON that can be compared across commits.
+
+    python -m benchmarks.crawl_bench --out bench_output.json
+    python -m benchmarks.crawl_bench --out new.json --compare bench_output.json
+
+The LLM endpoint is taken from OPENAI_API_BASE as usual; --stub-llm starts the deterministic
+stub from benchmarks/stub_llm.py in-process instead, so runs are comparable across machines.
+"""
+from __future__ import annotations
+import argparse, json, os, subprocess, sys, time, urllib.parse
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .fixture_server import CORPUS_DIR, FixtureServer, list_sites
+from .stub_llm import StubConfig, StubLLMServer
+
+def _peak_rss_kb() -> Dict[str, Optional[int]]:
+    if resource is None:
+        return {"self": None, "children": None}
+    scale = 1024 if sys.platform == "darwin" else 1  # macOS reports bytes
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def _recall(site_dir: str, server_url: str, found: List[str]) -> Optional[float]:
+    path = os.path.join(site_dir, "expected.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        expected = json.load(f)["menus"]
+    found_paths = {urllib.parse.urlparse(link).path for link in found}
+    return sum(1 for p in expected if p in found_paths) / len(expected) if expected else None
+
+def run_site(site: str, menutypes: Dict[str, str], corpus_dir: str, delay_ms: float,
+             linear_pdfs: bool = False) -> Dict[str, Any]:
+    from src.agent import AgentBase
+    from src.crawler import SiteCrawler
+
+    site_dir = os.path.join(corpus_dir, site)
+    with FixtureServer(site_dir, delay_ms=delay_ms, linear_pdfs=linear_pdfs) as server:
+        calls_before = AgentBase.llm_call_counts()
+        started = time.perf_counter()
+        crawler = SiteCrawler(site, server.url, menutypes)
+        crawler.crawl_site()
+        wall = time.perf_counter() - started
+        calls_after = AgentBase.llm_call_counts()
+        menus = [item.link for item in crawler.menu_items]
+        http_requests = sum(server.requests.values())
+
+    llm_calls = {name: calls_after.get(name, 0) - calls_before.get(name, 0) for name in calls_after}
+    pages = crawler.stats["pages"]
+    return {
+        "wall_seconds": round(wall, 4),
+        "pages": pages,
+        "pages_per_second": round(pages / wall, 4) if wall else None,
+        "navigations": crawler.stats["navigations"],
+        "http_requests": http_requests,
+        "bytes_served": server.bytes_sent,
+        "llm_calls": llm_calls,
+        "llm_calls_total": sum(llm_calls.values()),
+        "stage_seconds": {k: round(v, 4) for k, v in sorted(crawler.stats["stage_seconds"].items())},
+        "stages": crawler.timings.summary() if crawler.timings is not None else {},
+        "waits": crawler.stats["waits"],
+        "sitemap": crawler.stats["sitemap"],
+        "pdf": crawler.stats["pdf"],
+        "images": crawler.stats["images"],
+        "menu_batches": crawler.stats["menu_batches"],
+        "prefetch": crawler.stats["prefetch"],
+        "capture": crawler.stats["capture"],
+        "memory": dict(crawler.stats["memory"], pages_recycled=crawler.stats["pages_recycled"],
+                       contexts_recycled=crawler.stats["contexts_recycled"]),
+        "menus_found": len(menus),
+        "menu_recall": _recall(site_dir, server.url, menus),
+        "cookie_banner_accept": crawler.cookie_accept,
+    }
+
+def summarize(sites: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    wall = sum(s["wall_seconds"] for s in sites.values())
+    pages = sum(s["pages"] for s in sites.values())
+    n = max(1, len(sites))
+    stages: Dict[str, float] = {}
+    for s in sites.values():
+        for stage, seconds in s["stage_seconds"].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+    return {
+        "sites": len(sites),
+        "wall_seconds": round(wall, 4),
+        "pages": pages,
+        "pages_per_second": round(pages / wall, 4) if wall else None,
+        "navigations_per_site": round(sum(s["navigations"] for s in sites.values()) / n, 2),
+        "llm_calls_per_site": round(sum(s["llm_calls_total"] for s in sites.values()) / n, 2),
+        "stage_seconds": {k: round(v, 4) for k, v in sorted(stages.items())},
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human readable deltas of the run totals against a previous report."""
+    lines = [f"baseline {baseline.get('commit')} -> current {current.get('commit')}"]
+    cur, base = current["totals"], baseline["totals"]
+    for key in ("wall_seconds", "pages_per_second", "navigations_per_site", "llm_calls_per_site"):
+        a, b = base.get(key), cur.get(key)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a:
+            lines.append(f"  {key:<22} {a:>10} -> {b:>10} ({(b - a) / a * 100:+.1f}%)")
+    for stage in sorted(set(cur["stage_seconds"]) | set(base["stage_seconds"])):
+        a, b = base["stage_seconds"].get(stage, 0.0), cur["stage_seconds"].get(stage, 0.0)
+        lines.append(f"  stage {stage:<16} {a:>10} -> {b:>10}")
+    return lines
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Offline crawl benchmark against the recorded corpus")
+    ap.add_argument("--corpus", default=CORPUS_DIR)
+    ap.add_argument("--sites", default=None, help="comma separated subset of corpus sites")
+    ap.add_argument("--types", default="input/menutypes.json")
+    ap.add_argument("--delay-ms", type=float, default=0, help="artificial server latency per request")
+    ap.add_argument("--linear-pdfs", action="store_true", help="serve linearized PDFs")
+    ap.add_argument("--out", default="bench_output.json")
+    ap.add_argument("--compare", default=None, help="previous report to diff against")
+    ap.add_argument("--stub-llm", action="store_true", help="answer classifier calls from the in-process stub LLM")
+    ap.add_argument("--stub-latency-ms", type=float, default=0)
+    ap.add_argument("--stub-jitter-ms", type=float, default=0)
+    ap.add_argument("--stub-error-rate", type=float, default=0)
+    ap.add_argument("--stub-tokens-per-second", type=float, default=0)
+    ap.add_argument("--llm-budget", type=float, default=None, help="fail if LLM calls per site exceed this")
+    args = ap.parse_args(argv)
+
+    with open(args.types, "r", encoding="utf-8") as f:
+        menutypes = json.load(f)["menus"]
+    sites = args.sites.split(",") if args.sites else list_sites(args.corpus)
+
+    stub = None
+    if args.stub_llm:
+        config = StubConfig(args.stub_latency_ms, args.stub_jitter_ms, args.stub_error_rate, args.stub_tokens_per_second)
+        stub = StubLLMServer(config=config).__enter__()
+        os.environ["OPENAI_API_BASE"] = stub.base_url
+    try:
+        results = {site: run_site(site, menutypes, args.corpus, args.delay_ms, args.linear_pdfs) for site in sites}
+    finally:
+        if stub:
+            stub.__exit__()
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "llm_base": os.getenv("OPENAI_API_BASE", "http://localhost:1234/v1"),
+        "sites": results,
+        "totals": summarize(results),
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+    if stub:
+        report["stub_llm"] = stub.stats()
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report["totals"], indent=2))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print("\n".join(compare(report, json.load(f))))
+
+    per_site = report["totals"]["llm_calls_per_site"]
+    if args.llm_budget is not None and per_site > args.llm_budget:
+        print(f"LLM budget exceeded: {per_site} calls per site > {args.llm_budget}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Local HTTP server for the recorded benchmark corpus.
+
+Every site directory under benchmarks/corpus is served by its own server on 127.0.0.1:<port>,
+so sites are separate origins like real restaurants. PDFs are kept in the corpus as text
+(`name.pdf.txt`, pages separated by form feeds) and rendered to real PDF bytes on first request.
+Byte ranges are supported so ranged/partial PDF fetching can be exercised offline.
+"""
+from __future__ import annotations
+import mimetypes, os, posixpath, re, threading, time, urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def render_pdf(text: str, linear: bool = False) -> bytes:
+    """Render form-feed separated pages of text into a PDF document."""
+    import fitz
+    doc = fitz.open()
+    for page_text in text.split("\f"):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), page_text.strip(), fontsize=11)
+    data = doc.tobytes(garbage=3, deflate=True, linear=linear)
+    doc.close()
+    return data
+
+def list_sites(corpus_dir: str = CORPUS_DIR) -> List[str]:
+    return sorted(
+        name for name in os.listdir(corpus_dir)
+        if os.path.isfile(os.path.join(corpus_dir, name, "index.html"))
+    )
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FixtureServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self) -> Optional[str]:
+        path = urllib.parse.urlparse(self.path).path
+        parts = [p for p in posixpath.normpath(urllib.parse.unquote(path)).split("/") if p not in ("", ".", "..")]
+        full = os.path.join(self.server.site_dir, *parts)
+        if os.path.isdir(full):
+            full = os.path.join(full, "index.html")
+        return full
+
+    def _body(self, full: str) -> Optional[bytes]:
+        if full in self.server.rendered:
+            return self.server.rendered[full]
+        if os.path.isfile(full):
+            with open(full, "rb") as f:
+                return f.read()
+        if full.endswith(".pdf") and os.path.isfile(full + ".txt"):
+            with open(full + ".txt", "r", encoding="utf-8") as f:
+                data = render_pdf(f.read(), linear=self.server.linear_pdfs)
+            self.server.rendered[full] = data
+            return data
+        return None
+
+    def _serve(self, head: bool):
+        self.server.count_request(self.path)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        full = self._resolve()
+        body = self._body(full) if full else None
+        if body is None:
+            body = b"<html><body><h1>404 Not Found</h1></body></html>"
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+            return
+
+        ctype = mimetypes.guess_type(full)[0] or "application/octet-stream"
+        if ctype.startswith("text/") or ctype == "application/javascript":
+            ctype += "; charset=utf-8"
+        start, end, status = 0, len(body) - 1, 200
+        match = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+            else:
+                start = max(0, len(body) - int(match.group(2)))
+            status = 206
+        chunk = body[start:end + 1]
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(chunk)))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        if full.endswith(".pdf"):
+            self.send_header("Content-Disposition", f'inline; filename="{os.path.basename(full)}"')
+        self.end_headers()
+        if not head:
+            self.server.bytes_sent += len(chunk)
+            self.wfile.write(chunk)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+class FixtureServer(ThreadingHTTPServer):
+    """Serves one corpus site on an ephemeral local port. Use as a context manager."""
+    daemon_threads = True
+
+    def __init__(self, site_dir: str, delay_ms: float = 0, linear_pdfs: bool = False):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.site_dir = site_dir
+        self.delay = delay_ms / 1000.0
+        self.linear_pdfs = linear_pdfs
+        self.rendered: Dict[str, bytes] = {}
+        self.requests: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def count_request(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="Serve the benchmark corpus locally")
+    ap.add_argument("--corpus", default=CORPUS_DIR)
+    ap.add_argument("--delay-ms", type=float, default=0)
+    args = ap.parse_args()
+    servers = [FixtureServer(os.path.join(args.corpus, site), args.delay_ms) for site in list_sites(args.corpus)]
+    for site, server in zip(list_sites(args.corpus), servers):
+        server.__enter__()
+        print(f"{site}: {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.__exit__()
+
+if __name__ == "__main__":
+    main()
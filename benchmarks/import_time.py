@@ -0,0 +1,75 @@
+"""
+Import-time budget check for the CLI entry points.
+
+Imports each module in a fresh interpreter with `-X importtime`, reports the cumulative
+import time and the slowest imports, and fails when a module goes over budget or pulls in
+one of the heavy dependencies that must only be imported on first use.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 300 --modules src.main,src.crawler
+"""
+from __future__ import annotations
+import argparse, os, subprocess, sys
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# loaded lazily by the code that needs them, never at import time of the entry points
+HEAVY_MODULES = ("langchain", "langchain_openai", "langchain_core", "openai", "fitz", "langdetect",
+                 "bs4", "requests", "playwright", "tldextract")
+DEFAULT_MODULES = ("src.main", "src.crawler")
+
+def measure(module: str) -> List[Tuple[str, int, int]]:
+    """(imported module, self us, cumulative us) for every import done by `import module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows: List[Tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # children are printed before their parent; a top level entry closes a tree
+        if not name.startswith("  ") and name.strip() != module:
+            rows = []
+            continue
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        if name.strip() == module:
+            break
+    return rows
+
+def check(module: str, budget_ms: float, top: int = 5) -> Dict[str, Any]:
+    rows = measure(module)
+    total_ms = next((cum for name, _, cum in rows if name == module), 0) / 1000
+    heavy = sorted({name for name, _, _ in rows if name.split(".")[0] in HEAVY_MODULES})
+    return {
+        "module": module,
+        "total_ms": round(total_ms, 1),
+        "budget_ms": budget_ms,
+        "heavy_imports": heavy,
+        "slowest": [(name, round(cum / 1000, 1)) for name, _, cum in sorted(rows, key=lambda r: -r[2])[1:top + 1]],
+        "ok": total_ms <= budget_ms and not heavy,
+    }
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Import-time budget check")
+    ap.add_argument("--modules", default=",".join(DEFAULT_MODULES))
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000")))
+    ap.add_argument("--top", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    ok = True
+    for module in args.modules.split(","):
+        result = check(module, args.budget_ms, args.top)
+        ok &= result["ok"]
+        status = "ok" if result["ok"] else "FAIL"
+        print(f"{module}: {result['total_ms']} ms (budget {args.budget_ms} ms) {status}")
+        for name, ms in result["slowest"]:
+            print(f"    {ms:>8} ms  {name}")
+        if result["heavy_imports"]:
+            print(f"    heavy modules imported eagerly: {', '.join(result['heavy_imports'])}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
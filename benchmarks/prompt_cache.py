@@ -0,0 +1,165 @@
+"""
+Prompt cache benchmark: sends menu classifier requests for the corpus pages as they were sent
+before (the previous prompt, menu types, formats and languages inside every user message) and
+in the current layout (static vocabularies at the end of the system message) and reports prompt
+tokens, tokens served from the server's prefix cache and time to first token for each.
+
+    python -m benchmarks.prompt_cache                       # in-process stub with prefill emulation
+    python -m benchmarks.prompt_cache --base-url http://localhost:1234/v1 --model qwen2.5-7b-instruct
+
+Cached tokens are read from usage.prompt_tokens_details (OpenAI, vLLM, the stub) or from
+timings.cache_n (llama.cpp); servers reporting neither show 0.
+"""
+from __future__ import annotations
+import argparse, glob, json, os, sys, time
+from typing import Any, Dict, List, Optional
+
+from src.metrics import _percentile
+from .fixture_server import CORPUS_DIR, list_sites
+from .stub_llm import StubConfig, StubLLMServer
+
+# the classifier prompt and the vocabularies sent with every page before the layout changed
+LEGACY_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "legacy_menu_classifier.txt")
+LEGACY_FORMATS = ["pdf", "viewer", "integrated", "none"]
+LEGACY_LANGS = ["de", "en", "fr", "it"]
+
+def corpus_pages(corpus_dir: str = CORPUS_DIR, max_chars: int = 3500) -> List[Dict[str, str]]:
+    """Site name, site URL, page URL, title and text of every HTML page of the corpus."""
+    from bs4 import BeautifulSoup
+    pages = []
+    for site in list_sites(corpus_dir):
+        site_dir = os.path.join(corpus_dir, site)
+        site_url = f"https://{site}.example/"
+        for path in sorted(glob.glob(os.path.join(site_dir, "**", "*.html"), recursive=True)):
+            with open(path, "r", encoding="utf-8") as f:
+                soup = BeautifulSoup(f.read(), "html.parser")
+            pages.append({
+                "site_name": site,
+                "site_url": site_url,
+                "page_url": site_url + os.path.relpath(path, site_dir).replace(os.sep, "/"),
+                "page_title": soup.title.get_text(strip=True) if soup.title else "",
+                "page_text": " ".join(soup.get_text(" ").split())[:max_chars],
+            })
+    return pages
+
+def legacy_prompt() -> str:
+    with open(LEGACY_PROMPT_PATH, "r", encoding="utf-8") as f:
+        return f.read()
+
+def legacy_messages(prompt: str, menutypes: Dict[str, str], page: Dict[str, str]) -> List[Dict[str, str]]:
+    """The request as sent before the vocabularies moved into the system message, field for field."""
+    user_payload = {
+        "SITE_NAME": page["site_name"],
+        "SITE_URL": page["site_url"],
+        "PAGE_URL": page["page_url"],
+        "PAGE_CONTENT": page["page_text"],
+        "PAGE_TITLE": page["page_title"],
+        "MENU_TYPES": menutypes,
+        "MENU_FORMATS": LEGACY_FORMATS,
+        "LANGS": LEGACY_LANGS,
+        "CONTENT_DISPOSITION": None,
+    }
+    return [{"role": "system", "content": prompt},
+            {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)}]
+
+def prefix_messages(classifier, menutypes: Dict[str, str], page: Dict[str, str]) -> List[Dict[str, str]]:
+    """Request layout of MenuClassifier.messages."""
+    roles = {"system": "system", "human": "user"}
+    msgs = classifier.messages(page["site_name"], page["site_url"], page["page_url"], page["page_text"],
+                               page["page_title"], menutypes)
+    return [{"role": roles[m.type], "content": m.content} for m in msgs]
+
+def _shared_prefix_tokens(previous: Optional[List[Dict[str, str]]], current: List[Dict[str, str]]) -> int:
+    if previous is None:
+        return 0
+    flat = lambda msgs: "".join(f"<{m['role']}>{m['content']}" for m in msgs)
+    return len(os.path.commonprefix([flat(previous), flat(current)])) // 4
+
+def stream_request(session, base_url: str, model: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    """One streamed completion: seconds to the first content chunk and the reported usage."""
+    started = time.perf_counter()
+    ttft, usage = None, {}
+    with session.post(f"{base_url.rstrip('/')}/chat/completions", stream=True, timeout=300, json={
+        "model": model, "messages": messages, "temperature": 0, "stream": True,
+        "stream_options": {"include_usage": True},
+    }) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if ttft is None and any((c.get("delta") or {}).get("content") for c in chunk.get("choices") or []):
+                ttft = time.perf_counter() - started
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            if chunk.get("timings"):
+                usage.setdefault("timings", chunk["timings"])
+    cached = ((usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+              or (usage.get("timings") or {}).get("cache_n") or 0)
+    return {"ttft": ttft if ttft is not None else time.perf_counter() - started,
+            "prompt_tokens": usage.get("prompt_tokens", 0), "cached_tokens": cached}
+
+def measure(base_url: str, model: str, requests_messages: List[List[Dict[str, str]]]) -> Dict[str, Any]:
+    import requests
+    results, previous = [], None
+    with requests.Session() as session:
+        for messages in requests_messages:
+            result = stream_request(session, base_url, model, messages)
+            result["shared_prefix_tokens"] = _shared_prefix_tokens(previous, messages)
+            results.append(result)
+            previous = messages
+    n = max(len(results), 1)
+    ttfts = sorted(r["ttft"] for r in results)
+    return {
+        "requests": len(results),
+        "prompt_tokens": round(sum(r["prompt_tokens"] for r in results) / n, 1),
+        "cached_tokens": round(sum(r["cached_tokens"] for r in results) / n, 1),
+        "shared_prefix_tokens": round(sum(r["shared_prefix_tokens"] for r in results) / n, 1),
+        "ttft_p50_ms": round(_percentile(ttfts, 50) * 1000, 1),
+        "ttft_p95_ms": round(_percentile(ttfts, 95) * 1000, 1),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Prompt tokens, prefix cache hits and TTFT per request layout")
+    ap.add_argument("--corpus", default=CORPUS_DIR)
+    ap.add_argument("--types", default="input/menutypes.json")
+    ap.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint; default: in-process stub")
+    ap.add_argument("--model", default=os.getenv("OPENAI_MODEL", "stub-llm"))
+    ap.add_argument("--prefill-tokens-per-second", type=float, default=500, help="stub prompt processing speed")
+    ap.add_argument("--out", default=None, help="write the report as JSON")
+    args = ap.parse_args(argv)
+
+    with open(args.types, "r", encoding="utf-8") as f:
+        menutypes = json.load(f)["menus"]
+    pages = corpus_pages(args.corpus)
+
+    stub = None
+    base_url = args.base_url
+    if base_url is None:
+        stub = StubLLMServer(config=StubConfig(prefill_tokens_per_second=args.prefill_tokens_per_second)).__enter__()
+        base_url = stub.base_url
+    os.environ.setdefault("OPENAI_API_BASE", base_url)
+    from src.agent import MenuClassifier
+    classifier = MenuClassifier(menutypes)
+    prompt = legacy_prompt()
+    try:
+        report = {
+            "base_url": base_url,
+            "pages": len(pages),
+            "legacy": measure(base_url, args.model, [legacy_messages(prompt, menutypes, p) for p in pages]),
+            "prefix": measure(base_url, args.model, [prefix_messages(classifier, menutypes, p) for p in pages]),
+        }
+    finally:
+        if stub:
+            stub.__exit__()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
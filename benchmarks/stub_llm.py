@@ -0,0 +1,341 @@
+"""
+OpenAI-compatible stub LLM server for deterministic benchmarks and load tests.
+
+Speaks the /v1/chat/completions API used by ChatOpenAI (plain and streaming) and answers the
+menu_classifier and small_noise_classifier prompts from scripted keyword rules, or from
+recorded fixtures when a request matches one exactly. Latency, jitter, error rate and a
+shared token-throughput budget can be injected; every request is counted so benchmarks can
+assert exact call budgets.
+
+    python -m benchmarks.stub_llm --port 1235 --latency-ms 200 --jitter-ms 50 --tokens-per-second 60
+    OPENAI_API_BASE=http://127.0.0.1:1235/v1 python -m src.main
+
+    # record real answers once, replay them offline afterwards
+    python -m benchmarks.stub_llm --upstream http://localhost:1234/v1 --record fixtures.jsonl
+    python -m benchmarks.stub_llm --fixtures fixtures.jsonl
+"""
+from __future__ import annotations
+import argparse, hashlib, json, math, os, random, re, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts")
+
+PRICE = re.compile(r"\b\d{1,3}[.,]\d{2}\b")
+MENU_WORDS = ("menu", "karte", "speise", "carta", "carte", "drink", "wein", "wine", "vini", "getränke",
+              "lunch", "mittag", "dinner", "abend", "brunch", "dessert", "restaurant", "food", "essen")
+TYPE_RULES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("oct_wine", ("weinkarte", "wine", "vini", "vins", "rotwein", "weisswein")),
+    ("oct_drink", ("drinks", "getränke", "bier", "beer", "cocktail", "sake", "lemonade")),
+    ("oct_lunch", ("mittag", "lunch", "pranzo")),
+    ("oct_dessert", ("dessert", "dolci", "süss")),
+    ("oct_brunch", ("brunch",)),
+    ("oct_breakfast", ("frühstück", "breakfast")),
+]
+
+def count_tokens(text: str) -> int:
+    """Deterministic ~4 chars/token estimate, close enough for budgets and throughput."""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+def messages_key(messages: List[Dict[str, Any]]) -> str:
+    canonical = json.dumps([(m.get("role"), m.get("content")) for m in messages], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _load_prompt_prefix(name: str) -> str:
+    try:
+        with open(os.path.join(PROMPTS_DIR, name), "r", encoding="utf-8") as f:
+            return f.read()[:200]
+    except OSError:
+        return ""
+
+class ScriptedRules:
+    """Keyword rules standing in for the classifier model."""
+    def __init__(self):
+        self.noise_prefix = _load_prompt_prefix("small_noise_classifier.txt")
+        self.menu_prefix = _load_prompt_prefix("menu_classifier.txt")
+
+    def kind(self, messages: List[Dict[str, Any]]) -> str:
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        if self.noise_prefix and system.startswith(self.noise_prefix):
+            return "noise"
+        if self.menu_prefix and system.startswith(self.menu_prefix):
+            return "menu"
+        return "unknown"
+
+    def answer(self, kind: str, messages: List[Dict[str, Any]]) -> str:
+        user = messages[-1].get("content") or "" if messages else ""
+        try:
+            payload = json.loads(user)
+        except ValueError:
+            payload = {}
+        if kind == "noise":
+            return json.dumps({"links": [self._noise(link) for link in payload.get("links", [])]})
+        if kind == "menu" and "PAGES" in payload:
+            return json.dumps({"pages": [{"page_id": page.get("PAGE_ID"), "menus": self._menus(page)}
+                                         for page in payload["PAGES"]]})
+        if kind == "menu":
+            return json.dumps({"menus": self._menus(payload)})
+        return "{}"
+
+    def _noise(self, link: Dict[str, Any]) -> Dict[str, Any]:
+        haystack = f"{link.get('url', '')} {link.get('text', '')}".lower()
+        return {"url": link.get("url"), "confidence": 0.1 if any(w in haystack for w in MENU_WORDS) else 0.9}
+
+    def _menus(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        text = str(payload.get("PAGE_CONTENT") or "")
+        low = text.lower()
+        prices = len(PRICE.findall(text))
+        if prices < 3:
+            return []
+        type_code = next((code for code, words in TYPE_RULES if any(w in low for w in words)), "oct_menu")
+        page_url = str(payload.get("PAGE_URL") or "").lower()
+        fmt = "pdf" if page_url.endswith(".pdf") else "image" if page_url.endswith((".png", ".jpg", ".jpeg", ".webp")) else "integrated"
+        confidence = min(0.95, 0.6 + 0.05 * prices)
+        return [{"type_code": type_code, "format": fmt,
+                 "reason": f"{prices} prices found", "confidence": round(confidence, 2)}]
+
+class StubConfig:
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 tokens_per_second: float = 0, seed: int = 0, model: str = "stub-llm",
+                 prefill_tokens_per_second: float = 0, prefix_cache_size: int = 16):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        # prompt processing speed for tokens not covered by the prefix cache, 0 = instant
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.prefix_cache_size = prefix_cache_size
+        self.seed = seed
+        self.model = model
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubLLMServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._json(200, {"object": "list", "data": [{"id": self.server.config.model, "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._json(200, self.server.stats())
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/").endswith("/stats/reset"):
+            self.server.reset_stats()
+            self._json(200, {"ok": True})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        self.server.handle_completion(self, request)
+
+class StubLLMServer(ThreadingHTTPServer):
+    """In-process stub endpoint. Use as a context manager; `base_url` goes into OPENAI_API_BASE."""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, config: Optional[StubConfig] = None, fixtures: Optional[str] = None,
+                 upstream: Optional[str] = None, record: Optional[str] = None, log_path: Optional[str] = None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.config = config or StubConfig()
+        self.rules = ScriptedRules()
+        self.fixtures: Dict[str, str] = {}
+        if fixtures:
+            with open(fixtures, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.fixtures[entry["key"]] = entry["content"]
+        self.upstream = upstream
+        self.record_path = record
+        self.log_path = log_path
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        # shared generation timeline: emulates one model instance serving all clients
+        self._busy_until = 0.0
+        # recently processed prompts, like the KV/prompt cache of llama.cpp or vLLM
+        self._prompt_cache: List[str] = []
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats: Dict[str, Dict[str, int]] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_kind = {k: dict(v) for k, v in self._stats.items()}
+        totals: Dict[str, int] = {}
+        for counters in per_kind.values():
+            for key, value in counters.items():
+                totals[key] = totals.get(key, 0) + value
+        return {"by_kind": per_kind, "totals": totals}
+
+    def _count(self, kind: str, **counters: int):
+        with self._lock:
+            bucket = self._stats.setdefault(kind, {"requests": 0, "errors": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0,
+                                                   "completion_tokens": 0})
+            for key, value in counters.items():
+                bucket[key] = bucket.get(key, 0) + value
+
+    def _log(self, entry: Dict[str, Any]):
+        if not self.log_path:
+            return
+        with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _draw(self) -> Tuple[float, bool]:
+        with self._lock:
+            delay = self.config.latency + (self._rng.uniform(-self.config.jitter, self.config.jitter) if self.config.jitter else 0.0)
+            fail = self._rng.random() < self.config.error_rate if self.config.error_rate else False
+        return max(0.0, delay), fail
+
+    def _generation_delay(self, completion_tokens: int) -> float:
+        """Reserve completion time on the shared timeline, returns how long this request must wait."""
+        if not self.config.tokens_per_second:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._busy_until)
+            self._busy_until = start + completion_tokens / self.config.tokens_per_second
+            return self._busy_until - now
+
+    def _cached_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Prompt tokens covered by the longest common prefix with a recently processed prompt."""
+        prompt = "".join(f"<{m.get('role')}>{m.get('content') or ''}" for m in messages)
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, cached])) for cached in self._prompt_cache), default=0)
+            self._prompt_cache = ([prompt] + [p for p in self._prompt_cache if p != prompt])[:self.config.prefix_cache_size]
+        return shared // 4
+
+    def _content_for(self, kind: str, request: Dict[str, Any]) -> Tuple[str, str]:
+        messages = request.get("messages", [])
+        key = messages_key(messages)
+        if key in self.fixtures:
+            return self.fixtures[key], "fixture"
+        if self.upstream:
+            import requests
+            upstream = dict(request, stream=False)
+            resp = requests.post(self.upstream.rstrip("/") + "/chat/completions", json=upstream, timeout=600)
+            resp.raise_for_status()
+            content = resp.json()["choices"][0]["message"]["content"] or ""
+            if self.record_path:
+                with self._lock, open(self.record_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "kind": kind, "content": content}, ensure_ascii=False) + "\n")
+                self.fixtures[key] = content
+            return content, "upstream"
+        return self.rules.answer(kind, messages), "rules"
+
+    def handle_completion(self, handler: _Handler, request: Dict[str, Any]):
+        started = time.monotonic()
+        messages = request.get("messages", [])
+        kind = self.rules.kind(messages)
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+        cached_tokens = min(prompt_tokens, self._cached_tokens(messages))
+        delay, fail = self._draw()
+        if self.config.prefill_tokens_per_second:
+            delay += (prompt_tokens - cached_tokens) / self.config.prefill_tokens_per_second
+        time.sleep(delay)
+        if fail:
+            self._count(kind, requests=1, errors=1, prompt_tokens=prompt_tokens)
+            self._log({"kind": kind, "status": 500, "prompt_tokens": prompt_tokens, "seconds": round(time.monotonic() - started, 4)})
+            handler._json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+
+        content, source = self._content_for(kind, request)
+        completion_tokens = count_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens,
+                 "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        self._count(kind, requests=1, prompt_tokens=prompt_tokens, cached_prompt_tokens=cached_tokens,
+                    completion_tokens=completion_tokens)
+        ident = f"chatcmpl-stub-{messages_key(messages)[:12]}"
+
+        if request.get("stream"):
+            self._stream(handler, ident, content, completion_tokens, usage)
+        else:
+            time.sleep(self._generation_delay(completion_tokens))
+            handler._json(200, {
+                "id": ident, "object": "chat.completion", "created": int(time.time()), "model": self.config.model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        self._log({"kind": kind, "status": 200, "source": source, "seconds": round(time.monotonic() - started, 4), **usage})
+
+    def _stream(self, handler: _Handler, ident: str, content: str, completion_tokens: int, usage: Dict[str, int]):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        total_delay = self._generation_delay(completion_tokens)
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+        base = {"id": ident, "object": "chat.completion.chunk", "created": int(time.time()), "model": self.config.model}
+
+        def send(chunk: Dict[str, Any]):
+            handler.wfile.write(f"data: {json.dumps(dict(base, **chunk))}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        send({"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+        for piece in pieces:
+            time.sleep(total_delay / len(pieces))
+            send({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        send({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage})
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+    def __enter__(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="OpenAI-compatible stub LLM for deterministic benchmarks")
+    ap.add_argument("--port", type=int, default=1235)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with HTTP 500")
+    ap.add_argument("--tokens-per-second", type=float, default=0, help="shared completion throughput, 0 = unlimited")
+    ap.add_argument("--prefill-tokens-per-second", type=float, default=0,
+                    help="prompt processing speed for tokens outside the emulated prefix cache, 0 = instant")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--fixtures", default=None, help="recorded answers (JSONL) served for exact request matches")
+    ap.add_argument("--upstream", default=None, help="forward unmatched requests to a real endpoint")
+    ap.add_argument("--record", default=None, help="append upstream answers to this fixtures file")
+    ap.add_argument("--log", default=None, help="JSONL request log (kind, status, tokens, seconds)")
+    args = ap.parse_args(argv)
+
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.tokens_per_second, args.seed,
+                        prefill_tokens_per_second=args.prefill_tokens_per_second)
+    server = StubLLMServer(args.port, config, args.fixtures, args.upstream, args.record, args.log)
+    print(f"Stub LLM listening on {server.base_url} (stats: GET {server.base_url}/stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
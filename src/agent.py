@@ -1,31 +1,88 @@
 from __future__ import annotations
-import json, os
-from typing import Dict, List, Tuple, Optional
+import hashlib, json, os, threading
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Optional
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
-from .utils import de_duplicate
+from .metrics import span
+from .language_id import detect_languages
 from .models import PageRecord, LinkInfo, MenuItem
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 class AgentBase:
+    # process-wide LLM round trip counters, per classifier class name (read by benchmarks)
+    _call_counts: Dict[str, int] = {}
+    _call_counts_lock = threading.Lock()
+    # name of the timing span around each LLM round trip
+    span_name = "llm"
+    # one chat client per endpoint and one copy of each prompt, shared by every classifier
+    # instance and thread (MenuClassifier is created per page)
+    _llm_clients: Dict[Tuple[str, str, str], "ChatOpenAI"] = {}
+    _prompts: Dict[str, str] = {}
+    _shared_lock = threading.Lock()
+
     def __init__(self):
         self.llm: ChatOpenAI = self._get_llm()
         self._prompt_path: str = ""
 
-    def _load_prompt(self) -> str:
+    def _load_prompt(self, path: Optional[str] = None) -> str:
+        path = path or self._prompt_path
+        prompt = AgentBase._prompts.get(path)
+        if prompt is not None:
+            return prompt
         try:
-            with open(self._prompt_path, "r", encoding="utf-8") as f:
-                return f.read()
+            with open(path, "r", encoding="utf-8") as f:
+                prompt = f.read()
+            with AgentBase._shared_lock:
+                AgentBase._prompts[path] = prompt
+            return prompt
         except Exception as e:
-            print(f"Error: Failed to load prompt from {self._prompt_path}: {e}")
+            print(f"Error: Failed to load prompt from {path}: {e}")
             raise e
 
+    @classmethod
+    def llm_call_counts(cls) -> Dict[str, int]:
+        with AgentBase._call_counts_lock:
+            return dict(AgentBase._call_counts)
+
+    def _invoke(self, msgs):
+        with AgentBase._call_counts_lock:
+            name = type(self).__name__
+            AgentBase._call_counts[name] = AgentBase._call_counts.get(name, 0) + 1
+        with span(self.span_name):
+            return self.llm.invoke(msgs)
+
+    def _system(self, vocabulary: Optional[Dict[str, Any]] = None) -> str:
+        """
+        The prompt followed by the static vocabularies (one canonical JSON line each). It is
+        byte-identical from call to call, so llama.cpp, LM Studio or vLLM can reuse the cached
+        prefix and only process the page data of each request.
+        """
+        if not vocabulary:
+            return self.prompt
+        lines = [f"{name}: {json.dumps(value, ensure_ascii=False, sort_keys=True)}" for name, value in vocabulary.items()]
+        return self.prompt.rstrip() + "\n\n" + "\n".join(lines) + "\n"
+
+    def _messages(self, user_payload: Dict[str, Any], vocabulary: Optional[Dict[str, Any]] = None) -> list:
+        # langchain is imported on first use, it is the slowest import of the package
+        from langchain.schema import HumanMessage, SystemMessage
+        return [
+            SystemMessage(content=self._system(vocabulary)),
+            HumanMessage(content=json.dumps(user_payload, ensure_ascii=False))
+        ]
+
     def _get_llm(self) -> ChatOpenAI:
+        from langchain_openai import ChatOpenAI
         load_dotenv()
         base = os.getenv("OPENAI_API_BASE", "http://localhost:1234/v1")
         key = os.getenv("OPENAI_API_KEY", "sk-noauth")
         model = os.getenv("OPENAI_MODEL", "gpt-oss-20b")
-        return ChatOpenAI(model=model, temperature=0.2, base_url=base, api_key=key)
+        with AgentBase._shared_lock:
+            llm = AgentBase._llm_clients.get((base, key, model))
+            if llm is None:
+                llm = ChatOpenAI(model=model, temperature=0.2, base_url=base, api_key=key)
+                AgentBase._llm_clients[(base, key, model)] = llm
+        return llm
 
 class NoiseClassifier(AgentBase):
     """
@@ -33,6 +90,8 @@ class NoiseClassifier(AgentBase):
     The call is lightweight, we are going to use a small classifer model (re)trained on existing data.
     Here we substitute the classifier model with a prompt.
     """
+    span_name = "noise_classifier_batch"
+
     def __init__(self):
         super().__init__()
         self._prompt_path = "prompts/small_noise_classifier.txt"
@@ -61,12 +120,9 @@ class NoiseClassifier(AgentBase):
                     "links": links_data
                 }
 
-                msgs = [
-                    SystemMessage(content=self.prompt),
-                    HumanMessage(content=json.dumps(user_payload, ensure_ascii=False))
-                ]
+                msgs = self._messages(user_payload)
 
-                resp = self.llm.invoke(msgs)
+                resp = self._invoke(msgs)
                 raw = resp.content or "{}"
                 
                 data = json.loads(raw)
@@ -80,34 +136,78 @@ class NoiseClassifier(AgentBase):
                         
                         # Only include links that are not noise or have low confidence for noise classification
                         if confidence <= self.NOISE_CONFIDENCE_THRESHOLD:
-                            result_links.append(LinkInfo(
-                                url=original_link.url,
-                                text=original_link.text
-                            ))
+                            result_links.append(original_link)
                                                         
             except Exception as e:
                 print(f"Error processing batch {i//batch_size + 1}: {type(e).__name__}: {str(e)}")
                 # If there's an error processing a batch, include all links in the batch by default
-                for link in batch:
-                    result_links.append(LinkInfo(
-                        url=link.url,
-                        text=link.text
-                    ))
+                result_links.extend(batch)
 
         
 
         return result_links
 
+MENU_FORMATS = ["pdf", "viewer", "integrated", "image", "none"]
+
 class MenuClassifier(AgentBase):
     """
     Page classifier, it receives a page content and returns the respective menu type.
     """
+    span_name = "menu_classifier"
+
     def __init__(self, menutypes: Dict[str,str]):
         super().__init__()
         self._prompt_path = "prompts/menu_classifier.txt"
         self.prompt = self._load_prompt()
         self.menutypes: Dict[str,str] = menutypes
         self.MENU_ITEM_CLASSIFIER_CONFIDENCE_THRESHOLD = float(os.getenv("MENU_ITEM_CLASSIFIER_CONFIDENCE_THRESHOLD", "0.7"))
+        # set when the last classify() returned None because of an error rather than a verdict
+        self.failed = False
+        # batched requests and the pages in them, re-splits and pages classified on their own
+        self.batch_stats = {"requests": 0, "pages": 0, "resplits": 0, "single": 0}
+
+    def cache_key(self) -> str:
+        """Identifies what a verdict depends on (prompt, menu types, model, threshold), for stored verdicts."""
+        parts = [self.prompt, json.dumps(self.menutypes, sort_keys=True), os.getenv("OPENAI_MODEL", "gpt-oss-20b"),
+                 str(self.MENU_ITEM_CLASSIFIER_CONFIDENCE_THRESHOLD)]
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def messages(self, site_name: str, site_url: str, page_url: str, page_text: str, page_title: str,
+                 menutypes: Dict[str, str], content_disposition: Optional[str] = None) -> list:
+        """
+        Menu types and formats go into the system message, the same for every page. The user
+        message holds only the page data, with the long page text last.
+        """
+        user_payload = {
+            "SITE_NAME": site_name,
+            "SITE_URL": site_url,
+            "PAGE_URL": page_url,
+            "PAGE_TITLE": page_title,
+            "CONTENT_DISPOSITION": content_disposition,
+            "PAGE_CONTENT": page_text,
+        }
+        return self._messages(user_payload, {"MENU_TYPES": menutypes, "MENU_FORMATS": MENU_FORMATS})
+
+    def _menu_item(self, menus: List[Dict[str, Any]], page_url: str, page_text: str, menutypes: Dict[str, str],
+                   content_disposition: Optional[str] = None) -> Optional[MenuItem]:
+        """The first verdict of `menus` as a MenuItem, None without one or under the confidence threshold."""
+        if not menus:
+            return None
+        menu_data = menus[0]
+        confidence = menu_data.get("confidence", 0.0)
+        if confidence < self.MENU_ITEM_CLASSIFIER_CONFIDENCE_THRESHOLD:
+            return None
+        return MenuItem(
+            link=page_url,  # Use the page URL as the link
+            type_code=menu_data.get("type_code", "oct_menu"),
+            type_label=menutypes.get(menu_data.get("type_code", "oct_menu"), "Unknown"),
+            format=menu_data.get("format", "integrated"),
+            # languages come from the local identifier, the model isn't asked for them
+            languages=detect_languages(page_text),
+            confidence=confidence,
+            notes=menu_data.get("reason", None),
+            content_disposition=content_disposition
+        )
 
     def classify(
         self,
@@ -120,66 +220,118 @@ class MenuClassifier(AgentBase):
         content_disposition: Optional[str] = None,
     ) -> Optional[MenuItem]:
         """Return single MenuItem object"""
+        self.failed = False
         try:
-            # Build compact context
-            user_payload = {
-                "SITE_NAME": site_name,
-                "SITE_URL": site_url,
-                "PAGE_URL": page_url,
-                "PAGE_CONTENT": page_text,
-                "PAGE_TITLE": page_title,
-                "MENU_TYPES": menutypes,
-                "MENU_FORMATS": ["pdf","viewer","integrated","none"],
-                "LANGS": ["de","en","fr","it"],
-                "CONTENT_DISPOSITION": content_disposition
-            }
-
-            msgs = [
-                SystemMessage(content=self.prompt),
-                HumanMessage(content=json.dumps(user_payload, ensure_ascii=False))
-            ]
-
-            resp = self.llm.invoke(msgs)
+            msgs = self.messages(site_name, site_url, page_url, page_text, page_title, menutypes, content_disposition)
+
+            resp = self._invoke(msgs)
             raw = resp.content or "{}"
             try:
                 data = json.loads(raw)
                 # Parse the response which should contain a "menus" array
-                menus = data.get("menus", [])
-                
-                # If no menus found, return None
-                if not menus:
-                    return None
-                
-                # Extract the first menu item from the array
-                menu_data = menus[0]
-                
-                # Check confidence threshold before creating MenuItem
-                confidence = menu_data.get("confidence", 0.0)
-                if confidence < self.MENU_ITEM_CLASSIFIER_CONFIDENCE_THRESHOLD:
-                    return None
-                
-                # Create MenuItem with the extracted data
-                menu_item = MenuItem(
-                    link=page_url,  # Use the page URL as the link
-                    type_code=menu_data.get("type_code", "oct_menu"),
-                    type_label=menutypes.get(menu_data.get("type_code", "oct_menu"), "Unknown"),
-                    format=menu_data.get("format", "integrated"),
-                    languages=menu_data.get("languages", []),
-                    confidence=confidence,
-                    notes=menu_data.get("reason", None),
-                    content_disposition=content_disposition
-                )
-                
-                # Process languages
-                langs = [l.lower()[:2] for l in menu_item.languages]
-                menu_item.languages = de_duplicate([l for l in langs if l in ["de","en","fr","it"]])[:3]
-                
-                return menu_item
+                return self._menu_item(data.get("menus", []), page_url, page_text, menutypes, content_disposition)
             except Exception as e:
                 print(f"Error: Failed to parse menu item: {type(e).__name__}: {str(e)}")
                 print(f"Raw response that caused error: {raw}")
+                self.failed = True
                 return None
         except Exception as e:
             print(f"Error: LLM server unavailable or error occurred: {e}")
             print("Continuing without agent analysis...")
+            self.failed = True
             return None
+
+    def batch_messages(self, site_name: str, site_url: str, pages: List[Dict[str, Any]], ids: List[str],
+                       menutypes: Dict[str, str]) -> list:
+        """
+        Several pages of one site in one request, each under its PAGE_ID. The system message is
+        the single-page one followed by the batch instructions, so both share their cached prefix.
+        """
+        from langchain.schema import HumanMessage, SystemMessage
+        user_payload = {
+            "SITE_NAME": site_name,
+            "SITE_URL": site_url,
+            "PAGES": [dict(self._batch_entry(page), PAGE_ID=page_id) for page, page_id in zip(pages, ids)],
+        }
+        system = (self._system({"MENU_TYPES": menutypes, "MENU_FORMATS": MENU_FORMATS}) + "\n"
+                  + self._load_prompt("prompts/menu_classifier_batch.txt"))
+        return [SystemMessage(content=system), HumanMessage(content=json.dumps(user_payload, ensure_ascii=False))]
+
+    @staticmethod
+    def _batch_entry(page: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "PAGE_URL": page["page_url"],
+            "PAGE_TITLE": page.get("page_title", ""),
+            "CONTENT_DISPOSITION": page.get("content_disposition"),
+            "PAGE_CONTENT": page.get("page_text", ""),
+        }
+
+    @classmethod
+    def page_tokens(cls, page: Dict[str, Any]) -> int:
+        """Rough request size of one page (~4 characters per token)."""
+        return len(json.dumps(cls._batch_entry(page), ensure_ascii=False)) // 4 + 1
+
+    def pack(self, pages: List[Dict[str, Any]], max_tokens: int, max_pages: int) -> List[List[int]]:
+        """Indices of `pages` in batches of at most `max_tokens` and `max_pages`, in order; a larger page goes alone."""
+        batches, current, used = [], [], 0
+        for i, page in enumerate(pages):
+            tokens = self.page_tokens(page)
+            if current and (used + tokens > max_tokens or len(current) >= max_pages):
+                batches.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def classify_batch(self, site_name: str, site_url: str, pages: List[Dict[str, Any]], menutypes: Dict[str, str],
+                       max_tokens: int = 6000, max_pages: int = 8) -> List[Optional[MenuItem]]:
+        """
+        One MenuItem (or None) per page. `pages` are dicts with page_url, page_text, page_title and
+        content_disposition. Pages are packed into requests of at most `max_tokens` tokens and
+        `max_pages` pages. When a request fails or leaves out pages, those pages are split in
+        halves and sent again; a single page left over is classified on its own.
+        """
+        results: List[Optional[MenuItem]] = [None] * len(pages)
+        for batch in self.pack(pages, max_tokens, max_pages):
+            self._classify_group(site_name, site_url, pages, batch, menutypes, results)
+        return results
+
+    def _classify_group(self, site_name: str, site_url: str, pages: List[Dict[str, Any]], group: List[int],
+                        menutypes: Dict[str, str], results: List[Optional[MenuItem]]):
+        if len(group) == 1:
+            page = pages[group[0]]
+            self.batch_stats["single"] += 1
+            results[group[0]] = self.classify(site_name, site_url, page["page_url"], page.get("page_text", ""),
+                                              page.get("page_title", ""), menutypes, page.get("content_disposition"))
+            return
+        ids = [f"p{n + 1}" for n in range(len(group))]
+        self.batch_stats["requests"] += 1
+        self.batch_stats["pages"] += len(group)
+        verdicts: Dict[str, Any] = {}
+        try:
+            resp = self._invoke(self.batch_messages(site_name, site_url, [pages[i] for i in group], ids, menutypes))
+            for entry in json.loads(resp.content or "{}").get("pages", []):
+                if isinstance(entry, dict) and isinstance(entry.get("menus"), list):
+                    verdicts[str(entry.get("page_id"))] = entry["menus"]
+        except Exception as e:
+            print(f"Error: Batch of {len(group)} pages failed: {type(e).__name__}: {e}")
+        missing = []
+        for i, page_id in zip(group, ids):
+            if page_id not in verdicts:
+                missing.append(i)
+                continue
+            page = pages[i]
+            try:
+                results[i] = self._menu_item(verdicts[page_id], page["page_url"], page.get("page_text", ""), menutypes,
+                                             page.get("content_disposition"))
+            except Exception as e:
+                print(f"Error: Failed to parse menu item: {type(e).__name__}: {str(e)}")
+                missing.append(i)
+        if missing:
+            self.batch_stats["resplits"] += 1
+            half = (len(missing) + 1) // 2
+            for part in (missing[:half], missing[half:]):
+                if part:
+                    self._classify_group(site_name, site_url, pages, part, menutypes, results)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+import argparse, hashlib, json, os, sys, threading, time, zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class BlobStore:
+    """
+    Content-addressed store for downloaded menu documents, shared across runs.
+
+    Documents are keyed by the SHA-256 of the fetched bytes, so the same PDF linked from several
+    URLs or sites, or unchanged since the last run, is parsed and classified once. Each entry is
+    two files under <dir>/<2 hex chars>/:
+        <sha256>.blob   the document bytes (zlib)
+        <sha256>.json   {"sha256", "size", "saved_at", "analysis": {...}, "verdicts": {<classifier key>: {...} | null}}
+    Verdicts are kept per classifier key (prompt, menu types and model), so changing either
+    reclassifies from the stored text. Least recently used entries are removed once the store
+    grows over BLOB_STORE_MAX_MB, down to BLOB_STORE_GC_LOW_WATER of it so a full store isn't
+    rescanned on every write.
+    """
+    def __init__(self, directory: Optional[str] = None, max_mb: Optional[float] = None):
+        self.directory = directory or os.getenv("BLOB_STORE_DIR", ".cache/blobs")
+        self.max_bytes = int(float(max_mb if max_mb is not None else os.getenv("BLOB_STORE_MAX_MB", "512")) * 1_000_000)
+        self.low_water = float(os.getenv("BLOB_STORE_GC_LOW_WATER", "0.9"))
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None  # store size, scanned on the first write
+        self._totals = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def _paths(self, digest: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, digest[:2], digest)
+        return base + ".blob", base + ".json"
+
+    def _write(self, path: str, data: bytes):
+        # write-then-rename, several crawl processes may share the store
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _read_meta(self, digest: str) -> Optional[Dict[str, Any]]:
+        path = self._paths(digest)[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[BlobStore] Ignoring unreadable entry {path}: {e}")
+            return None
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Entry metadata of a document, None if it isn't stored. A hit counts as a use for GC."""
+        meta = self._read_meta(digest)
+        with self._lock:
+            self._totals["hits" if meta else "misses"] += 1
+        if meta:
+            try:
+                os.utime(self._paths(digest)[1])
+            except OSError:
+                pass
+        return meta
+
+    def read(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._paths(digest)[0], "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+    def put(self, digest: str, data: bytes, analysis: Dict[str, Any]):
+        """Store a document with what was extracted from it; keeps verdicts already stored."""
+        blob_path, meta_path = self._paths(digest)
+        with self._lock:
+            meta = self._read_meta(digest) or {"sha256": digest, "size": len(data), "verdicts": {}}
+            meta.update(saved_at=time.time(), analysis=analysis)
+            written = 0
+            if not os.path.exists(blob_path):
+                blob = zlib.compress(data, 1)
+                self._write(blob_path, blob)
+                written += len(blob)
+            encoded = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+            replaced = self._file_size(meta_path)
+            self._write(meta_path, encoded)
+            self._totals["stored"] += 1
+            if self._bytes is not None:
+                self._bytes += written + len(encoded) - replaced
+        if self.size() > self.max_bytes:
+            self.gc()
+
+    def verdict(self, digest: str, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(found, verdict) for a classifier key; a found None verdict means "not a menu"."""
+        meta = self._read_meta(digest) or {}
+        verdicts = meta.get("verdicts", {})
+        return key in verdicts, verdicts.get(key)
+
+    def set_verdict(self, digest: str, key: str, verdict: Optional[Dict[str, Any]]):
+        with self._lock:
+            meta = self._read_meta(digest)
+            if meta is None:
+                return  # evicted in the meantime
+            meta.setdefault("verdicts", {})[key] = verdict
+            meta_path = self._paths(digest)[1]
+            encoded = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+            replaced = self._file_size(meta_path)
+            self._write(meta_path, encoded)
+            if self._bytes is not None:
+                self._bytes += len(encoded) - replaced
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """(last use, bytes, digest) of every stored document."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for prefix in os.listdir(self.directory):
+            folder = os.path.join(self.directory, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith(".json"):
+                    continue
+                digest = name[:-5]
+                size, used = 0, 0.0
+                for path in self._paths(digest):
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    size += st.st_size
+                    used = max(used, st.st_mtime)
+                entries.append((used, size, digest))
+        return entries
+
+    def size(self) -> int:
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self.entries())
+            return self._bytes
+
+    def _remove(self, digest: str):
+        for path in self._paths(digest):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def gc(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove least recently used entries until the store is within max_bytes (default: the
+        low-water mark of the size cap); returns the count.
+        """
+        limit = int(self.max_bytes * self.low_water) if max_bytes is None else max_bytes
+        with self._lock:
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, digest in entries:
+                if total <= limit:
+                    break
+                self._remove(digest)
+                total -= size
+                removed += 1
+            self._bytes = total
+            self._totals["evicted"] += removed
+        if removed:
+            print(f"[BlobStore] Evicted {removed} documents, {total} bytes left")
+        return removed
+
+    def clear(self) -> int:
+        return self.gc(max_bytes=0)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._totals)
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Manage the content-addressed document store")
+    ap.add_argument("--dir", default=None, help="store directory (default: $BLOB_STORE_DIR)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="number and size of stored documents")
+    gc = sub.add_parser("gc", help="evict least recently used documents down to the size cap")
+    gc.add_argument("--max-mb", type=float, default=None, help="size cap (default: $BLOB_STORE_MAX_MB)")
+    sub.add_parser("clear", help="drop all stored documents")
+    args = ap.parse_args(argv)
+
+    store = BlobStore(args.dir, max_mb=getattr(args, "max_mb", None))
+    if args.command == "stats":
+        entries = store.entries()
+        print(f"{len(entries)} documents, {sum(size for _, size, _ in entries)} bytes in {store.directory}")
+    elif args.command == "gc":
+        print(f"Evicted {store.gc(store.max_bytes)} documents")
+    elif args.command == "clear":
+        print(f"Removed {store.clear()} documents")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
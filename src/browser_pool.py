@@ -0,0 +1,140 @@
+from __future__ import annotations
+import os, sys, threading
+from typing import Any, Callable, Dict, Optional, Set
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+class RecyclePolicy:
+    """
+    When to replace pages, contexts and browsers during long runs (0 disables a limit).
+    Chromium renderer memory grows with every SPA visited, fresh pages/contexts/browsers give it back.
+    """
+    def __init__(self, page_navigations: Optional[int] = None, context_navigations: Optional[int] = None,
+                 browser_navigations: Optional[int] = None, browser_rss_mb: Optional[int] = None):
+        self.page_navigations = page_navigations if page_navigations is not None else _env_int("PAGE_RECYCLE_NAVIGATIONS", 50)
+        self.context_navigations = context_navigations if context_navigations is not None else _env_int("CONTEXT_RECYCLE_NAVIGATIONS", 200)
+        self.browser_navigations = browser_navigations if browser_navigations is not None else _env_int("BROWSER_RECYCLE_NAVIGATIONS", 500)
+        self.browser_rss_mb = browser_rss_mb if browser_rss_mb is not None else _env_int("BROWSER_RSS_LIMIT_MB", 2048)
+
+def _proc_rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def process_rss_kb() -> Optional[int]:
+    """Current RSS of this process (Linux), else its peak RSS, None if unknown."""
+    rss = _proc_rss_kb(os.getpid())
+    if rss is None and resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+    return rss
+
+def _parent_pids() -> Dict[int, int]:
+    """pid -> parent pid of every process, empty without /proc."""
+    parents: Dict[int, int] = {}
+    if not os.path.isdir("/proc"):
+        return parents
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # the command name may contain spaces, the ppid follows its closing parenthesis
+                parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return parents
+
+def _descendants(parents: Dict[int, int], roots: Set[int]) -> Set[int]:
+    descendants, frontier = set(), set(roots)
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier and pid not in descendants}
+        descendants |= frontier
+    return descendants
+
+def children_rss_kb() -> Optional[int]:
+    """Summed current RSS of all descendant processes (the browsers), Linux only."""
+    if not os.path.isdir("/proc"):
+        return None
+    return sum(_proc_rss_kb(pid) or 0 for pid in _descendants(_parent_pids(), {os.getpid()}))
+
+def tree_rss_kb(roots: Set[int]) -> Optional[int]:
+    """Summed current RSS of `roots` and their descendants, Linux only."""
+    if not os.path.isdir("/proc") or not roots:
+        return None
+    pids = _descendants(_parent_pids(), roots) | set(roots)
+    return sum(_proc_rss_kb(pid) or 0 for pid in pids)
+
+# pool workers launch concurrently; the processes a launch started are told apart by diffing
+# the process tree around it, so launches are serialized
+_launch_lock = threading.Lock()
+
+class WarmBrowser:
+    """
+    A long-lived browser for pools (crawl service, queue workers). get() launches on first use
+    or after a crash; after_site() relaunches it once it served `browser_navigations`
+    navigations or its own browser processes grew over `browser_rss_mb`.
+    """
+    def __init__(self, launch: Callable[[], Any], policy: Optional[RecyclePolicy] = None):
+        self.launch = launch
+        self.policy = policy or RecyclePolicy()
+        self.browser = None
+        self.navigations = 0
+        self.launches = 0
+        self.recycles = 0
+        # processes started by the last launch (the browser, below the driver), see rss_kb()
+        self._pids: Set[int] = set()
+
+    def get(self):
+        if self.browser is None or not self.browser.is_connected():
+            with _launch_lock:
+                before = _descendants(_parent_pids(), {os.getpid()})
+                self.browser = self.launch()
+                parents = _parent_pids()
+                started = _descendants(parents, {os.getpid()}) - before
+            # the roots of the new processes; renderers they spawn later are found by rss_kb()
+            self._pids = {pid for pid in started if parents.get(pid) not in started}
+            self.navigations = 0
+            self.launches += 1
+        return self.browser
+
+    def rss_kb(self) -> Optional[int]:
+        """Current RSS of this browser's processes, None when unknown."""
+        return tree_rss_kb(self._pids)
+
+    def after_site(self, navigations: int, browser_rss_kb: Optional[int] = None):
+        """Count a site's navigations and recycle on the limits; RSS defaults to rss_kb()."""
+        self.navigations += navigations
+        if browser_rss_kb is None and self.policy.browser_rss_mb:
+            browser_rss_kb = self.rss_kb()
+        reason = None
+        if self.policy.browser_navigations and self.navigations >= self.policy.browser_navigations:
+            reason = f"{self.navigations} navigations"
+        elif self.policy.browser_rss_mb and browser_rss_kb and browser_rss_kb > self.policy.browser_rss_mb * 1024:
+            reason = f"browser RSS {browser_rss_kb // 1024} MB"
+        if reason:
+            print(f"[Browser] Recycling browser after {reason}")
+            self.recycles += 1
+            self.close()
+
+    def close(self):
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+            self._pids = set()
+
+    def stats(self) -> Dict[str, int]:
+        return {"launches": self.launches, "recycles": self.recycles, "navigations": self.navigations}
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import Optional
-from playwright.sync_api import Page
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
 
 class CookieDetector:
     def __init__(self):
@@ -0,0 +1,140 @@
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+from .utils import canonicalize_language
+
+NO_PARENT = -1
+
+class CrawlGraph:
+    """
+    Internal, allocation-light representation of the crawl of a single site.
+
+    URLs are interned once (keyed by their language-canonical form) and every node
+    only stores its parent id and depth in flat arrays, so the path to any page is
+    recovered by walking parent pointers instead of copying a call stack per task.
+    Pydantic models are only built at the boundary (see CrawlTask / export).
+    """
+    __slots__ = ("_ids", "_keys", "_urls", "_parents", "_depths", "_visited", "_pruned")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._urls: List[str] = []
+        self._parents = array("i")
+        self._depths = array("h")
+        self._visited = bytearray()
+        self._pruned = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def add(self, url: str, parent: int = NO_PARENT) -> Optional[int]:
+        """Intern url as a child of parent. Returns the new node id, or None if already known."""
+        key = canonicalize_language(url)
+        if key in self._ids:
+            return None
+        node = len(self._urls)
+        self._ids[key] = node
+        self._keys.append(key)
+        self._urls.append(url)
+        self._parents.append(parent)
+        self._depths.append(0 if parent == NO_PARENT else self._depths[parent] + 1)
+        self._visited.append(0)
+        self._pruned.append(0)
+        return node
+
+    def node_id(self, url: str) -> Optional[int]:
+        return self._ids.get(canonicalize_language(url))
+
+    def url(self, node: int) -> str:
+        return self._urls[node]
+
+    def key(self, node: int) -> str:
+        return self._keys[node]
+
+    def parent(self, node: int) -> int:
+        return self._parents[node]
+
+    def depth(self, node: int) -> int:
+        return self._depths[node]
+
+    def mark_visited(self, node: int):
+        self._visited[node] = 1
+
+    def is_visited(self, node: int) -> bool:
+        return bool(self._visited[node])
+
+    def prune(self, node: int):
+        """Mark the subtree below node as not worth crawling."""
+        self._pruned[node] = 1
+
+    def is_pruned(self, node: int) -> bool:
+        """True if any ancestor of node has been pruned."""
+        parent = self._parents[node]
+        while parent != NO_PARENT:
+            if self._pruned[parent]:
+                return True
+            parent = self._parents[parent]
+        return False
+
+    def ancestors(self, node: int) -> List[int]:
+        """Node ids from the root down to (excluding) node."""
+        chain = []
+        parent = self._parents[node]
+        while parent != NO_PARENT:
+            chain.append(parent)
+            parent = self._parents[parent]
+        chain.reverse()
+        return chain
+
+    def call_stack(self, node: int) -> List[str]:
+        """Canonical URLs from the root down to (excluding) node, as CrawlTask.call_stack used to hold."""
+        return [self._keys[n] for n in self.ancestors(node)]
+
+    def path(self, node: int) -> List[str]:
+        """URLs from the root down to and including node."""
+        return [self._urls[n] for n in self.ancestors(node)] + [self._urls[node]]
+
+    def to_dict(self, menu_links: Iterable[str] = ()) -> Dict[str, Any]:
+        """Exportable view of the crawl, including how each menu link was reached."""
+        nodes = [
+            {
+                "id": node,
+                "url": self._urls[node],
+                "parent": None if self._parents[node] == NO_PARENT else self._parents[node],
+                "depth": self._depths[node],
+                "visited": bool(self._visited[node]),
+            }
+            for node in range(len(self._urls))
+        ]
+        menus = []
+        for link in menu_links:
+            node = self.node_id(link)
+            menus.append({"link": link, "path": self.path(node) if node is not None else [link]})
+        return {"nodes": nodes, "menus": menus}
+
+class GraphTask:
+    """
+    Lightweight stand-in for models.CrawlTask backed by a CrawlGraph node.
+    Exposes the same url/depth/call_stack attributes the extractors and parsers read.
+    """
+    __slots__ = ("graph", "node")
+
+    def __init__(self, graph: CrawlGraph, node: int):
+        self.graph = graph
+        self.node = node
+
+    @property
+    def url(self) -> str:
+        return self.graph.url(self.node)
+
+    @property
+    def depth(self) -> int:
+        return self.graph.depth(self.node)
+
+    @property
+    def call_stack(self) -> List[str]:
+        return self.graph.call_stack(self.node)
+
+    def __str__(self) -> str:
+        return f"GraphTask(url={self.url}, depth={self.depth}, node={self.node})"
@@ -1,20 +1,44 @@
-from typing import List, Optional, Set, Dict, Tuple
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Optional, Set, Dict, Tuple
 from .models import LinkInfo, MenuItem
-from .utils import normalize_url, is_same_domain, canonicalize_language, deduplicate_by_key
-from playwright.sync_api import sync_playwright, Page
+from .utils import normalize_url, is_same_domain, canonicalize_language
+import contextvars
 import re
 import os
 import time
 from .sitemap_handler import SitemapHandler
 from .cookie_detector import CookieDetector
-from .models import CrawlTask, LinkInfo, PageRecord
-import os
+from .storage_state import StorageStateStore
+from .blob_store import BlobStore
+from .models import LinkInfo, PageRecord, RestaurantResult
+from .crawl_graph import CrawlGraph, GraphTask
+from .menu_accumulator import MenuAccumulator
+from .metrics import Timings, collect, metrics_enabled, span
+from .browser_pool import RecyclePolicy, children_rss_kb, process_rss_kb
+from .navigation import HostTimeouts, NavigationSkipped, TabPrefetcher, navigate, new_wait_stats
+from .profiling import profiled
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+import json
 
 from .link_extractor import LinkExtractor, LinkNoiseFilter
-from .parser import PageParserFactory
+from .parser import ImagePageParser, JSONPageParser, PageParserBase, PageParserFactory, PDFPageParser, WebPageParser
+from .response_capture import ResponseCapture
+from .agent import MenuClassifier
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+    from .har_archive import HarArchive
 
 class SiteCrawler:
-    def __init__(self, restaurant_name: str, restaurant_url: str, menutypes: Dict[str, str]):
+    def __init__(self, restaurant_name: str, restaurant_url: str, menutypes: Dict[str, str],
+                 storage_state_store: Optional[StorageStateStore] = None,
+                 har_archive: Optional[HarArchive] = None,
+                 recycle_policy: Optional[RecyclePolicy] = None,
+                 host_timeouts: Optional[HostTimeouts] = None,
+                 blob_store: Optional[BlobStore] = None):
         self.restaurant_name = restaurant_name
         self.restaurant_url = restaurant_url
         self.menutypes = menutypes
@@ -24,27 +48,100 @@ class SiteCrawler:
         
         self._link_extractor = LinkExtractor(max_depth=self.max_depth)
         self._link_noise_filter = LinkNoiseFilter()
-        self._page_parser_factory = PageParserFactory(menutypes)
+        self._har_archive = har_archive
+        http_session = har_archive.session() if har_archive else None
+        # PDF, JSON and image bodies the browser received, so they are not downloaded again
+        self._capture = ResponseCapture() if os.getenv("RESPONSE_CAPTURE", "1").lower() not in ("0", "false", "no", "") else None
+        self._page_parser_factory = PageParserFactory(menutypes, http_session=http_session, blob_store=blob_store,
+                                                      capture=self._capture)
+        self._sitemap_handler = SitemapHandler(http_session)
+        self._sitemap_seeds: Optional[Future] = None
+        # PDFs and images are fetched and analyzed in the background while the crawl goes on
+        self._download_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_documents: List[Tuple[int, GraphTask, PageParserBase, str, Future]] = []
+        self._pdf_reused = {"analysis": 0, "verdict": 0}
+        # MENU_BATCH_TOKENS > 0: web pages wait here and are classified several per LLM request
+        self._batch_tokens = int(os.getenv("MENU_BATCH_TOKENS", "0"))
+        self._batch_max_pages = int(os.getenv("MENU_BATCH_MAX_PAGES", "8"))
+        # batched requests, pages in them, re-splits and single pages, summed over the batches
+        self._batch_stats: Dict[str, int] = {}
+        self._pending_pages: List[Tuple[int, GraphTask, PageParserBase, Dict[str, str]]] = []
+        self._pending_tokens = 0
+        # pipeline: the crawl thread navigates and extracts, the noise filter and the menu classifier
+        # run in PIPELINE_WORKERS threads with at most PIPELINE_DEPTH pages in flight (0 runs them inline)
+        self._pipeline_depth = int(os.getenv("PIPELINE_DEPTH", "4"))
+        self._stage_executor: Optional[ThreadPoolExecutor] = None
+        # (future, callback applying its result on the crawl thread), oldest first
+        self._pending_stages: deque = deque()
+        self._prefetcher = TabPrefetcher()
         self._cookie_detector = CookieDetector()
         self._cookie_accept: Optional[str] = None
-        self._queue: List[CrawlTask] = []
-        self._visited_links: Set[str] = set()
-        self._seen_links: Set[str] = set()
-        self._menu_items: List[MenuItem] = []
+        self._storage_state_store = storage_state_store
+        self._root_loaded = False
+        # frontier holds node ids of the crawl graph, the graph interns every seen URL
+        self._graph = CrawlGraph()
+        self._queue = deque()
+        self._menus = MenuAccumulator(menutypes)
+        self._pages: Dict[str, PageRecord] = {}
+        self._recycle_policy = recycle_policy or RecyclePolicy()
+        self._ctx = None
+        self._page = None
+        self._ctx_started_at = 0
+        self._page_started_at = 0
+        self._host_timeouts = host_timeouts or HostTimeouts.shared()
+        # counters and wall time per stage, read by the benchmark harness
+        self.stats = {"navigations": 0, "pages": 0, "duration": 0.0, "stage_seconds": {},
+                      "pages_recycled": 0, "contexts_recycled": 0, "memory": {},
+                      "waits": new_wait_stats(), "sitemap": {}, "pdf": {}, "images": {},
+                      "menu_batches": {}, "prefetch": {}, "capture": {}}
+        # spans of this site's crawl (crawler stages, classifier calls, downloads), None if disabled
+        self.timings: Optional[Timings] = Timings() if metrics_enabled() else None
         
-        self._queue.append(CrawlTask(url=restaurant_url, depth=0, call_stack=[]))
+        self._queue.append(self._graph.add(restaurant_url))
+
+    @property
+    def menu_items(self) -> List[MenuItem]:
+        return self._menus.items()
+
+    @property
+    def cookie_accept(self) -> Optional[str]:
+        return self._cookie_accept
+
+    @property
+    def pages(self) -> List[PageRecord]:
+        """One record per processed page: depth, content hash of the classified text or the error."""
+        return list(self._pages.values())
+
+    def result(self) -> RestaurantResult:
+        """The site's entry of output.json."""
+        return RestaurantResult(
+            name=self.restaurant_name,
+            url=self.restaurant_url,
+            cookie_banner_accept=self._cookie_accept,
+            status="ok" if self._menus.items() else "no_menus_found",
+            menus=self.menu_items,
+        )
+
+    def menu_content_hashes(self) -> Dict[str, Optional[str]]:
+        """Menu link -> fingerprint of the content it was classified from."""
+        return {item.link: self._menus.fingerprint_for(item.link) for item in self._menus.items()}
 
-    def _deduplicate_menu_items(self):
-        self._menu_items = deduplicate_by_key(self._menu_items, lambda item: item.link)
+    def _record_menu_item(self, menu_item: MenuItem, node: int, fingerprint: Optional[str]):
+        """Merge a verdict into the accumulator and prune the subtree below confirmed specific menus"""
+        merged = self._menus.add(menu_item, fingerprint)
+        if self._menus.is_confirmed_specific(merged, self._graph.depth(node)):
+            print(f"[Crawler] Confirmed {merged.type_code} at {menu_item.link}, pruning pages below it")
+            self._graph.prune(node)
 
     def _detect_cookie_accept_button(self, page: Page) -> Optional[str]:
         """
-        Find pages with menus and mark their parents for exclusion
+        Detect the cookie banner accept button (once per site) and click it
         """
         if self._cookie_accept is None:
             cookie_accept = self._cookie_detector.detect(page)
             # Optionally click it if visible
             if cookie_accept:
+                self._cookie_accept = cookie_accept
                 try:
                     page.get_by_role("button", name=re.compile(cookie_accept, re.I)).first.click(timeout=1000)
                 except Exception:
@@ -81,113 +178,403 @@ class SiteCrawler:
                 
         return True  # This is a web page
 
-    def _filter_unvisited_links(self, extracted_links: List[LinkInfo]) -> List[LinkInfo]:
-        """Filter out already processed links (both queued and visited)"""
-        unvisited_links = []
-        for link in extracted_links:
-            norm_url = canonicalize_language(link.url)
-            if norm_url not in self._seen_links:
-                self._seen_links.add(norm_url)
-                unvisited_links.append(link)
-        return unvisited_links
-
-    def _exclude_child_pages(self, menu_items: List[MenuItem], current_depth: int):
-        """Exclude child pages only if we find specific menu types, not generic menus"""
-        for item in menu_items:
-            # Only exclude if this is a specific menu type (not generic "oct_menu")
-            # Get all menu types except the generic "oct_menu"
-            specific_menu_types = [code for code in self.menutypes.keys() if code != "oct_menu"]
-            should_exclude = (
-                current_depth > 1 and  # Don't exclude if we're on a landing page
-                item.confidence >= 0.7 and  # Don't exclude if confidence is low
-                item.type_code in specific_menu_types  # Only exclude specific menu types
-            )
-            
-            if should_exclude:
-                self._visited_links.add(canonicalize_language(item.link))
-
-    def crawl_site(self):
-        start_time = time.time()
-        
-        sitemap_handler = SitemapHandler()
-        # We need to create a page first to call discover_sitemap_urls
-        # For now, we'll skip sitemap discovery and just use the initial URL
-        sitemap_urls = []
+    def _filter_unvisited_links(self, extracted_links: List[LinkInfo], parent: int) -> List[LinkInfo]:
+        """Filter out already seen links (queued, visited or rejected), interning the new ones under parent"""
+        return [link for link in extracted_links if self._graph.add(link.url, parent=parent) is not None]
 
-        # TODO: add the sitemap URLs to the queue - should be done in the future
-        # Potentially too heavy operation, since the website could have a lot of sitemap URLs
-        # we can limit the number of sitemap URLs to be crawled
-        # or we can limit the nested level of the sitemap URLs
+    def export_graph(self, path: str):
+        """Write the crawl graph (nodes + the path to every menu found) as JSON."""
+        payload = {"name": self.restaurant_name, "url": self.restaurant_url}
+        payload.update(self._graph.to_dict(item.link for item in self._menus.items()))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
 
-        # sitemap_urls = sitemap_handler.discover_sitemap_urls(page, self.restaurant_url)        
-        # for url, text in sitemap_urls:
-        #     self._queue.append(CrawlTask(url=url, depth=1, call_stack=[]))
+    def _new_context(self, browser):
+        """Create a browser context, restoring persisted storage state for this domain if any."""
+        storage_state = None
+        if self._storage_state_store is not None:
+            storage_state = self._storage_state_store.load(self.restaurant_url)
+            if storage_state is not None:
+                print(f"[Crawler] Restored storage state for {self.restaurant_url}")
+                # banner will not show again, keep the answer we recorded last time
+                self._cookie_accept = self._storage_state_store.cookie_accept(self.restaurant_url)
+        options = self._har_archive.context_options() if self._har_archive else {}
+        ctx = browser.new_context(storage_state=storage_state, **options)
+        if self._har_archive:
+            self._har_archive.attach(ctx)
+        if self._capture is not None:
+            self._capture.attach(ctx)
+        return ctx
 
-        with sync_playwright() as p:
-            print(f"[Crawler] Launching browser....")
+    def _persist_storage_state(self, ctx):
+        """Save storage state after a successful crawl (root page loaded)."""
+        if self._storage_state_store is None or not self._root_loaded:
+            return
+        try:
+            self._storage_state_store.save(self.restaurant_url, ctx.storage_state(), self._cookie_accept)
+        except Exception as e:
+            print(f"[Crawler] Failed to persist storage state: {e}")
 
+    def _crawl(self, browser):
+        """Crawl the site in a fresh context of `browser`, the context is closed afterwards."""
+        with span("new_context"):
+            self._ctx = self._new_context(browser)
+        self._ctx_started_at = self.stats["navigations"]
+        try:
+            self._crawl_pages(browser)
+            self._persist_storage_state(self._ctx)
+            self._record_memory()
+        finally:
+            # closing the context flushes the browser HAR when recording
+            self._ctx.close()
+            self._ctx = self._page = None
+            if self._download_executor is not None:
+                self._download_executor.shutdown(wait=False, cancel_futures=True)
+                self._download_executor = None
+            self._pending_documents = []
+            self._pending_pages, self._pending_tokens = [], 0
+            if self._stage_executor is not None:
+                self._stage_executor.shutdown(wait=False, cancel_futures=True)
+                self._stage_executor = None
+            self._pending_stages.clear()
+            self._prefetcher.reset()
 
-            browser = p.chromium.launch(headless=True)
-            ctx = browser.new_context()
-            page = ctx.new_page()
-            pages: Dict[str, PageRecord] = {}
+    def _run_stage(self, fn, apply):
+        """
+        Run fn() in a pipeline thread and apply(result) on the crawl thread once it is done.
+        When PIPELINE_DEPTH stages are in flight the crawl thread waits for the oldest one.
+        """
+        if self._pipeline_depth <= 0:
+            apply(fn())
+            return
+        if self._stage_executor is None:
+            self._stage_executor = ThreadPoolExecutor(max_workers=int(os.getenv("PIPELINE_WORKERS", "2")),
+                                                      thread_name_prefix="pipeline")
+        # the copied context carries the span collector and the profile into the pipeline thread
+        self._pending_stages.append((self._stage_executor.submit(contextvars.copy_context().run, profiled(fn)), apply))
+        while len(self._pending_stages) > self._pipeline_depth:
+            future, oldest = self._pending_stages.popleft()
+            with span("pipeline_wait"):
+                result = future.result()
+            oldest(result)
 
-            while self._queue:
-                task = self._queue.pop(0)
-                if task.depth > self.max_depth:
-                    continue
+    def _collect_stages(self, wait: bool = False):
+        """Apply the results of finished stages in submission order (of all of them when `wait`)."""
+        while self._pending_stages and (wait or self._pending_stages[0][0].done()):
+            future, apply = self._pending_stages.popleft()
+            with span("pipeline_wait"):
+                result = future.result()
+            apply(result)
+
+    def _filter_links(self, links: List[LinkInfo]) -> List[LinkInfo]:
+        with span("noise_filter"):
+            return self._link_noise_filter.filter(links)
+
+    def _queue_links(self, links: List[LinkInfo]):
+        for link in links:
+            child = self._graph.node_id(link.url)
+            if child is not None:
+                print(f"[Crawler] Queued link: {link.url}")
+                self._queue.append(child)
+
+    def _add_captured_menus(self, node: int):
+        """
+        JSON menu data the browser loaded becomes a candidate of its own, below the page that
+        loaded it (or `node`), classified like a page without being navigated to.
+        """
+        if self._capture is None:
+            return
+        for captured in self._capture.take_menus():
+            parent = self._graph.node_id(captured.page_url) if captured.page_url else None
+            child = self._graph.add(captured.url, parent=node if parent is None else parent)
+            if child is None:
+                continue
+            print(f"[Crawler] Menu data loaded by the page: {captured.url}")
+            task = GraphTask(self._graph, child)
+            parser = JSONPageParser(None, task, self.menutypes, captured)
+            self._run_stage(partial(self._classify_page, parser, parser.extract()),
+                            partial(self._record_page, child, task, parser))
+            self._graph.mark_visited(child)
+
+    def _classify_page(self, parser: PageParserBase, *inputs) -> Optional[MenuItem]:
+        """parser.classify(*inputs): the extracted page, or a document's analysis and title."""
+        with span("page_parse"):
+            return parser.classify(*inputs)
+
+    def _upcoming_web_pages(self) -> List[str]:
+        """URLs of the next frontier entries the browser will load, as many as there are prefetch tabs."""
+        urls = []
+        for node in islice(self._queue, 4 * self._prefetcher.tabs):
+            if self._graph.is_visited(node) or self._graph.is_pruned(node) or self._graph.depth(node) > self.max_depth:
+                continue
+            url = self._graph.url(node)
+            if self._is_web_page_naive(url) and url not in urls:
+                urls.append(url)
+                if len(urls) >= self._prefetcher.tabs:
+                    break
+        return urls
+
+    def _prefetch_next(self):
+        """Start loading the next frontier pages in spare tabs while this page's stages run."""
+        if self._prefetcher.tabs <= 0 or self._ctx is None:
+            return
+        urls = self._upcoming_web_pages()
+        self._prefetcher.keep(urls)
+        with span("prefetch"):
+            self._prefetcher.prefetch(self._ctx, urls, self._host_timeouts)
+
+    def _navigate(self, browser, url: str) -> Page:
+        """The page showing `url`: a prefetched tab if one loaded it, else the current tab navigated there."""
+        page = self._current_page(browser)
+        with span("navigation"):
+            prefetched = self._prefetcher.take(url, self._host_timeouts, self.stats["waits"])
+            if prefetched is None:
+                self.stats["navigations"] += navigate(page, url, self._host_timeouts, self.stats["waits"])
+                return page
+        self._prefetcher.release(page)
+        self._page = prefetched
+        self.stats["navigations"] += 1
+        return prefetched
+
+    def _buffer_page(self, node: int, task: GraphTask, parser: WebPageParser):
+        """Keep the page text for a batched classification, sending the batch once it is full."""
+        with span("page_parse"):
+            page = parser.extract()
+        self._pending_pages.append((node, task, parser, page))
+        self._pending_tokens += MenuClassifier.page_tokens(page)
+        if self._pending_tokens >= self._batch_tokens or len(self._pending_pages) >= self._batch_max_pages:
+            self._classify_pending()
+
+    def _classify_pending(self):
+        """Classify the buffered pages in as few requests as the token budget allows and record their verdicts."""
+        if not self._pending_pages:
+            return
+        pending, self._pending_pages, self._pending_tokens = self._pending_pages, [], 0
+
+        def classify() -> Tuple[List[Optional[MenuItem]], Dict[str, int]]:
+            # a classifier per batch: batches run in several pipeline threads at once
+            classifier = MenuClassifier(self.menutypes)
+            with span("page_parse"):
+                menu_items = classifier.classify_batch(self.restaurant_name, self.restaurant_url,
+                                                       [page for _, _, _, page in pending], self.menutypes,
+                                                       self._batch_tokens, self._batch_max_pages)
+            return menu_items, classifier.batch_stats
+
+        def record(result: Tuple[List[Optional[MenuItem]], Dict[str, int]]):
+            menu_items, batch_stats = result
+            for key, count in batch_stats.items():
+                self._batch_stats[key] = self._batch_stats.get(key, 0) + count
+            for (node, task, parser, _), menu_item in zip(pending, menu_items):
+                self._record_page(node, task, parser, menu_item)
+
+        self._run_stage(classify, record)
+
+    def _submit_document(self, node: int, task: GraphTask, parser):
+        """Start fetching and analyzing a PDF or image; its verdict is taken later in _collect_documents()."""
+        if self._download_executor is None:
+            self._download_executor = ThreadPoolExecutor(max_workers=int(os.getenv("PDF_DOWNLOAD_WORKERS", "4")),
+                                                         thread_name_prefix="download")
+        # the copied context carries the span collector and the profile into the download thread
+        future = self._download_executor.submit(contextvars.copy_context().run, profiled(parser.analyze))
+        self._pending_documents.append((node, task, parser, parser.page_title(), future))
 
-                norm_url = canonicalize_language(task.url)
-                if norm_url in self._visited_links:
+    def _collect_documents(self, wait: bool = False):
+        """Hand the documents whose analysis finished (all of them when `wait`) to the classifier stage."""
+        pending = []
+        for node, task, parser, page_title, future in self._pending_documents:
+            if not wait and not future.done():
+                pending.append((node, task, parser, page_title, future))
+                continue
+            with span("download_wait"):
+                analysis = future.result()
+            self._run_stage(partial(self._classify_page, parser, analysis, page_title),
+                            partial(self._record_document, node, task, parser))
+        self._pending_documents = pending
+
+    def _record_document(self, node: int, task: GraphTask, parser, menu_item: Optional[MenuItem]):
+        if getattr(parser, "reused", None):
+            self._pdf_reused[parser.reused] += 1
+        self._record_page(node, task, parser, menu_item)
+
+    def _record_page(self, node: int, task: GraphTask, parser, menu_item: Optional[MenuItem]):
+        norm_url = self._graph.key(node)
+        self.stats["pages"] += 1
+        self._pages[norm_url] = PageRecord(url=norm_url, depth=task.depth, content_hash=parser.content_fingerprint)
+        if menu_item:
+            self._record_menu_item(menu_item, node, parser.content_fingerprint)
+
+    def _current_page(self, browser) -> Page:
+        """
+        The page to use next. The page is replaced every `page_navigations` navigations and the
+        context every `context_navigations` (carrying cookies/localStorage over), so renderer
+        memory of long crawls is given back. Contexts are kept while recording a HAR archive.
+        """
+        policy = self._recycle_policy
+        navigations = self.stats["navigations"]
+        if (policy.context_navigations and self._har_archive is None
+                and navigations - self._ctx_started_at >= policy.context_navigations):
+            with span("recycle_context"):
+                state = self._ctx.storage_state()
+                # the spare tabs go with the context
+                self._prefetcher.reset()
+                self._ctx.close()
+                self._ctx = browser.new_context(storage_state=state)
+                if self._capture is not None:
+                    self._capture.attach(self._ctx)
+            self._page = None
+            self._ctx_started_at = navigations
+            self.stats["contexts_recycled"] += 1
+        elif (self._page is not None and policy.page_navigations
+                and navigations - self._page_started_at >= policy.page_navigations):
+            self._page.close()
+            self._page = None
+            self.stats["pages_recycled"] += 1
+        if self._page is None:
+            self._page = self._ctx.new_page()
+            self._page_started_at = navigations
+        return self._page
+
+    def _record_memory(self):
+        """Memory snapshot at the end of the site, while its pages are still open."""
+        self.stats["memory"] = {
+            "rss_kb": process_rss_kb(),
+            "browser_rss_kb": children_rss_kb(),
+            "page_records": len(self._pages),
+            "graph_nodes": len(self._graph),
+        }
+
+    def _seed_from_sitemaps(self):
+        """Put menu-like sitemap URLs at the front of the frontier, right after the start page."""
+        future, self._sitemap_seeds = self._sitemap_seeds, None
+        try:
+            with span("sitemap_wait"):
+                seeds = future.result(timeout=self._sitemap_handler.timeout)
+        except Exception as e:
+            print(f"[Sitemap] Discovery failed: {type(e).__name__}: {e}")
+            return
+        nodes = [node for node in (self._graph.add(url, parent=0) for url in seeds) if node is not None]
+        self._queue.extendleft(reversed(nodes))
+        self.stats["sitemap"] = dict(self._sitemap_handler.stats, seeds=len(nodes))
+        if nodes:
+            print(f"[Sitemap] Seeded {len(nodes)} menu-like URLs from sitemaps")
+
+    def _crawl_pages(self, browser):
+        while True:
+            if self._sitemap_seeds is not None and self.stats["navigations"]:
+                self._seed_from_sitemaps()
+            # when there is nothing else to do, classify the buffered pages, wait for the filter and
+            # classifier stages (they may queue more links) and then for the PDFs and images still in flight
+            idle = not self._queue
+            if idle:
+                self._classify_pending()
+            self._collect_stages(wait=idle)
+            self._collect_documents(wait=not self._queue)
+            if not self._queue:
+                # the verdicts on the last documents
+                self._collect_stages(wait=True)
+                break
+            page = self._current_page(browser)
+            node = self._queue.popleft()
+            task = GraphTask(self._graph, node)
+            if task.depth > self.max_depth:
+                continue
+
+            if self._graph.is_visited(node) or self._graph.is_pruned(node):
+                continue
+            norm_url = self._graph.key(node)
+
+            # Skip non-web files (PDFs, images, etc.) that shouldn't be loaded with Playwright
+            if self._is_web_page_naive(task.url):
+                # wait until the page is completely loaded
+                try:
+                    page = self._navigate(browser, task.url)
+                except NavigationSkipped as e:
+                    self._pages[norm_url] = PageRecord(url=norm_url, depth=task.depth, error=f"nav_skipped: {e}")
                     continue
-                
+                except Exception as e:
+                    self.stats["navigations"] += 1
+                    self._pages[norm_url] = PageRecord(url=norm_url, depth=task.depth, error=f"nav_error: {e}")
+                    continue
+
+                if task.depth == 0:
+                    self._root_loaded = True
 
-                # Update call stack for this page
-                current_call_stack = task.call_stack + [norm_url]
-
-                # Skip non-web files (PDFs, images, etc.) that shouldn't be loaded with Playwright
-                if self._is_web_page_naive(task.url):
-                    # wait until the page is completely loaded
-                    try:
-                        # Try with domcontentloaded first (faster), then fallback to networkidle
-                        try:
-                            page.goto(task.url, wait_until="domcontentloaded", timeout=15000)
-                        except Exception:
-                            page.goto(task.url, wait_until="networkidle", timeout=60000)
-                    except Exception as e:
-                        pages[norm_url] = PageRecord(url=norm_url, error=f"nav_error: {e}")
-                        continue
-
-                    # Detect cookie banner accept button (once)
+                # Detect cookie banner accept button (once)
+                with span("cookie_detection"):
                     self._detect_cookie_accept_button(page)
 
+                with span("link_extraction"):
                     extracted_links = self._link_extractor.extract(page, task)
-                    print(f"[Crawler] Extracted {len(extracted_links)} links")
-
-                    # Filter out already processed links (both queued and visited)
-                    extracted_links = self._filter_unvisited_links(extracted_links)
-
-                    filtered_links = self._link_noise_filter.filter(extracted_links)
-                    # crawl the unvisited links
-                    for link in filtered_links:
-                        print(f"[Crawler] Queued link: {link.url}")
-                        candidate_task = CrawlTask(
-                            url=link.url, 
-                            depth=task.depth + 1, 
-                            call_stack=current_call_stack
-                        )
-                        self._queue.append(candidate_task)
-
-                print(f"[Crawler] Processing link: {task.url}")
-                candidate_page_parser = self._page_parser_factory.get_parser(page, task)
-                menu_item = candidate_page_parser.parse()
-                if menu_item:
-                    self._menu_items.append(menu_item)
-
-                self._deduplicate_menu_items()
-            
-                self._visited_links.add(norm_url)
+                print(f"[Crawler] Extracted {len(extracted_links)} links")
+
+                # Filter out already processed links (both queued and visited)
+                extracted_links = self._filter_unvisited_links(extracted_links, node)
+                self._add_captured_menus(node)
+
+                # the noise filter runs while the crawl goes on, its links are queued when it is done
+                self._run_stage(partial(self._filter_links, extracted_links), self._queue_links)
+
+            print(f"[Crawler] Processing link: {task.url}")
+            candidate_page_parser = self._page_parser_factory.get_parser(page, task)
+            if isinstance(candidate_page_parser, (PDFPageParser, ImagePageParser)):
+                self._submit_document(node, task, candidate_page_parser)
+            elif self._batch_tokens > 0 and isinstance(candidate_page_parser, WebPageParser):
+                self._buffer_page(node, task, candidate_page_parser)
+            elif isinstance(candidate_page_parser, WebPageParser):
+                # the text is read from the tab now, the classifier runs while the next page loads
+                with span("page_parse"):
+                    extracted = candidate_page_parser.extract()
+                self._run_stage(partial(self._classify_page, candidate_page_parser, extracted),
+                                partial(self._record_page, node, task, candidate_page_parser))
+            else:
+                with span("page_parse"):
+                    menu_item = candidate_page_parser.parse()
+                self._record_page(node, task, candidate_page_parser, menu_item)
+
+            self._graph.mark_visited(node)
+            self._prefetch_next()
+
+    def crawl_site(self, browser=None):
+        """
+        Crawl the site and collect its menu items.
+        A warm `browser` (e.g. from the crawl service's pool) is reused when given,
+        otherwise one is launched for this site and closed afterwards.
+        """
+        from playwright.sync_api import sync_playwright
+        start_time = time.time()
         
+        if os.getenv("SITEMAP_SEEDING", "1").lower() not in ("0", "false", "no", ""):
+            # runs over plain HTTP while the browser starts and loads the start page
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sitemap-discovery")
+            self._sitemap_seeds = executor.submit(contextvars.copy_context().run, profiled(self._sitemap_handler.menu_seeds),
+                                                  self.restaurant_url)
+            executor.shutdown(wait=False)
+
+        with collect(self.timings):
+            if browser is not None:
+                self._crawl(browser)
+            else:
+                with sync_playwright() as p:
+                    print(f"[Crawler] Launching browser....")
+                    with span("browser_launch"):
+                        browser = p.chromium.launch(headless=True)
+                    self._crawl(browser)
+                    browser.close()
+
+        if self._har_archive is not None:
+            self._har_archive.close()
+
         end_time = time.time()
         duration = end_time - start_time
+        self.stats["duration"] = duration
+        self.stats["pdf"] = dict(self._page_parser_factory.pdf_fetcher.stats(),
+                                 analyses_reused=self._pdf_reused["analysis"], verdicts_reused=self._pdf_reused["verdict"])
+        self.stats["images"] = self._page_parser_factory.ocr_budget.stats()
+        if self._batch_stats:
+            self.stats["menu_batches"] = dict(self._batch_stats)
+        self.stats["prefetch"] = dict(self._prefetcher.stats)
+        if self._capture is not None:
+            self.stats["capture"] = self._capture.stats()
+        if self.timings is not None:
+            self.stats["stage_seconds"] = self.timings.totals()
         print(f"[Crawler] Completed crawling {self.restaurant_name} in {duration:.2f} seconds")
@@ -0,0 +1,194 @@
+from __future__ import annotations
+import base64, io, json, os, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+RECORD = "record"
+REPLAY = "replay"
+
+def _headers(pairs: List[Dict[str, str]]) -> CaseInsensitiveDict:
+    headers = CaseInsensitiveDict()
+    for pair in pairs:
+        headers[pair["name"]] = pair["value"]
+    return headers
+
+def _har_entry(method: str, url: str, request_headers: Dict[str, str], status: int, reason: str,
+               response_headers: Dict[str, str], body: bytes, seconds: float) -> Dict[str, Any]:
+    return {
+        "startedDateTime": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "time": round(seconds * 1000, 1),
+        "request": {
+            "method": method,
+            "url": url,
+            "httpVersion": "HTTP/1.1",
+            "headers": [{"name": k, "value": v} for k, v in request_headers.items()],
+            "queryString": [],
+            "cookies": [],
+            "headersSize": -1,
+            "bodySize": -1,
+        },
+        "response": {
+            "status": status,
+            "statusText": reason or "",
+            "httpVersion": "HTTP/1.1",
+            "headers": [{"name": k, "value": v} for k, v in response_headers.items()],
+            "cookies": [],
+            "content": {
+                "size": len(body),
+                "mimeType": response_headers.get("Content-Type", "application/octet-stream"),
+                "text": base64.b64encode(body).decode("ascii"),
+                "encoding": "base64",
+            },
+            "redirectURL": response_headers.get("Location", ""),
+            "headersSize": -1,
+            "bodySize": len(body),
+        },
+        "cache": {},
+        "timings": {"send": 0, "wait": round(seconds * 1000, 1), "receive": 0},
+    }
+
+def _entry_body(entry: Dict[str, Any]) -> bytes:
+    content = entry["response"].get("content", {})
+    text = content.get("text") or ""
+    if content.get("encoding") == "base64":
+        return base64.b64decode(text)
+    return text.encode("utf-8")
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter that performs the request and keeps the full exchange as a HAR entry."""
+    def __init__(self, archive: "HarArchive", **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # read the whole body so the replay has it, callers can still iter_content() over it
+        body = response.content
+        self.archive.add_entry(_har_entry(
+            request.method, request.url, dict(request.headers), response.status_code, response.reason,
+            dict(response.headers), body, time.perf_counter() - started,
+        ))
+        return response
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter that answers from recorded HAR entries and never touches the network."""
+    def __init__(self, archive: "HarArchive", **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        entry = self.archive.lookup(request.method, request.url)
+        if entry is None:
+            raise requests.ConnectionError(f"[HAR] No recorded response for {request.method} {request.url}")
+        body = _entry_body(entry)
+        response = requests.Response()
+        response.status_code = entry["response"]["status"]
+        response.reason = entry["response"].get("statusText", "")
+        response.headers = _headers(entry["response"].get("headers", []))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+class HarArchive:
+    """
+    Record/replay archive for one site crawl.
+
+    The directory holds two HAR 1.2 files:
+        browser.har - everything Playwright loaded (record_har_path / route_from_har)
+        http.har    - downloads made through requests (e.g. PDFs in PDFPageParser)
+
+    In record mode the crawl goes to the network and both files are written when the crawl
+    ends; in replay mode the browser is routed from browser.har and the requests session is
+    answered from http.har (falling back to browser.har), unknown URLs fail instead of
+    going online.
+    """
+    def __init__(self, directory: str, mode: str):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"mode must be '{RECORD}' or '{REPLAY}', got {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._served: Dict[Tuple[str, str], int] = {}
+        if mode == REPLAY:
+            # exchanges recorded through requests win over the browser's for the same URL
+            for path in (self.http_har, self.browser_har):
+                recorded: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+                for entry in self._read(path):
+                    key = (entry["request"]["method"].upper(), entry["request"]["url"])
+                    recorded.setdefault(key, []).append(entry)
+                for key, entries in recorded.items():
+                    self._index.setdefault(key, entries)
+
+    @property
+    def browser_har(self) -> str:
+        return os.path.join(self.directory, "browser.har")
+
+    @property
+    def http_har(self) -> str:
+        return os.path.join(self.directory, "http.har")
+
+    def _read(self, path: str) -> List[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["log"]["entries"]
+        except FileNotFoundError:
+            return []
+
+    def context_options(self) -> Dict[str, Any]:
+        """Extra keyword arguments for browser.new_context()."""
+        if self.mode == RECORD:
+            os.makedirs(self.directory, exist_ok=True)
+            return {"record_har_path": self.browser_har, "record_har_content": "embed"}
+        return {}
+
+    def attach(self, ctx):
+        """Route the browser context from the archive in replay mode."""
+        if self.mode == REPLAY:
+            if not os.path.exists(self.browser_har):
+                raise FileNotFoundError(f"[HAR] Nothing recorded at {self.browser_har}")
+            ctx.route_from_har(self.browser_har, not_found="abort")
+
+    def session(self) -> requests.Session:
+        """requests session that records into, or replays from, this archive."""
+        session = requests.Session()
+        adapter = RecordingAdapter(self) if self.mode == RECORD else ReplayAdapter(self)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def add_entry(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries.append(entry)
+
+    def lookup(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        """Recorded entry for the request; repeated requests walk the recordings and stick on the last."""
+        key = (method.upper(), url)
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                return None
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return entries[min(served, len(entries) - 1)]
+
+    def close(self):
+        """Write http.har (record mode). browser.har is written by Playwright when the context closes."""
+        if self.mode != RECORD:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            entries = list(self._entries)
+        har = {"log": {"version": "1.2", "creator": {"name": "restaurant_menu_crawler", "version": "1"}, "entries": entries}}
+        tmp = self.http_har + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(har, f)
+        os.replace(tmp, self.http_har)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+import os, threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+_shared: Optional["requests.Session"] = None
+_shared_lock = threading.Lock()
+
+def pooled_session(pool_size: Optional[int] = None) -> requests.Session:
+    """requests session whose per-host connection pool fits `pool_size` concurrent requests (keep-alive reuse)."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    size = pool_size or int(os.getenv("HTTP_POOL_SIZE", "16"))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def shared_session() -> requests.Session:
+    """Process-wide pooled session, so crawls of the same process reuse connections."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = pooled_session()
+        return _shared
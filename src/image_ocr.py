@@ -0,0 +1,121 @@
+from __future__ import annotations
+import os, re, threading
+from typing import Dict, Optional
+from .worker_pool import ProcessWorkerPool
+
+# file names of images that are never menus
+NON_MENU_IMAGE = re.compile(r"(?<![a-z])(logo|icon|favicon|sprite|avatar|thumb|thumbnail|placeholder|spacer|badge)s?(?![a-z])",
+                            re.IGNORECASE)
+
+class ImageAnalysis:
+    """OCR text of an image, or why it was skipped before OCR."""
+    __slots__ = ("text", "width", "height", "text_density", "skipped")
+
+    def __init__(self, text: str = "", width: int = 0, height: int = 0, text_density: float = 0.0,
+                 skipped: Optional[str] = None):
+        self.text = text
+        self.width = width
+        self.height = height
+        self.text_density = text_density
+        # name, no_ocr, budget, download, small, large, unsupported, photo
+        self.skipped = skipped
+
+_tessdata = None
+
+def tessdata() -> Optional[str]:
+    """Tesseract language data directory, None without a Tesseract installation. Looked up once per process."""
+    global _tessdata
+    if _tessdata is None:
+        import fitz
+        _tessdata = fitz.get_tessdata() or ""
+    return _tessdata or None
+
+def binarize(gray: bytes) -> bytes:
+    """Pixels darker than 80% of the mean become black (0), the others white (255)."""
+    threshold = 0.8 * sum(gray) / max(len(gray), 1)
+    return gray.translate(bytes(0 if v < threshold else 255 for v in range(256)))
+
+def text_density(binary: bytes) -> float:
+    """Black/white transitions per pixel. Text is dense in them, photos and flat graphics are not."""
+    return (binary.count(b"\x00\xff") + binary.count(b"\xff\x00")) / max(len(binary), 1)
+
+def analyze_image(data: bytes, min_side: int = 400, max_side: int = 2000, min_density: float = 0.01,
+                  languages: str = "deu+eng+fra+ita") -> ImageAnalysis:
+    """
+    Decode, downscale (halving until the longer side fits `max_side`), convert to gray and
+    binarize, then OCR with Tesseract. Images smaller than `min_side` and images with too
+    little text-like structure are skipped before OCR. Runs in the OCR worker processes.
+    """
+    import fitz
+    try:
+        pix = fitz.Pixmap(data)
+    except Exception:
+        return ImageAnalysis(skipped="unsupported")  # e.g. WebP or SVG, which MuPDF doesn't decode
+    result = ImageAnalysis(width=pix.width, height=pix.height)
+    if min(pix.width, pix.height) < min_side:
+        result.skipped = "small"
+        return result
+    halvings = 0
+    while max(pix.width, pix.height) >> halvings > max_side:
+        halvings += 1
+    if halvings:
+        pix.shrink(halvings)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    binary = binarize(pix.samples)
+    result.text_density = text_density(binary)
+    if result.text_density < min_density:
+        result.skipped = "photo"
+        return result
+    path = tessdata()
+    if path is None:
+        result.skipped = "no_ocr"
+        return result
+    ocr_pdf = fitz.Pixmap(fitz.csGRAY, pix.width, pix.height, binary, 0).pdfocr_tobytes(language=languages, tessdata=path)
+    with fitz.open("pdf", ocr_pdf) as doc:
+        result.text = doc.load_page(0).get_text("text").strip()
+    return result
+
+class ImageOCRPool(ProcessWorkerPool):
+    """Image decoding and Tesseract OCR in worker processes; IMAGE_OCR_WORKERS=0 runs them in the calling thread."""
+    workers_env = "IMAGE_OCR_WORKERS"
+    label = "OCR"
+
+    def __init__(self, workers: Optional[int] = None):
+        super().__init__(workers)
+        self.min_side = int(os.getenv("IMAGE_MIN_SIDE", "400"))
+        self.max_side = int(os.getenv("IMAGE_MAX_SIDE", "2000"))
+        self.min_density = float(os.getenv("IMAGE_MIN_TEXT_DENSITY", "0.01"))
+        self.languages = os.getenv("IMAGE_OCR_LANGUAGES", "deu+eng+fra+ita")
+
+    def available(self) -> bool:
+        return tessdata() is not None
+
+    def analyze(self, data: bytes) -> ImageAnalysis:
+        return self.run(analyze_image, data, self.min_side, self.max_side, self.min_density, self.languages,
+                        default=ImageAnalysis(skipped="unsupported"))
+
+class OCRBudget:
+    """Images of one site sent to OCR (at most IMAGE_OCR_MAX_PER_SITE) and why others were skipped."""
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit if limit is not None else int(os.getenv("IMAGE_OCR_MAX_PER_SITE", "8"))
+        self._lock = threading.Lock()
+        self._used = 0
+        self._skipped: Dict[str, int] = {}
+
+    def take(self) -> bool:
+        with self._lock:
+            if self._used >= self.limit:
+                return False
+            self._used += 1
+            return True
+
+    def skip(self, reason: str):
+        with self._lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"analyzed": self._used, "skipped": dict(self._skipped)}
@@ -0,0 +1,181 @@
+from __future__ import annotations
+import math, re
+from typing import Dict, List, Optional, Tuple
+
+LANGUAGES = ("de", "en", "fr", "it")
+
+# Training text for the trigram profiles: everyday prose plus menu vocabulary. Profiles are
+# built from these at first use, so results never change between runs or machines.
+_SAMPLES = {
+    "de": """
+        Herzlich willkommen in unserem Restaurant. Wir freuen uns, Sie bei uns begrüssen zu dürfen.
+        Unsere Küche ist von Dienstag bis Samstag durchgehend geöffnet, am Sonntag nur über Mittag.
+        Die Speisekarte wechselt mit den Jahreszeiten, und wir kochen mit frischen Produkten aus der Region.
+        Bitte reservieren Sie für Gruppen ab acht Personen, wir beraten Sie gerne auch für Ihren Anlass.
+        Vorspeisen: Gemischter Blattsalat mit Kernen und Hausdressing. Kürbissuppe mit gerösteten Kernen
+        und einem Schuss Kernöl. Rindstatar mit Toast und Butter. Hausgemachte Fleischsuppe mit Flädli.
+        Hauptgerichte: Zürcher Geschnetzeltes mit Rösti. Wiener Schnitzel vom Kalb mit Pommes frites und
+        Preiselbeeren. Rindsfilet vom Grill mit Kräuterbutter, Gemüse der Saison und Kartoffelgratin.
+        Zanderfilet auf Blattspinat mit Salzkartoffeln. Hausgemachte Spätzle mit Rahmsauce und Pilzen.
+        Vegetarisch: Gefüllte Paprika mit Reis und Tomatensauce. Käsespätzle mit Röstzwiebeln.
+        Nachspeisen: Apfelstrudel mit Vanillesauce, Schokoladenkuchen mit warmem Kern, Meringue mit Rahm,
+        Glace nach Wahl, Zwetschgenkuchen. Getränke: Mineralwasser mit und ohne Kohlensäure, Apfelschorle,
+        Bier vom Fass, Weisswein und Rotwein im Offenausschank, Kaffee, Tee und heisse Schokolade.
+        Alle Preise verstehen sich in Franken inklusive Mehrwertsteuer. Auf Wunsch informieren wir Sie
+        über Allergene. Das Fleisch stammt aus der Schweiz, der Fisch aus nachhaltiger Fischerei.
+        Mittagsmenü mit Suppe oder Salat und einem Hauptgang, täglich wechselnd, dazu ein Dessert des Tages.
+        Wir wünschen Ihnen einen guten Appetit und einen schönen Abend. Öffnungszeiten und Anfahrt finden
+        Sie weiter unten. Für Fragen erreichen Sie uns jederzeit per Telefon oder über das Kontaktformular.
+    """,
+    "en": """
+        Welcome to our restaurant. We are delighted to have you with us and look forward to your visit.
+        Our kitchen is open from Tuesday to Saturday all day, and on Sunday for lunch only.
+        The menu changes with the seasons, and we cook with fresh produce from local farms and markets.
+        Please book a table for groups of eight or more, and ask us about private dining for your event.
+        Starters: Mixed leaf salad with seeds and house dressing. Pumpkin soup with roasted seeds and a
+        drizzle of oil. Beef tartare with toast and butter. Homemade chicken soup with noodles.
+        Main courses: Sliced veal in cream sauce with hash browns. Breaded veal cutlet with chips and
+        cranberries. Grilled beef fillet with herb butter, seasonal vegetables and potato gratin.
+        Pan fried pike perch on spinach with boiled potatoes. Fresh pasta with mushrooms and cream.
+        Vegetarian: Stuffed peppers with rice and tomato sauce. Cheese dumplings with crispy onions.
+        Desserts: Apple strudel with vanilla custard, chocolate cake with a warm centre, meringue with
+        whipped cream, ice cream of your choice, plum tart. Drinks: still and sparkling water, apple juice,
+        draught beer, white and red wine by the glass, coffee, tea and hot chocolate.
+        All prices are in Swiss francs and include tax. Please ask our staff about allergens. Our meat is
+        sourced from Switzerland and our fish from sustainable fisheries. The lunch menu with soup or
+        salad and a main course changes daily, served with the dessert of the day.
+        We wish you a pleasant meal and a lovely evening. You will find our opening hours and directions
+        below. If you have any questions, you can reach us by phone or through the contact form.
+    """,
+    "fr": """
+        Bienvenue dans notre restaurant. Nous sommes heureux de vous accueillir et de vous faire découvrir
+        notre cuisine. Le restaurant est ouvert du mardi au samedi en continu, et le dimanche à midi.
+        La carte change au fil des saisons et nous cuisinons des produits frais de la région.
+        Merci de réserver pour les groupes à partir de huit personnes, nous vous conseillons volontiers.
+        Entrées: Salade de saison aux graines et vinaigrette maison. Velouté de courge aux graines grillées
+        et à l'huile. Tartare de boeuf, toast et beurre. Bouillon de volaille maison aux vermicelles.
+        Plats principaux: Émincé de veau à la zurichoise et rösti. Escalope de veau panée, frites et
+        airelles. Filet de boeuf grillé au beurre aux herbes, légumes du moment et gratin dauphinois.
+        Filet de sandre sur épinards et pommes de terre vapeur. Pâtes fraîches aux champignons et à la crème.
+        Végétarien: Poivrons farcis au riz et sauce tomate. Gratin de pâtes au fromage et oignons frits.
+        Desserts: Strudel aux pommes et crème vanille, moelleux au chocolat, meringue et crème double,
+        glace au choix, tarte aux pruneaux. Boissons: eau plate et gazeuse, jus de pomme, bière pression,
+        vin blanc et vin rouge au verre, café, thé et chocolat chaud.
+        Tous nos prix sont en francs suisses, taxes comprises. Notre personnel vous renseigne sur les
+        allergènes. La viande est d'origine suisse et le poisson issu d'une pêche durable. Le menu du jour
+        avec soupe ou salade et un plat principal change tous les jours, avec le dessert du jour.
+        Nous vous souhaitons un bon appétit et une excellente soirée. Vous trouverez nos horaires et
+        l'accès ci-dessous. Pour toute question, contactez-nous par téléphone ou par le formulaire.
+    """,
+    "it": """
+        Benvenuti nel nostro ristorante. Siamo lieti di accogliervi e di farvi scoprire la nostra cucina.
+        Il ristorante è aperto dal martedì al sabato con orario continuato, e la domenica solo a pranzo.
+        Il menù cambia con le stagioni e cuciniamo con prodotti freschi della regione.
+        Vi preghiamo di prenotare per gruppi a partire da otto persone, saremo lieti di consigliarvi.
+        Antipasti: Insalata mista con semi e condimento della casa. Vellutata di zucca con semi tostati e
+        un filo d'olio. Tartare di manzo con pane tostato e burro. Brodo di gallina fatto in casa.
+        Primi piatti: Risotto ai funghi porcini, tagliatelle al ragù, gnocchi al pomodoro e basilico.
+        Secondi piatti: Scaloppine di vitello alla panna con rösti. Cotoletta alla milanese con patatine.
+        Filetto di manzo alla griglia con burro alle erbe, verdure di stagione e patate al forno.
+        Filetto di lucioperca su spinaci con patate lesse. Pasta fresca ai funghi e panna.
+        Vegetariano: Peperoni ripieni di riso con salsa di pomodoro. Pizzoccheri con formaggio e cipolle.
+        Dolci: Strudel di mele con salsa alla vaniglia, tortino al cioccolato dal cuore caldo, tiramisù,
+        gelato a scelta, crostata di prugne. Bevande: acqua naturale e frizzante, succo di mela, birra
+        alla spina, vino bianco e vino rosso al bicchiere, caffè, tè e cioccolata calda.
+        Tutti i prezzi sono in franchi svizzeri, IVA inclusa. Il nostro personale è a disposizione per
+        informazioni sugli allergeni. La carne è di provenienza svizzera e il pesce da pesca sostenibile.
+        Il menù del giorno con zuppa o insalata e un secondo cambia ogni giorno, con il dolce del giorno.
+        Vi auguriamo buon appetito e una piacevole serata. Trovate gli orari di apertura e le indicazioni
+        qui sotto. Per qualsiasi domanda potete contattarci per telefono o tramite il modulo di contatto.
+    """,
+}
+
+_NON_LETTERS = re.compile(r"[^a-zàâäçéèêëîïôöœùûüß']+")
+_LINE_BREAKS = re.compile(r"[\n\r\f|/•·]+")
+_ALPHA = 0.5  # additive smoothing of the trigram counts
+
+def trigrams(text: str) -> List[str]:
+    """Character trigrams of the lowercased words, each word padded with spaces."""
+    grams = []
+    for word in _NON_LETTERS.split(text.lower()):
+        if word:
+            padded = f" {word} "
+            grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class LanguageIdentifier:
+    """
+    Naive Bayes over character trigrams for de/en/fr/it. Every trigram maps to one tuple of
+    log probabilities (one per language), so scoring a segment is one lookup and one tuple sum
+    per trigram. Text is scored in segments (lines, merged up to `min_segment` letters) and
+    each segment's posterior is weighted by its length. The scores are then the share of the
+    text written in each language, so a bilingual menu ranks both languages.
+    """
+    _shared: Optional["LanguageIdentifier"] = None
+
+    def __init__(self, samples: Optional[Dict[str, str]] = None, min_segment: int = 40):
+        samples = samples or _SAMPLES
+        self.languages: Tuple[str, ...] = tuple(samples)
+        self.min_segment = min_segment
+        counts = [{} for _ in self.languages]
+        for lang_counts, lang in zip(counts, self.languages):
+            for gram in trigrams(samples[lang]):
+                lang_counts[gram] = lang_counts.get(gram, 0) + 1
+        vocabulary = set().union(*counts)
+        denominators = [sum(c.values()) + _ALPHA * (len(vocabulary) + 1) for c in counts]
+        self._log_probs: Dict[str, Tuple[float, ...]] = {
+            gram: tuple(math.log((c.get(gram, 0) + _ALPHA) / d) for c, d in zip(counts, denominators))
+            for gram in vocabulary
+        }
+        # trigrams never seen in training
+        self._unseen = tuple(math.log(_ALPHA / d) for d in denominators)
+
+    @classmethod
+    def shared(cls) -> "LanguageIdentifier":
+        # built once per process; a racing second build gives the same tables
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _segments(self, text: str) -> List[str]:
+        segments, current = [], ""
+        for line in _LINE_BREAKS.split(text):
+            current = f"{current} {line}" if current else line
+            if sum(ch.isalpha() for ch in current) >= self.min_segment:
+                segments.append(current)
+                current = ""
+        if current.strip():
+            segments.append(current)
+        return segments
+
+    def _posterior(self, grams: List[str]) -> List[float]:
+        totals = [0.0] * len(self.languages)
+        for gram in grams:
+            totals = [t + p for t, p in zip(totals, self._log_probs.get(gram, self._unseen))]
+        top = max(totals)
+        weights = [math.exp(t - top) for t in totals]
+        norm = sum(weights)
+        return [w / norm for w in weights]
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Share of the text per language, summing to 1; empty for text without letters."""
+        shares = [0.0] * len(self.languages)
+        for segment in self._segments(text or ""):
+            grams = trigrams(segment)
+            if grams:
+                shares = [s + p * len(grams) for s, p in zip(shares, self._posterior(grams))]
+        total = sum(shares)
+        if not total:
+            return {}
+        return {lang: round(share / total, 4) for lang, share in zip(self.languages, shares)}
+
+    def detect(self, text: str, min_share: float = 0.15, max_languages: int = 3) -> List[str]:
+        """Languages making up at least `min_share` of the text, most used first."""
+        ranked = sorted(self.scores(text).items(), key=lambda kv: (-kv[1], kv[0]))
+        return [lang for lang, share in ranked if share >= min_share][:max_languages]
+
+def detect_languages(text: str, min_share: float = 0.15, max_languages: int = 3) -> List[str]:
+    return LanguageIdentifier.shared().detect(text, min_share, max_languages)
+
+def language_scores(text: str) -> Dict[str, float]:
+    return LanguageIdentifier.shared().scores(text)
@@ -1,12 +1,16 @@
-from typing import List, Optional, Set, Dict, Tuple
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Optional, Set, Dict, Tuple
 from .models import LinkInfo, MenuItem
 from .agent import NoiseClassifier
 from .utils import normalize_url, is_same_domain, deduplicate_by_key
-from playwright.sync_api import Page
+from .sitemap_handler import MENU_URL_PATTERN, is_menu_like
 import re
 import os
 from .models import CrawlTask, LinkInfo
-from bs4 import BeautifulSoup
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from playwright.sync_api import Page
 
 class LinkExtractor:
     """
@@ -18,6 +22,8 @@ class LinkExtractor:
     def _extract_links_from_dom(self, page: Page, base_url: str) -> List[LinkInfo]:
         """Return list of LinkInfo objects found in anchors and clickable elements."""
         links: List[LinkInfo] = []
+        # fields come straight from the DOM as strings, skip pydantic validation in this hot loop
+        make_link = LinkInfo.model_construct
 
         # <a href>
         anchors = page.eval_on_selector_all("a[href]", "els => els.map(e => ({href: e.getAttribute('href'), text: e.innerText}))")
@@ -25,7 +31,7 @@ class LinkExtractor:
             href = a.get("href") or ""
             txt = (a.get("text") or "").strip()
             if href:
-                links.append(LinkInfo(url=normalize_url(base_url, href), text=txt))
+                links.append(make_link(url=normalize_url(base_url, href), text=txt))
 
         # Elements with onclick containing window.location / location.href / open('...')
         onclicks = page.eval_on_selector_all("[onclick]", "els => els.map(e => e.getAttribute('onclick'))")
@@ -34,19 +40,19 @@ class LinkExtractor:
             # naive regex for URL-like strings in onclick
             m = re.findall(r"""['"](/[^'"]+|https?://[^'"]+)['"]""", oc)
             for cand in m:
-                links.append(LinkInfo(url=normalize_url(base_url, cand), text=""))
+                links.append(make_link(url=normalize_url(base_url, cand), text=""))
 
         # data-href / data-url
         data_links = page.eval_on_selector_all("[data-href], [data-url]", "els => els.map(e => e.getAttribute('data-href') || e.getAttribute('data-url'))")
         for d in data_links:
             if d:
-                links.append(LinkInfo(url=normalize_url(base_url, d), text=""))
+                links.append(make_link(url=normalize_url(base_url, d), text=""))
 
         # role="link" with aria href in dataset (rare but seen)
         role_links = page.eval_on_selector_all('[role="link"]', "els => els.map(e => ({txt: e.innerText, href: e.getAttribute('href')}))")
         for rl in role_links:
             if rl.get("href"):
-                links.append(LinkInfo(url=normalize_url(base_url, rl["href"]), text=(rl.get("txt") or "").strip()))
+                links.append(make_link(url=normalize_url(base_url, rl["href"]), text=(rl.get("txt") or "").strip()))
 
         # Clean dupes
         return deduplicate_by_key(links, lambda link: link.url)
@@ -72,7 +78,7 @@ class LinkExtractor:
 
         # Clean dupes
         return deduplicate_by_key(
-            [LinkInfo(url=url, text="") for url in pdf_embeds], 
+            [LinkInfo.model_construct(url=url, text="") for url in pdf_embeds], 
             lambda link: link.url
         )
 
@@ -84,6 +90,7 @@ class LinkExtractor:
 
         # 2) Find all links on the page and return them.
         html = page.content()
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html, "html.parser")
         links = self._extract_links_from_dom(page, task.url)
         pdf_links = self._extract_pdf_links_from_page(soup, task.url)
@@ -125,13 +132,21 @@ class LinkNoiseFilter:
             
             filtered_links.append(link)
 
-        # filter out the image links, we don't support them in this version
+        # image links are dropped unless their name or link text looks like a menu (ImagePageParser OCRs those)
         image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.ico'}
-        filtered_links = [link for link in filtered_links if not any(link.url.lower().endswith(ext) for ext in image_extensions)]
+        ocr_extensions = {'.jpg', '.jpeg', '.png'}
+        menu_images = []
+        web_links = []
+        for link in filtered_links:
+            url = link.url.lower()
+            if not any(url.endswith(ext) for ext in image_extensions):
+                web_links.append(link)
+            elif any(url.endswith(ext) for ext in ocr_extensions) and (is_menu_like(link.url) or MENU_URL_PATTERN.search(link.text)):
+                menu_images.append(link)
 
         # feed the rest of the links to the noise classifier
-        classified_links = self._noise_classifier.classify(filtered_links)
+        classified_links = self._noise_classifier.classify(web_links)
 
         # Return the filtered LinkInfo objects - the filtering is already done in the classifier
-        return classified_links
+        return classified_links + menu_images
 
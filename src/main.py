@@ -1,10 +1,16 @@
 from __future__ import annotations
-import argparse, sys, time
-from typing import List
+import argparse, os, sys, time
 from .input_manager import load_inputs
 from .crawler import SiteCrawler
 from .models import RestaurantResult, MenuItem
-from .output_generator import save_results
+from .output_generator import JsonlResultSink
+from .storage_state import StorageStateStore
+from .blob_store import BlobStore
+from .results_store import ResultsStore
+from .utils import safe_filename
+from .metrics import Timings, write_reports
+from .navigation import HostTimeouts, new_wait_stats
+from .profiling import SiteProfiler, write_summary
 
 def should_escalate(heuristic_candidates, min_conf=0.65) -> bool:
     if not heuristic_candidates:
@@ -26,30 +32,116 @@ def main():
     ap.add_argument("--out", default="output/output.json")
     ap.add_argument("--prompt", default="prompts/menu_agent_prompt.txt")
     ap.add_argument("--depth", type=int, default=3)
+    ap.add_argument("--storage-state-dir", default=None, help="per-domain browser storage state cache (default: $STORAGE_STATE_DIR)")
+    ap.add_argument("--no-storage-state", action="store_true", help="start every site with an empty browser context")
+    ap.add_argument("--blob-store-dir", default=None, help="downloaded documents with their text and verdicts (default: $BLOB_STORE_DIR)")
+    ap.add_argument("--no-blob-store", action="store_true", help="parse and classify every downloaded document again")
+    ap.add_argument("--graph-dir", default=None, help="write each site's crawl graph (how every menu was reached) to this directory")
+    ap.add_argument("--sink", default=None, help="streamed JSONL results, one restaurant per line (default: --out with .jsonl)")
+    ap.add_argument("--resume", action="store_true", help="skip restaurants already present in the sink")
+    ap.add_argument("--db", default=os.getenv("RESULTS_DB"), help="also record results in this SQLite store (cross-run history)")
+    ap.add_argument("--metrics", default=os.getenv("METRICS_OUT"), metavar="PATH",
+                    help="write per-stage timings (JSON) to PATH and a Prometheus text file next to it")
+    ap.add_argument("--profile", nargs="?", const=os.getenv("PROFILE_DIR", "output/profiles"), default=None, metavar="DIR",
+                    help="cProfile every crawl, one .prof file per restaurant in DIR (default: output/profiles)")
+    ap.add_argument("--profile-top", type=int, default=10, help="number of slowest sites / hottest functions to report")
+    har = ap.add_mutually_exclusive_group()
+    har.add_argument("--record", default=None, metavar="DIR", help="record every site's network traffic as HAR archives in DIR")
+    har.add_argument("--replay", default=None, metavar="DIR", help="crawl offline from HAR archives recorded with --record")
     args = ap.parse_args()
 
     restaurants, menutypes, formats = load_inputs(args.input, args.types, args.formats)
-    results: List[RestaurantResult] = []
+    sink = JsonlResultSink(args.sink or os.path.splitext(args.out)[0] + ".jsonl")
+    done = set()
+    if args.resume:
+        done = sink.completed_names()
+        print(f"[Resume] {len(done)} restaurants already in {sink.path}")
+    else:
+        sink.reset()
+    store = ResultsStore(args.db) if args.db else None
+    run_id = None
+    if store:
+        # a resumed run goes on recording into the run that crashed
+        run_id = store.unfinished_run_id(args.input) if args.resume else None
+        if run_id is None:
+            run_id = store.start_run(args.input)
+        else:
+            print(f"[Resume] Continuing run {run_id} in {args.db}")
+    # archives are recorded from, and replayed into, a clean browser context
+    har_root, har_mode = (args.record, "record") if args.record else (args.replay, "replay")
+    if har_root:
+        from .har_archive import HarArchive
+    use_storage_state = not (args.no_storage_state or har_root)
+    storage_state_store = StorageStateStore(args.storage_state_dir) if use_storage_state else None
+    # replays classify what was recorded, not what an earlier run decided
+    blob_store = None if args.no_blob_store or args.replay else BlobStore(args.blob_store_dir)
+
+    profiler = SiteProfiler(args.profile) if args.profile else None
+    if profiler and not args.resume:
+        profiler.reset()
+    run_timings = Timings()
+    site_timings = {}
+    site_memory = {}
+    waits = new_wait_stats()
 
     for name, url in restaurants.items():
+        if name in done:
+            continue
         print(f"\n[Processing]: {name} -> {url}")
-        res = RestaurantResult(name=name, url=url)
-        crawler = SiteCrawler(name, url, menutypes)
-        crawler.crawl_site()
+        har_archive = HarArchive(os.path.join(har_root, safe_filename(name)), har_mode) if har_root else None
+        if har_mode == "replay" and har_archive and not os.path.exists(har_archive.browser_har):
+            print(f"[Replay] No archive for {name} in {har_root}, skipping")
+            continue
+        crawler = SiteCrawler(name, url, menutypes, storage_state_store=storage_state_store, har_archive=har_archive,
+                              blob_store=blob_store)
+        if profiler:
+            profiler.run(name, crawler.crawl_site)
+        else:
+            crawler.crawl_site()
+        if args.graph_dir:
+            os.makedirs(args.graph_dir, exist_ok=True)
+            crawler.export_graph(os.path.join(args.graph_dir, f"{safe_filename(name)}.json"))
+
+        if crawler.timings is not None:
+            run_timings.merge(crawler.timings)
+            site_timings[name] = crawler.timings.summary()
+
+        memory = dict(crawler.stats["memory"], pages_recycled=crawler.stats["pages_recycled"],
+                      contexts_recycled=crawler.stats["contexts_recycled"])
+        site_memory[name] = memory
+        print(f"[Memory] {name}: rss {memory.get('rss_kb')} kB, browser {memory.get('browser_rss_kb')} kB, "
+              f"{memory['pages_recycled']} pages / {memory['contexts_recycled']} contexts recycled")
 
-        # TODO: let's not expose the crawler internals, wrap it in get function and shallow copy
-        res.cookie_banner_accept = crawler._cookie_accept
-        res.menus = crawler._menu_items
+        for key, value in crawler.stats["waits"].items():
+            waits[key] += value
 
-        if not res.menus:
-            res.status = "no_menus_found"
+        res = crawler.result()
 
-        results.append(res)
+        sink.append(res)
+        if store:
+            store.upsert_site(run_id, res, crawler.pages, crawler.menu_content_hashes())
 
-    save_results(args.out, results)
+    sink.close()
+    sink.finalize(args.out)
+    if store:
+        store.finish_run(run_id)
+        store.close()
     
     end_time = time.time()
     duration = end_time - start_time
+    if profiler:
+        print(write_summary(profiler.directory, args.profile_top))
+    if args.metrics:
+        write_reports(args.metrics, run_timings, site_timings, {
+            "duration": round(duration, 3),
+            "sites_crawled": len(site_timings),
+            "memory": site_memory,
+            "waits": waits,
+            "hosts": HostTimeouts.shared().snapshot(),
+        })
+        print(f"Stage timings written to {args.metrics}")
+    print(f"Navigation waits: {waits['timeouts']} timeouts, {waits['retries']} retries, "
+          f"{waits['skipped']} skipped by open circuits, {waits['ready_timeouts']} pages never settled")
     print(f"\n(I hope) Done. Saved in {args.out}")
     print(f"Total operation time: {duration:.2f} seconds")
 
@@ -0,0 +1,76 @@
+from __future__ import annotations
+from typing import Dict, List, Optional
+from .models import MenuItem
+from .utils import canonicalize_language, de_duplicate
+
+GENERIC_MENU_TYPE = "oct_menu"
+
+class MenuAccumulator:
+    """
+    Collects the MenuItems found on a site, merging duplicates as they arrive.
+
+    Items are indexed by canonical URL (language variants collapse) and by a content
+    fingerprint of the page they were classified from, so the same menu reached under
+    two URLs is kept once. On a merge the highest-confidence verdict wins and the
+    languages of both items are united.
+    """
+    # a specific menu found this deep with this confidence prunes the subtree below it
+    PRUNE_MIN_DEPTH = 2
+    PRUNE_MIN_CONFIDENCE = 0.7
+
+    def __init__(self, menutypes: Dict[str, str]):
+        self.menutypes = menutypes
+        self._items: List[MenuItem] = []
+        self._by_url: Dict[str, int] = {}
+        self._by_fingerprint: Dict[str, int] = {}
+        self._fingerprints: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def items(self) -> List[MenuItem]:
+        return list(self._items)
+
+    def add(self, item: MenuItem, fingerprint: Optional[str] = None) -> MenuItem:
+        """Merge item into the accumulator, returns the resulting (possibly merged) item."""
+        url_key = canonicalize_language(item.link)
+        slot = self._by_url.get(url_key)
+        if slot is None and fingerprint:
+            slot = self._by_fingerprint.get(fingerprint)
+
+        if slot is None:
+            slot = len(self._items)
+            self._items.append(item)
+            self._fingerprints.append(None)
+        else:
+            self._items[slot] = self._merge(self._items[slot], item)
+
+        self._by_url[url_key] = slot
+        if fingerprint:
+            self._by_fingerprint.setdefault(fingerprint, slot)
+            if self._fingerprints[slot] is None:
+                self._fingerprints[slot] = fingerprint
+        return self._items[slot]
+
+    def _merge(self, existing: MenuItem, incoming: MenuItem) -> MenuItem:
+        languages = de_duplicate(existing.languages + incoming.languages)
+        if incoming.confidence > existing.confidence:
+            # keep the first link we reached the menu under, take the better verdict
+            return incoming.model_copy(update={"link": existing.link, "languages": languages})
+        return existing.model_copy(update={"languages": languages})
+
+    def fingerprint_for(self, link: str) -> Optional[str]:
+        slot = self._by_url.get(canonicalize_language(link))
+        return None if slot is None else self._fingerprints[slot]
+
+    def is_confirmed_specific(self, item: MenuItem, depth: int) -> bool:
+        """
+        A specific (non generic "oct_menu") menu found with high confidence below the landing
+        pages: there is no need to crawl the pages below it.
+        """
+        return (
+            depth >= self.PRUNE_MIN_DEPTH and  # Don't prune below landing pages
+            item.confidence >= self.PRUNE_MIN_CONFIDENCE and
+            item.type_code != GENERIC_MENU_TYPE and
+            item.type_code in self.menutypes
+        )
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import json, os, time
+from array import array
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "")
+
+class Timings:
+    """
+    Wall-time samples per named stage. Samples are kept (as doubles) so percentiles
+    can be computed for a site and for the whole run after merging.
+    """
+    __slots__ = ("_samples",)
+
+    def __init__(self):
+        self._samples: Dict[str, array] = {}
+
+    def add(self, name: str, seconds: float):
+        samples = self._samples.get(name)
+        if samples is None:
+            # setdefault: spans of pipeline and download threads may add the first sample concurrently
+            samples = self._samples.setdefault(name, array("d"))
+        samples.append(seconds)
+
+    def merge(self, other: "Timings"):
+        for name, samples in other._samples.items():
+            self._samples.setdefault(name, array("d")).extend(samples)
+
+    def totals(self) -> Dict[str, float]:
+        return {name: sum(samples) for name, samples in self._samples.items()}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """name -> {count, total, p50, p95, max} in seconds."""
+        out = {}
+        for name in sorted(self._samples):
+            ordered = sorted(self._samples[name])
+            out[name] = {
+                "count": len(ordered),
+                "total": round(sum(ordered), 6),
+                "p50": round(_percentile(ordered, 50), 6),
+                "p95": round(_percentile(ordered, 95), 6),
+                "max": round(ordered[-1], 6),
+            }
+        return out
+
+    def to_prometheus(self, metric: str = "crawler_stage_seconds", labels: Optional[Dict[str, str]] = None) -> str:
+        """Prometheus text exposition: a summary with p50/p95 quantiles plus a max gauge per stage."""
+        extra = "".join(f',{k}="{_escape(v)}"' for k, v in (labels or {}).items())
+        lines = [
+            f"# HELP {metric} Wall time spent per crawl stage.",
+            f"# TYPE {metric} summary",
+        ]
+        summary = self.summary()
+        for name, s in summary.items():
+            stage = f'stage="{_escape(name)}"{extra}'
+            lines.append(f'{metric}{{{stage},quantile="0.5"}} {s["p50"]}')
+            lines.append(f'{metric}{{{stage},quantile="0.95"}} {s["p95"]}')
+            lines.append(f"{metric}_sum{{{stage}}} {s['total']}")
+            lines.append(f"{metric}_count{{{stage}}} {s['count']}")
+        lines.append(f"# HELP {metric}_max Slowest single span per crawl stage.")
+        lines.append(f"# TYPE {metric}_max gauge")
+        for name, s in summary.items():
+            lines.append(f'{metric}_max{{stage="{_escape(name)}"{extra}}} {s["max"]}')
+        return "\n".join(lines) + "\n"
+
+def _percentile(ordered, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Timings that spans in the current context record into; None means metrics are off
+_current: ContextVar[Optional[Timings]] = ContextVar("crawler_timings", default=None)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: Timings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.add(self.name, time.perf_counter() - self.started)
+        return False
+
+def span(name: str):
+    """
+    Time a block into the active Timings:
+
+        with span("pdf_download"):
+            ...
+
+    Outside collect() (or with METRICS_ENABLED=0) this returns a shared no-op.
+    """
+    timings = _current.get()
+    if timings is None:
+        return _NOOP
+    return _Span(timings, name)
+
+class collect:
+    """Make `timings` the target of span() for the current thread/context."""
+    __slots__ = ("timings", "_token")
+
+    def __init__(self, timings: Optional[Timings]):
+        self.timings = timings
+
+    def __enter__(self) -> Optional[Timings]:
+        self._token = _current.set(self.timings)
+        return self.timings
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        return False
+
+def write_reports(path: str, run: Timings, sites: Dict[str, Dict[str, Any]], extra: Optional[Dict[str, Any]] = None):
+    """
+    JSON summary at `path` ({"run": ..., "sites": {name: summary}}) and the run aggregate in
+    Prometheus text format next to it (same name, .prom extension).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload: Dict[str, Any] = dict(extra or {})
+    payload["run"] = run.summary()
+    payload["sites"] = sites
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    with open(os.path.splitext(path)[0] + ".prom", "w", encoding="utf-8") as f:
+        f.write(run.to_prometheus())
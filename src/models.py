@@ -48,6 +48,8 @@ class PageRecord(BaseModel):
     pdf_embeds: List[str] = Field(default_factory=list)
     has_menu_pdfs: bool = False
     call_stack: List[str] = Field(default_factory=list)
+    depth: int = 0
+    content_hash: Optional[str] = None
     error: Optional[str] = None
     
     def __str__(self) -> str:
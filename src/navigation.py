@@ -0,0 +1,257 @@
+from __future__ import annotations
+import os, threading, time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from .metrics import _percentile, span
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
+# Resolves once the body text reached `minChars` and the element count and text length
+# stopped changing for `stableMs` (or stayed unchanged for 4x that on text-less pages).
+READY_PROBE_JS = """
+([minChars, stableMs]) => {
+    const body = document.body;
+    if (!body) return false;
+    const size = body.getElementsByTagName('*').length;
+    const text = (body.innerText || '').length;
+    const now = performance.now();
+    const s = window.__crawlerReady || (window.__crawlerReady = {size: -1, text: -1, since: now});
+    if (s.size !== size || s.text !== text) {
+        s.size = size; s.text = text; s.since = now;
+        return false;
+    }
+    const stable = now - s.since;
+    return stable >= stableMs && (text >= minChars || stable >= 4 * stableMs);
+}
+"""
+
+# Starts a navigation from a timer, so evaluate() returns before the document is replaced
+PREFETCH_JS = "url => { setTimeout(() => { window.location.href = url; }, 0); }"
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+class NavigationSkipped(Exception):
+    """The host's circuit breaker is open, the navigation was not attempted."""
+
+class _Host:
+    __slots__ = ("latencies", "failures", "open_until")
+
+    def __init__(self, window: int):
+        self.latencies: deque = deque(maxlen=window)
+        self.failures = 0
+        self.open_until = 0.0
+
+class HostTimeouts:
+    """
+    Per-host navigation latency, timeouts derived from it and a circuit breaker.
+
+    The timeout of a host is its p95 navigation time times NAV_TIMEOUT_MULTIPLIER, clamped
+    to [NAV_TIMEOUT_MIN_MS, NAV_TIMEOUT_MAX_MS]; hosts with fewer than NAV_TIMEOUT_MIN_SAMPLES
+    navigations get NAV_TIMEOUT_MS. After NAV_BREAKER_FAILURES consecutive timeouts the host
+    is skipped for NAV_BREAKER_COOLDOWN_SECONDS, then one trial navigation is let through.
+    Shared by every crawler in the process (see shared()), so service workers learn together.
+    """
+    _shared: Optional["HostTimeouts"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.default_ms = _env_float("NAV_TIMEOUT_MS", 15000)
+        self.min_ms = _env_float("NAV_TIMEOUT_MIN_MS", 3000)
+        self.max_ms = _env_float("NAV_TIMEOUT_MAX_MS", 30000)
+        self.multiplier = _env_float("NAV_TIMEOUT_MULTIPLIER", 3)
+        self.min_samples = int(os.getenv("NAV_TIMEOUT_MIN_SAMPLES", "3"))
+        self.window = int(os.getenv("NAV_TIMEOUT_WINDOW", "50"))
+        self.breaker_failures = int(os.getenv("NAV_BREAKER_FAILURES", "3"))
+        self.breaker_cooldown = _env_float("NAV_BREAKER_COOLDOWN_SECONDS", 300)
+        self._hosts: Dict[str, _Host] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "HostTimeouts":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def host(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    def _get(self, host: str) -> _Host:
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = _Host(self.window)
+        return entry
+
+    def timeout_ms(self, host: str) -> float:
+        with self._lock:
+            latencies = sorted(self._get(host).latencies)
+        if len(latencies) < self.min_samples:
+            return self.default_ms
+        return min(self.max_ms, max(self.min_ms, _percentile(latencies, 95) * 1000 * self.multiplier))
+
+    def allow(self, host: str) -> bool:
+        """False while the host's breaker is open."""
+        with self._lock:
+            return self._get(host).open_until <= time.monotonic()
+
+    def record_success(self, host: str, seconds: float):
+        with self._lock:
+            entry = self._get(host)
+            entry.latencies.append(seconds)
+            entry.failures = 0
+            entry.open_until = 0.0
+
+    def record_timeout(self, host: str):
+        with self._lock:
+            entry = self._get(host)
+            entry.failures += 1
+            if self.breaker_failures and entry.failures >= self.breaker_failures:
+                entry.open_until = time.monotonic() + self.breaker_cooldown
+                print(f"[Navigation] {entry.failures} timeouts in a row on {host}, skipping it for {self.breaker_cooldown:.0f}s")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """host -> {samples, p50_ms, p95_ms, timeout_ms, failures, open}"""
+        now = time.monotonic()
+        with self._lock:
+            hosts = {host: (sorted(e.latencies), e.failures, e.open_until > now) for host, e in self._hosts.items()}
+        out = {}
+        for host, (latencies, failures, is_open) in sorted(hosts.items()):
+            out[host] = {
+                "samples": len(latencies),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+                "timeout_ms": round(self.timeout_ms(host)),
+                "failures": failures,
+                "open": is_open,
+            }
+        return out
+
+def new_wait_stats() -> Dict[str, int]:
+    return {"timeouts": 0, "retries": 0, "skipped": 0, "ready_timeouts": 0}
+
+def navigate(page: Page, url: str, timeouts: HostTimeouts, waits: Dict[str, int]) -> int:
+    """
+    Navigate to `url` and wait until the page is ready to read. Returns the number of
+    navigations made (a timed out load is retried once with `commit` and twice the timeout).
+    Raises NavigationSkipped when the host's breaker is open, other errors propagate.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    host = HostTimeouts.host(url)
+    if not timeouts.allow(host):
+        waits["skipped"] += 1
+        raise NavigationSkipped(f"circuit open for {host}")
+    timeout = timeouts.timeout_ms(host)
+    started = time.perf_counter()
+    try:
+        page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+        timeouts.record_success(host, time.perf_counter() - started)
+        navigations = 1
+    except PlaywrightTimeoutError:
+        waits["timeouts"] += 1
+        # the document may be usable long before slow subresources finish
+        waits["retries"] += 1
+        try:
+            page.goto(url, wait_until="commit", timeout=min(timeouts.max_ms, 2 * timeout))
+        except PlaywrightTimeoutError:
+            # only navigations that fail completely count towards the breaker
+            waits["timeouts"] += 1
+            timeouts.record_timeout(host)
+            raise
+        timeouts.record_success(host, time.perf_counter() - started)
+        navigations = 2
+    wait_until_ready(page, waits)
+    return navigations
+
+def wait_until_ready(page: Page, waits: Dict[str, int]):
+    """DOM stable + text present probe; a page that never settles is read as it is."""
+    min_chars = int(os.getenv("READY_MIN_TEXT_CHARS", "200"))
+    stable_ms = int(os.getenv("READY_STABLE_MS", "300"))
+    with span("ready_probe"):
+        try:
+            page.wait_for_function(READY_PROBE_JS, arg=[min_chars, stable_ms], polling=100,
+                                   timeout=_env_float("READY_TIMEOUT_MS", 3000))
+        except Exception:
+            waits["ready_timeouts"] += 1
+
+class TabPrefetcher:
+    """
+    Spare tabs that start loading the next frontier URLs (at most PREFETCH_TABS at a time)
+    while the crawl thread extracts links and waits on the LLM stages. The sync Playwright API
+    can't wait on two navigations at once, so a prefetch only tells the tab where to go and the
+    browser loads it in the background; take() waits for whatever is left of the load.
+    """
+    def __init__(self, tabs: Optional[int] = None):
+        self.tabs = tabs if tabs is not None else int(os.getenv("PREFETCH_TABS", "2"))
+        # url -> (tab, url of the tab before the prefetch, start time)
+        self._loading: Dict[str, Tuple[Page, str, float]] = {}
+        self._spare: List[Page] = []
+        self.stats = {"started": 0, "used": 0, "wasted": 0}
+
+    def prefetch(self, ctx, urls: Iterable[str], timeouts: HostTimeouts):
+        """Start loading `urls` (in order) in spare tabs of `ctx` until all tabs are busy."""
+        for url in urls:
+            if len(self._loading) >= self.tabs:
+                break
+            if url in self._loading or not timeouts.allow(HostTimeouts.host(url)):
+                continue
+            page = self._spare.pop() if self._spare else ctx.new_page()
+            try:
+                before = page.url
+                page.evaluate(PREFETCH_JS, url)
+            except Exception:
+                _close(page)
+                continue
+            self._loading[url] = (page, before, time.perf_counter())
+            self.stats["started"] += 1
+
+    def keep(self, urls: Iterable[str]):
+        """
+        Give up the prefetches of URLs no longer among `urls` (pruned, or overtaken by seeds).
+        Their tabs are closed: one still loading the dropped URL would satisfy a later take().
+        """
+        wanted = set(urls)
+        for url in [url for url in self._loading if url not in wanted]:
+            _close(self._loading.pop(url)[0])
+            self.stats["wasted"] += 1
+
+    def take(self, url: str, timeouts: HostTimeouts, waits: Dict[str, int]) -> Optional[Page]:
+        """
+        The tab prefetching `url` once it is ready to read, None if there is none or its load
+        failed (the caller then navigates as usual). The tab belongs to the caller afterwards.
+        """
+        entry = self._loading.pop(url, None)
+        if entry is None:
+            return None
+        page, before, started = entry
+        host = HostTimeouts.host(url)
+        remaining = max(1000.0, timeouts.timeout_ms(host) - (time.perf_counter() - started) * 1000)
+        try:
+            page.wait_for_url(lambda current: current != before, wait_until="domcontentloaded", timeout=remaining)
+        except Exception:
+            _close(page)
+            self.stats["wasted"] += 1
+            return None
+        # not recorded as the host's latency: the load also spent time waiting for the browser
+        wait_until_ready(page, waits)
+        self.stats["used"] += 1
+        return page
+
+    def release(self, page: Page):
+        """Hand a tab of the current context that finished loading back as a spare one."""
+        self._spare.append(page)
+
+    def reset(self):
+        """Forget all tabs, e.g. when their context is closed."""
+        self.stats["wasted"] += len(self._loading)
+        self._loading.clear()
+        self._spare.clear()
+
+def _close(page: Page):
+    try:
+        page.close()
+    except Exception:
+        pass
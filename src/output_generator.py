@@ -1,8 +1,118 @@
 import json
-from typing import List
+import os
+from typing import Dict, Iterator, List, Optional, Set
 from .models import RestaurantResult, MenuItem
 
 def save_results(path: str, results: List[RestaurantResult]):
     payload = {"restaurants": [r.model_dump() for r in results]}
     with open(path, "w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
+
+class JsonlResultSink:
+    """
+    Crash-safe streaming sink: one RestaurantResult per line, appended as each site finishes.
+
+    Lines are flushed immediately and fsync'ed every `fsync_every` results (and on close),
+    so a crash loses at most the last unsynced batch. A torn last line is ignored on read.
+    """
+    def __init__(self, path: str, fsync_every: Optional[int] = None):
+        self.path = path
+        self.fsync_every = max(1, fsync_every or int(os.getenv("RESULT_SINK_FSYNC_EVERY", "10")))
+        self._unsynced = 0
+        self._file = None
+
+    def __enter__(self) -> "JsonlResultSink":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._repair_torn_tail()
+        return self._file
+
+    def reset(self):
+        """Start a fresh run: drop results streamed by a previous run."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _repair_torn_tail(self):
+        # a crash mid-write can leave a line without its newline, start on a fresh line
+        if self._file.tell() == 0:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                self._file.write("\n")
+
+    def append(self, result: RestaurantResult):
+        f = self._open()
+        f.write(json.dumps(result.model_dump(), ensure_ascii=False) + "\n")
+        f.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def _index(self) -> Dict[str, int]:
+        """Map restaurant name -> byte offset of its latest valid line (later lines win)."""
+        index: Dict[str, int] = {}
+        if not os.path.exists(self.path):
+            return index
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    try:
+                        index[json.loads(line)["name"]] = offset
+                    except Exception:
+                        # torn write from a crash, the restaurant will be crawled again on resume
+                        pass
+                offset += len(line)
+        return index
+
+    def read(self) -> Iterator[RestaurantResult]:
+        """Yield stored results one at a time, without holding the whole run in memory."""
+        index = self._index()
+        if not index:
+            return
+        with open(self.path, "rb") as f:
+            for offset in sorted(index.values()):
+                f.seek(offset)
+                yield RestaurantResult.model_validate_json(f.readline())
+
+    def completed_names(self) -> Set[str]:
+        return set(self._index())
+
+    def finalize(self, out_path: str):
+        """Write the classic {"restaurants": [...]} document from the streamed results."""
+        self.sync()
+        directory = os.path.dirname(out_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # stream the document out instead of materializing every result at once
+        tmp = out_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write('{\n  "restaurants": [')
+            for i, result in enumerate(self.read()):
+                body = json.dumps(result.model_dump(), ensure_ascii=False, indent=2)
+                f.write(("," if i else "") + "\n    " + body.replace("\n", "\n    "))
+            f.write("\n  ]\n}")
+        os.replace(tmp, out_path)
@@ -1,33 +1,56 @@
-from typing import List, Optional, Set, Dict, Tuple
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Optional, Set, Dict, Tuple
 from .models import LinkInfo, MenuItem
 import re
 import os
+import urllib.parse
 from .models import CrawlTask, LinkInfo, PageRecord
-from bs4 import BeautifulSoup
-import fitz
-import requests
-import io
-from langdetect import detect as lang_detect
-from .utils import guess_languages_from_text
-from playwright.sync_api import Page
+from .utils import content_fingerprint
+from .language_id import detect_languages
 from .agent import MenuClassifier
+from .metrics import span
+from .pdf_fetcher import PDFFetcher
+from .pdf_analysis import PDFAnalysis, PDFAnalysisPool
+from .blob_store import BlobStore, sha256
+from .image_ocr import NON_MENU_IMAGE, ImageAnalysis, ImageOCRPool, OCRBudget
+from .response_capture import CapturedResponse, ResponseCapture
+
+if TYPE_CHECKING:
+    import requests
+    from playwright.sync_api import Page
 
 class PageParserBase:
     """
     Base class for page parsers. Page parsers are used to parse the page, discover the menu items.
 
     """
-    def __init__(self, page: Page, parent_link: CrawlTask, menutypes: Dict[str, str]):
+    def __init__(self, page: Page, parent_link: CrawlTask, menutypes: Dict[str, str],
+                 http_session: Optional[requests.Session] = None):
         self.page = page
         self.parent_link = parent_link
         self.menutypes = menutypes
+        # downloads outside the browser go through this session (e.g. HAR record/replay), or plain requests
+        if http_session is None:
+            import requests as http_session
+        self.http = http_session
+        # hash of the text the verdict was made on, set by parse() when available
+        self.content_fingerprint: Optional[str] = None
 
     def parse(self) -> Optional[MenuItem]:
         raise NotImplementedError("Subclasses must implement this method")
 
 class PageParserFactory:
-    def __init__(self, menutypes: Dict[str, str]):
+    def __init__(self, menutypes: Dict[str, str], http_session: Optional[requests.Session] = None,
+                 blob_store: Optional[BlobStore] = None, capture: Optional[ResponseCapture] = None):
         self.menutypes = menutypes
+        self.http_session = http_session
+        self.blob_store = blob_store
+        # bodies the browser already received, looked up before downloading
+        self.capture = capture
+        # shared by all PDF parsers of the crawl, keeps the transfer totals
+        self.pdf_fetcher = PDFFetcher(http_session)
+        # shared by all image parsers of the crawl: the per-site OCR budget
+        self.ocr_budget = OCRBudget()
 
     def _is_special_accomodation_site(self, url: str) -> bool:
         return url.endswith("//gamper-restaurant.ch/")
@@ -39,11 +62,13 @@ class PageParserFactory:
 
         # checking if the link is a pdf (oversimplified)       
         if parent_link.url.endswith(".pdf"):
-            return PDFPageParser(page, parent_link, self.menutypes)
+            return PDFPageParser(page, parent_link, self.menutypes, self.http_session, pdf_fetcher=self.pdf_fetcher,
+                                 blob_store=self.blob_store, capture=self.capture)
         
         # naive image check
         if any(parent_link.url.endswith(ext) for ext in [".png",".jpg",".jpeg",".webp"]):
-            return ImagePageParser(page, parent_link, self.menutypes)
+            return ImagePageParser(page, parent_link, self.menutypes, self.http_session, budget=self.ocr_budget,
+                                   capture=self.capture)
 
         return WebPageParser(page, parent_link, self.menutypes)
     
@@ -74,125 +99,131 @@ class CustomPageParser(PageParserBase):
     
 class WebPageParser(PageParserBase):    
     def _safe_get_text_from_html(self, html: str, max_chars: int = 3500) -> str:
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html or "", "html.parser")
         text = soup.get_text(separator="\n", strip=True)
         if max_chars and len(text) > max_chars:
             return text[:max_chars]
         return text
 
-    def parse(self) -> Optional[MenuItem]:
-        # the page was already loaded in the crawler
-        # Feed the text to the classifier
-        #   yes: return the menu item
-        #   no: return None
+    def extract(self) -> Dict[str, str]:
+        """URL, text and title of the loaded page as the classifier takes them; sets the content fingerprint."""
         html = self.page.content()
-        text = self._safe_get_text_from_html(html)
+        with span("html_parse"):
+            text = self._safe_get_text_from_html(html)
+        self.content_fingerprint = content_fingerprint(text)
+        return {"page_url": self.parent_link.url, "page_text": text, "page_title": self.page.title()}
+
+    def classify(self, page: Dict[str, str]) -> Optional[MenuItem]:
+        """Verdict on what extract() returned. Needs no browser, so it may run off the crawl thread."""
         # Create a temporary MenuClassifier instance using the centralized menutypes
-        menu_item = MenuClassifier(self.menutypes).classify(
+        return MenuClassifier(self.menutypes).classify(
             site_name="Restaurant",  # We don't have site name in CrawlTask
             site_url=self.parent_link.url,
-            page_url=self.parent_link.url,
-            page_text=text,
-            page_title=self.page.title(),
+            page_url=page["page_url"],
+            page_text=page["page_text"],
+            page_title=page["page_title"],
             menutypes=self.menutypes,
         )
 
-        return menu_item
+    def parse(self) -> Optional[MenuItem]:
+        # the page was already loaded in the crawler
+        # Feed the text to the classifier
+        #   yes: return the menu item
+        #   no: return None
+        return self.classify(self.extract())
 
 class PDFPageParser(PageParserBase):
-    def _extract_pdf_first_page_text(self, pdf_url: str, timeout: int = 10, max_bytes: int = None) -> Tuple[str, Optional[str]]:
+    def __init__(self, page: Page, parent_link: CrawlTask, menutypes: Dict[str, str],
+                 http_session: Optional[requests.Session] = None, pdf_fetcher: Optional[PDFFetcher] = None,
+                 blob_store: Optional[BlobStore] = None, capture: Optional[ResponseCapture] = None):
+        super().__init__(page, parent_link, menutypes, http_session)
+        self.pdf_fetcher = pdf_fetcher or PDFFetcher(http_session)
+        self.blob_store = blob_store
+        self.capture = capture
+        # "analysis" or "verdict" when the document was known to the blob store
+        self.reused: Optional[str] = None
+        # below this much text the first page is taken for a cover and more of the PDF is fetched
+        self.min_text_chars = int(os.getenv("PDF_MIN_TEXT_CHARS", "200"))
+
+    def analyze(self, timeout: int = 10) -> PDFAnalysis:
         """
-        Download up to max_bytes (default from config) and extract text from first page.
-        Returns tuple of (text, content_disposition) on success, ("", None) on failure.
+        Fetch the PDF (ranged where possible, at most MAX_PDF_BYTES) and sample its text in the
+        analysis pool. A first page without text (e.g. a cover image) fetches more of the document.
+        Bytes already in the blob store are not analyzed again, and a PDF the browser received
+        (e.g. in an embedded viewer) is not downloaded again. Never raises; a failed download
+        gives an empty analysis.
         """
-        max_bytes = max_bytes or int(os.getenv("MAX_PDF_BYTES", 1_000_000))
+        pdf_url = self.parent_link.url
+        pool = PDFAnalysisPool.shared()
+        captured = self.capture.get(pdf_url, "pdf") if self.capture is not None else None
         try:
-            r = requests.get(pdf_url, stream=True, timeout=timeout)
-            r.raise_for_status()
-            
-            # Capture Content-Disposition header
-            content_disposition = r.headers.get('Content-Disposition')
-            
-            content = io.BytesIO()
-            read = 0
-            for chunk in r.iter_content(16_384):
-                if not chunk:
-                    break
-                content.write(chunk)
-                read += len(chunk)
-                if read >= max_bytes:
-                    break
-            content.seek(0)
-            pdf_bytes = content.read()
-            
-            # Try opening with fitz
-            try:
-                with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-                    if doc.page_count == 0:
-                        # Try to get any text from the document
-                        try:
-                            # Sometimes PDFs have text but 0 pages reported
-                            full_text = ""
-                            for page_num in range(max(1, doc.page_count)):
-                                try:
-                                    page_text = doc.load_page(page_num).get_text("text")
-                                    if page_text:
-                                        full_text += page_text + "\n"
-                                except Exception as e:
-                                    print(f"Error loading page {page_num}: {e}")
-                            if full_text.strip():
-                                return full_text[:3500], content_disposition  # Apply our 3.5K limit
-                        except Exception as e:
-                            print(f"Error: Error loading page {page_num}: {e}")
-                        return "", content_disposition
-                    else:
-                        txt = doc.load_page(0).get_text("text") or ""
-                        
-                        # small safety cap
-                        max_chars = int(os.getenv("MAX_PDF_TEXT_CHARS", 3500))
-                        if len(txt) > max_chars:
-                            txt = txt[:max_chars]
-
-                        print(f"[PDF PageParser] Extracted PDF text from {pdf_url}:")
-                        # print("-" * 50)
-                        # print(txt)
-                        # print("-" * 50)
-                        # print(f"[PDF PageParser] ----------------------------")
-                    
-                        return txt, content_disposition
-            except Exception as e:
-                print(f"[PDF PageParser] Error opening PDF with fitz: {e}")
-                return "", content_disposition
+            if captured is not None:
+                print(f"[PDF PageParser] Using the {len(captured.body)} bytes the browser received for {pdf_url}")
+                return self._analyze(captured.body, captured.content_disposition, pool)
+            with span("pdf_download"):
+                fetched = self.pdf_fetcher.fetch(pdf_url, timeout=timeout)
+            print(f"[PDF PageParser] Fetched {fetched.bytes_transferred} bytes of {fetched.size or 'unknown'} "
+                  f"({fetched.strategy}, {fetched.requests} requests)")
+            analysis = self._analyze(fetched.data, fetched.content_disposition, pool)
+            if len(analysis.text) < self.min_text_chars and fetched.strategy == "linearized":
+                first_page = fetched.data
+                with span("pdf_download"):
+                    fetched = self.pdf_fetcher.fetch(pdf_url, timeout=timeout, first_page_only=False)
+                analysis = self._analyze(fetched.data, fetched.content_disposition, pool)
+                if self.blob_store is not None:
+                    # next time the first page fetch leads straight to the full document's text
+                    self.blob_store.put(sha256(first_page), first_page, self._stored_analysis(analysis))
+            print(f"[PDF PageParser] Extracted {len(analysis.text)} chars from pages {analysis.pages} "
+                  f"of {analysis.page_count} in {pdf_url}")
+            return analysis
         except Exception as e:
             print(f"Error: Failed to extract text from PDF: {pdf_url}")
             print(f"Error details: {type(e).__name__}: {str(e)}")
-            return "", None
-        
-    def detect_languages(self, text: str) -> list[str]:
-        if not text or len(text) < 50:
-            return guess_languages_from_text(text)
-        langs = []
-        try:
-            lang = lang_detect(text)
-            langs.append(lang[:2])
-        except Exception:
-            pass
-        # heuristic enrich
-        langs = list(dict.fromkeys(langs + guess_languages_from_text(text)))
-        return langs or ["unknown"]
+            return PDFAnalysis()
 
-    def parse(self) -> Optional[MenuItem]:
-        # Load beginning of the PDF
-        text, content_disposition = self._extract_pdf_first_page_text(self.parent_link.url)
-        languages = self.detect_languages(text)
+    @staticmethod
+    def _stored_analysis(analysis: PDFAnalysis) -> Dict:
+        return {"text": analysis.text, "page_count": analysis.page_count, "pages": analysis.pages,
+                "digest": analysis.digest}
 
-        # Get page title safely - for PDFs, the page might not be navigated to the URL
-        try:
-            page_title = self.page.title()
-        except Exception:
-            page_title = "PDF Document"
-            
-        menu_item = MenuClassifier(self.menutypes).classify(
+    def _analyze(self, data: bytes, content_disposition: Optional[str], pool: PDFAnalysisPool) -> PDFAnalysis:
+        """Analysis of fetched bytes, taken from the blob store when the same bytes were seen before."""
+        digest = sha256(data)
+        if self.blob_store is not None:
+            entry = self.blob_store.get(digest)
+            if entry:
+                self.reused = "analysis"
+                stored = entry["analysis"]
+                return PDFAnalysis(stored["text"], stored["page_count"], content_disposition, stored["pages"],
+                                   stored.get("digest") or digest)
+        with span("pdf_extract"):
+            analysis = pool.analyze(data, content_disposition)
+        analysis.digest = digest
+        if self.blob_store is not None and analysis.page_count:
+            self.blob_store.put(digest, data, self._stored_analysis(analysis))
+        return analysis
+
+    def classify(self, analysis: PDFAnalysis, page_title: str = "PDF Document") -> Optional[MenuItem]:
+        """
+        Menu verdict on an analysis; split from analyze() so the crawler can fetch PDFs in the
+        background. Verdicts on stored documents are reused while the classifier is unchanged.
+        """
+        text, content_disposition = analysis.text, analysis.content_disposition
+        self.content_fingerprint = content_fingerprint(text)
+        classifier = MenuClassifier(self.menutypes)
+        store = self.blob_store if analysis.digest else None
+        if store is not None:
+            found, verdict = store.verdict(analysis.digest, classifier.cache_key())
+            if found:
+                self.reused = "verdict"
+                print(f"[PDF PageParser] Reusing the stored verdict for {self.parent_link.url}")
+                if verdict is None:
+                    return None
+                return MenuItem(link=self.parent_link.url, content_disposition=content_disposition, **verdict)
+        languages = detect_languages(text)
+
+        menu_item = classifier.classify(
             site_name="Restaurant",  # We don't have site name in CrawlTask
             site_url=self.parent_link.url,
             page_url=self.parent_link.url,
@@ -211,12 +242,150 @@ class PDFPageParser(PageParserBase):
                 format="pdf",
                 languages=languages,
                 confidence=0.8,  # High confidence for PDFs since they're likely menus
-                notes=f"PDF document with {len(text)} characters of text",
+                notes=f"PDF document with {analysis.page_count} pages, {len(text)} characters of text",
                 content_disposition=content_disposition
             )
 
+        # a classifier error is no verdict, the document is classified again next time
+        if store is not None and not classifier.failed:
+            verdict = menu_item.model_dump(exclude={"link", "content_disposition"}) if menu_item else None
+            store.set_verdict(analysis.digest, classifier.cache_key(), verdict)
         return menu_item
-    
+
+    def page_title(self) -> str:
+        # Get page title safely - for PDFs, the page might not be navigated to the URL
+        try:
+            return self.page.title()
+        except Exception:
+            return "PDF Document"
+
+    def parse(self) -> Optional[MenuItem]:
+        return self.classify(self.analyze(), self.page_title())
+
 class ImagePageParser(PageParserBase):
+    """
+    Image-only menus (scans, photos of the menu board). The image is downloaded with size
+    limits, then downscaled, binarized and OCRed in the OCR worker pool, and the text goes to
+    MenuClassifier. Logos and thumbnails (by name and size) and photos with little text are
+    skipped before OCR. At most IMAGE_OCR_MAX_PER_SITE images per site are analyzed.
+    """
+    def __init__(self, page: Page, parent_link: CrawlTask, menutypes: Dict[str, str],
+                 http_session: Optional[requests.Session] = None, budget: Optional[OCRBudget] = None,
+                 capture: Optional[ResponseCapture] = None):
+        super().__init__(page, parent_link, menutypes, http_session)
+        self.budget = budget or OCRBudget()
+        self.capture = capture
+        self.min_bytes = int(os.getenv("IMAGE_MIN_BYTES", 10_000))
+        self.max_bytes = int(os.getenv("IMAGE_MAX_BYTES", 5_000_000))
+        self.min_text_chars = int(os.getenv("IMAGE_MIN_TEXT_CHARS", "80"))
+
+    def _download(self, timeout: int) -> Tuple[Optional[bytes], Optional[str]]:
+        """(image bytes, None) or (None, reason it was not downloaded). Images the browser received aren't downloaded again."""
+        captured = self.capture.get(self.parent_link.url, "image") if self.capture is not None else None
+        if captured is not None:
+            if len(captured.body) > self.max_bytes:
+                return None, "large"
+            return (captured.body, None) if len(captured.body) >= self.min_bytes else (None, "small")
+        r = self.http.get(self.parent_link.url, stream=True, timeout=timeout)
+        with r:
+            r.raise_for_status()
+            if not r.headers.get("Content-Type", "image/").lower().startswith("image/"):
+                return None, "unsupported"
+            length = int(r.headers.get("Content-Length") or 0)
+            if length and length < self.min_bytes:
+                return None, "small"
+            if length > self.max_bytes:
+                return None, "large"
+            chunks, read = [], 0
+            for chunk in r.iter_content(65_536):
+                chunks.append(chunk)
+                read += len(chunk)
+                if read > self.max_bytes:
+                    return None, "large"
+        data = b"".join(chunks)
+        return (data, None) if len(data) >= self.min_bytes else (None, "small")
+
+    def analyze(self, timeout: int = 10) -> ImageAnalysis:
+        """Download and OCR the image; never raises, a skipped image has `skipped` set."""
+        url = self.parent_link.url
+        pool = ImageOCRPool.shared()
+        if NON_MENU_IMAGE.search(urllib.parse.urlparse(url).path.rsplit("/", 1)[-1]):
+            return ImageAnalysis(skipped="name")
+        if not pool.available():
+            return ImageAnalysis(skipped="no_ocr")
+        try:
+            with span("image_download"):
+                data, reason = self._download(timeout)
+        except Exception as e:
+            print(f"[Image PageParser] Failed to download {url}: {type(e).__name__}: {e}")
+            return ImageAnalysis(skipped="download")
+        if data is None:
+            return ImageAnalysis(skipped=reason)
+        if not self.budget.take():
+            return ImageAnalysis(skipped="budget")
+        with span("image_ocr"):
+            return pool.analyze(data)
+
+    def classify(self, analysis: ImageAnalysis, page_title: str = "Image") -> Optional[MenuItem]:
+        url = self.parent_link.url
+        if analysis.skipped is None and len(analysis.text) < self.min_text_chars:
+            analysis.skipped = "no_text"
+        if analysis.skipped:
+            self.budget.skip(analysis.skipped)
+            print(f"[Image PageParser] Skipped {url}: {analysis.skipped}")
+            return None
+        print(f"[Image PageParser] OCR found {len(analysis.text)} chars in {url} ({analysis.width}x{analysis.height})")
+        self.content_fingerprint = content_fingerprint(analysis.text)
+        menu_item = MenuClassifier(self.menutypes).classify(
+            site_name="Restaurant",
+            site_url=url,
+            page_url=url,
+            page_text=analysis.text,
+            page_title=page_title,
+            menutypes=self.menutypes,
+        )
+        if menu_item is not None:
+            menu_item.format = "image"
+        return menu_item
+
+    def page_title(self) -> str:
+        # images are not navigated to, this is the title of the page linking to them
+        try:
+            return self.page.title()
+        except Exception:
+            return "Image"
+
+    def parse(self) -> Optional[MenuItem]:
+        return self.classify(self.analyze(), self.page_title())
+
+class JSONPageParser(PageParserBase):
+    """
+    Menu data an SPA loaded as JSON, seen by the response capture rather than linked. Its dish
+    lines are classified like page text, and a menu found this way is linked to the page that
+    loaded the data, as an integrated menu.
+    """
+    def __init__(self, page: Page, parent_link: CrawlTask, menutypes: Dict[str, str], captured: CapturedResponse):
+        super().__init__(page, parent_link, menutypes)
+        self.captured = captured
+
+    def extract(self) -> Dict[str, str]:
+        self.content_fingerprint = content_fingerprint(self.captured.menu_text)
+        return {"page_url": self.captured.url, "page_text": self.captured.menu_text,
+                "page_title": f"Menu data loaded by {self.captured.page_url or 'the page'}"}
+
+    def classify(self, page: Dict[str, str]) -> Optional[MenuItem]:
+        menu_item = MenuClassifier(self.menutypes).classify(
+            site_name="Restaurant",
+            site_url=self.parent_link.url,
+            page_url=page["page_url"],
+            page_text=page["page_text"],
+            page_title=page["page_title"],
+            menutypes=self.menutypes,
+        )
+        if menu_item is not None:
+            menu_item.link = self.captured.page_url or self.captured.url
+            menu_item.format = "integrated"
+        return menu_item
+
     def parse(self) -> Optional[MenuItem]:
-        raise NotImplementedError("Ax example of a bespoke parser; not implemented")
\ No newline at end of file
+        return self.classify(self.extract())
@@ -0,0 +1,80 @@
+from __future__ import annotations
+import os, re
+from typing import List, Optional
+from .worker_pool import ProcessWorkerPool
+
+# prices, currencies and menu words; a page dense in these is a menu page
+MENU_SIGNAL = re.compile(
+    r"\b\d{1,3}[.,]\d{2}\b|\b(?:chf|fr\.|eur)\b|speisekarte|vorspeise|hauptgang|dessert|"
+    r"men[uü]|carte|wein|wine|entrée|plat\b|antipast|primi|secondi|dolci",
+    re.IGNORECASE,
+)
+
+class PDFAnalysis:
+    """What the crawler learns from a PDF: sampled text, page count and the download's Content-Disposition."""
+    __slots__ = ("text", "page_count", "content_disposition", "pages", "digest")
+
+    def __init__(self, text: str = "", page_count: int = 0, content_disposition: Optional[str] = None,
+                 pages: Optional[List[int]] = None, digest: Optional[str] = None):
+        self.text = text
+        self.page_count = page_count
+        self.content_disposition = content_disposition
+        self.pages = pages or []  # indexes of the pages the text was taken from
+        self.digest = digest  # SHA-256 of the fetched bytes the text came from, set by the parser
+
+def analyze_pdf(data: bytes, content_disposition: Optional[str] = None, max_chars: int = 3500,
+                max_pages: int = 8, min_signal: int = 8) -> PDFAnalysis:
+    """
+    Read up to `max_pages` pages in order, stopping early once `max_chars` of text with at least
+    `min_signal` menu signals (prices, menu words) were seen. The text is taken from the sampled
+    pages with the most text, in document order, up to `max_chars`, so a cover page doesn't
+    crowd out the menu. Runs in the analysis worker processes.
+    """
+    import fitz
+    result = PDFAnalysis(content_disposition=content_disposition)
+    try:
+        doc = fitz.open(stream=data, filetype="pdf")
+    except Exception as e:
+        print(f"[PDF PageParser] Error opening PDF with fitz: {e}")
+        return result
+    with doc:
+        result.page_count = doc.page_count
+        sampled = []
+        chars = signal = 0
+        for index in range(min(doc.page_count, max_pages)):
+            try:
+                text = (doc.load_page(index).get_text("text") or "").strip()
+            except Exception:
+                continue  # e.g. a page outside the ranges fetched
+            if not text:
+                continue
+            sampled.append((index, text))
+            chars += len(text)
+            signal += len(MENU_SIGNAL.findall(text))
+            if chars >= max_chars and signal >= min_signal:
+                break
+    chosen, budget = [], max_chars
+    for index, text in sorted(sampled, key=lambda p: -len(p[1])):
+        if budget <= 0:
+            break
+        chosen.append((index, text[:budget]))
+        budget -= len(text) + 1
+    chosen.sort()
+    result.text = "\n".join(text for _, text in chosen)[:max_chars]
+    result.pages = [index for index, _ in chosen]
+    return result
+
+class PDFAnalysisPool(ProcessWorkerPool):
+    """PyMuPDF text extraction in worker processes; PDF_ANALYSIS_WORKERS=0 analyzes in the calling thread."""
+    workers_env = "PDF_ANALYSIS_WORKERS"
+    label = "PDF"
+
+    def __init__(self, workers: Optional[int] = None):
+        super().__init__(workers)
+        self.max_chars = int(os.getenv("MAX_PDF_TEXT_CHARS", 3500))
+        self.max_pages = int(os.getenv("PDF_SAMPLE_MAX_PAGES", "8"))
+        self.min_signal = int(os.getenv("PDF_MENU_SIGNAL", "8"))
+
+    def analyze(self, data: bytes, content_disposition: Optional[str] = None) -> PDFAnalysis:
+        return self.run(analyze_pdf, data, content_disposition, self.max_chars, self.max_pages, self.min_signal,
+                        default=PDFAnalysis(content_disposition=content_disposition))
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import os, re, threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+_LINEARIZED = re.compile(rb"/Linearized\b(.*?)>>", re.S)
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+def parse_linearization(head: bytes) -> Optional[Dict[str, int]]:
+    """/L (file length), /E (end of the first page section), /T (main xref offset), /N (pages) and /O
+    (first page object) of a linearized PDF, None if the document is not linearized."""
+    match = _LINEARIZED.search(head[:2048])
+    if not match:
+        return None
+    params = {}
+    for key in ("L", "E", "T", "N", "O"):
+        value = re.search(rb"/" + key.encode() + rb"\s+(\d+)", match.group(1))
+        if value:
+            params[key] = int(value.group(1))
+    return params if {"L", "E"} <= params.keys() else None
+
+class PDFFetch:
+    """Bytes of a PDF good enough to read its first page, and what it cost to get them."""
+    __slots__ = ("data", "content_disposition", "size", "bytes_transferred", "requests", "strategy")
+
+    def __init__(self):
+        self.data = b""
+        self.content_disposition: Optional[str] = None
+        self.size: Optional[int] = None  # full document size when the server told us
+        self.bytes_transferred = 0
+        self.requests = 0
+        # complete | linearized | head_tail | truncated
+        self.strategy = "complete"
+
+class PDFFetcher:
+    """
+    First-page PDF downloads over a pooled session.
+
+    The first PDF_RANGE_HEAD_BYTES are requested with a Range header. A linearized PDF then only
+    needs the rest of its first page section (/E) and the main xref at the end. A small PDF is
+    completed with one more range. A large one gets a bounded head plus its xref tail, with the
+    gap filled with whitespace so PyMuPDF can still open it. Servers that ignore ranges get the
+    old bounded download (MAX_PDF_BYTES). Nothing fetched ever exceeds MAX_PDF_BYTES.
+    """
+    def __init__(self, http_session: Optional[requests.Session] = None, max_bytes: Optional[int] = None,
+                 head_bytes: Optional[int] = None, tail_bytes: Optional[int] = None,
+                 sparse_limit: Optional[int] = None):
+        if http_session is None:
+            from .http_client import shared_session
+            http_session = shared_session()
+        self.http = http_session
+        self.max_bytes = max_bytes or int(os.getenv("MAX_PDF_BYTES", 1_000_000))
+        self.head_bytes = min(self.max_bytes, head_bytes or int(os.getenv("PDF_RANGE_HEAD_BYTES", 65_536)))
+        self.tail_bytes = tail_bytes or int(os.getenv("PDF_RANGE_TAIL_BYTES", 32_768))
+        # gap-filled documents are assembled in memory at full size (in every download thread, then
+        # copied to the analysis pool and the blob store), larger ones are read head-only
+        self.sparse_limit = sparse_limit or int(os.getenv("PDF_SPARSE_LIMIT_BYTES", 4 * self.max_bytes))
+        self._lock = threading.Lock()
+        self._totals = {"pdfs": 0, "bytes": 0, "requests": 0, "ranged": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._totals)
+
+    def _get(self, url: str, fetch: PDFFetch, timeout: float, start: Optional[int] = None,
+             end: Optional[int] = None, limit: Optional[int] = None) -> Tuple[requests.Response, bytes]:
+        """GET (a range of) url, reading at most `limit` bytes of the body."""
+        headers = {"Range": f"bytes={start}-{end}"} if start is not None else {}
+        r = self.http.get(url, headers=headers, stream=True, timeout=timeout)
+        fetch.requests += 1
+        with r:
+            r.raise_for_status()
+            chunks: List[bytes] = []
+            read = 0
+            for chunk in r.iter_content(16_384):
+                chunks.append(chunk)
+                read += len(chunk)
+                if limit is not None and read >= limit:
+                    break
+        fetch.bytes_transferred += read
+        body = b"".join(chunks)
+        return r, body[:limit] if limit is not None else body
+
+    def _range(self, url: str, fetch: PDFFetch, timeout: float, start: int, end: int) -> bytes:
+        r, body = self._get(url, fetch, timeout, start, end, limit=end - start + 1)
+        if r.status_code != 206:
+            raise ValueError(f"range request answered with {r.status_code}")
+        return body
+
+    def fetch(self, url: str, timeout: float = 10, first_page_only: bool = True) -> PDFFetch:
+        """`first_page_only=False` skips the linearized shortcut, for when later pages are needed too."""
+        fetch = PDFFetch()
+        try:
+            try:
+                self._fetch(url, fetch, timeout, first_page_only)
+            except ValueError as e:
+                print(f"[PDF] Ranged fetch of {url} failed ({e}), downloading it")
+                r, fetch.data = self._get(url, fetch, timeout, limit=self.max_bytes)
+                fetch.content_disposition = r.headers.get("Content-Disposition")
+                fetch.strategy = "truncated" if len(fetch.data) >= self.max_bytes else "complete"
+        finally:
+            with self._lock:
+                self._totals["pdfs"] += 1
+                self._totals["bytes"] += fetch.bytes_transferred
+                self._totals["requests"] += fetch.requests
+                self._totals["ranged"] += fetch.strategy in ("linearized", "head_tail")
+        return fetch
+
+    def _fetch(self, url: str, fetch: PDFFetch, timeout: float, first_page_only: bool):
+        # a server ignoring the range answers 200, read that as the bounded full download
+        r, head = self._get(url, fetch, timeout, 0, self.head_bytes - 1, limit=self.max_bytes)
+        fetch.content_disposition = r.headers.get("Content-Disposition")
+        if r.status_code == 200:
+            # no range support: this was the bounded full download
+            fetch.data = head
+            fetch.strategy = "truncated" if len(head) >= self.max_bytes else "complete"
+            return
+        match = _CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+        if r.status_code != 206 or not match:
+            # a partial body of unknown extent, fetch() falls back to the bounded download
+            raise ValueError(f"range answered with {r.status_code} and Content-Range {r.headers.get('Content-Range')!r}")
+        head = head[:self.head_bytes]
+        if match.group(3) == "*":
+            fetch.data = head + self._range(url, fetch, timeout, len(head), self.max_bytes - 1)
+            fetch.strategy = "truncated"
+            return
+        size = fetch.size = int(match.group(3))
+        if size <= len(head):
+            fetch.data = head
+            return
+
+        linear = parse_linearization(head) if first_page_only else None
+        if linear and linear["L"] == size and linear["E"] <= self.max_bytes:
+            end = max(linear["E"], len(head))
+            tail_start = linear.get("T", size)
+            if end > len(head):
+                head += self._range(url, fetch, timeout, len(head), end - 1)
+            if tail_start <= len(head) and size <= self.max_bytes:
+                fetch.data = head + (self._range(url, fetch, timeout, len(head), size - 1) if size > len(head) else b"")
+                fetch.strategy = "complete"
+            elif tail_start <= len(head):
+                fetch.data = head  # the xref is in the head, the rest is over the budget
+                fetch.strategy = "linearized"
+            elif size - tail_start <= min(self.tail_bytes, self.max_bytes - len(head)) and size <= self.sparse_limit:
+                fetch.data = self._sparse(size, head, tail_start, self._range(url, fetch, timeout, tail_start, size - 1))
+                fetch.strategy = "linearized"
+            else:
+                fetch.data = head  # PyMuPDF repairs the cut off first page section
+                fetch.strategy = "linearized"
+            return
+
+        if size <= self.max_bytes:
+            fetch.data = head + self._range(url, fetch, timeout, len(head), size - 1)
+            return
+
+        # no first-page map: as much head as the budget allows plus the xref tail
+        if size > self.sparse_limit:
+            fetch.data = head + self._range(url, fetch, timeout, len(head), self.max_bytes - 1)
+            fetch.strategy = "truncated"
+            return
+        tail_start = size - self.tail_bytes
+        if self.max_bytes - self.tail_bytes > len(head):
+            head += self._range(url, fetch, timeout, len(head), self.max_bytes - self.tail_bytes - 1)
+        fetch.data = self._sparse(size, head, tail_start, self._range(url, fetch, timeout, tail_start, size - 1))
+        fetch.strategy = "head_tail"
+
+    @staticmethod
+    def _sparse(size: int, head: bytes, tail_start: int, tail: bytes) -> bytes:
+        """The document at its real offsets, the unfetched middle as whitespace."""
+        buffer = bytearray(b" ") * size
+        buffer[:len(head)] = head
+        buffer[tail_start:tail_start + len(tail)] = tail
+        return bytes(buffer)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import argparse, cProfile, contextvars, functools, glob, io, json, os, pstats, sys, threading, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .utils import safe_filename
+
+INDEX_FILE = "profiles.jsonl"
+
+# profiles of the worker threads of the crawl being profiled in this context, see profiled()
+_thread_profiles: contextvars.ContextVar[Optional[List[cProfile.Profile]]] = contextvars.ContextVar(
+    "thread_profiles", default=None)
+_thread_profiles_lock = threading.Lock()
+
+def profiled(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    fn for a worker thread (run in a copy of the crawl's context): when the crawl is being
+    profiled, the call is profiled in its thread and merged into the crawl's profile.
+    cProfile only sees the thread that enabled it.
+    """
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        profiles = _thread_profiles.get()
+        if profiles is None:
+            return fn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return fn(*args, **kwargs)  # Python 3.12+: another profiler is active
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with _thread_profiles_lock:
+                profiles.append(profiler)
+    return run
+
+class SiteProfiler:
+    """
+    Deterministic (cProfile) profiling of one crawl per restaurant.
+
+    Each profiled crawl writes <directory>/<restaurant>.prof (pstats format, open with
+    `python -m pstats` or snakeviz) and appends {"name", "file", "seconds"} to profiles.jsonl.
+    Work the crawl hands to threads wrapped with profiled() is included in its profile.
+    Everything needed for the run summary is on disk, so crawls profiled in worker threads
+    or other processes sharing the directory end up in the same report.
+    """
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.getenv("PROFILE_DIR", "output/profiles")
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def reset(self):
+        """Start a new run: drop profiles of previous runs."""
+        for path in glob.glob(os.path.join(self.directory, "*.prof")) + [os.path.join(self.directory, INDEX_FILE)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def run(self, name: str, fn: Callable[[], Any]) -> Any:
+        """Call fn() under the profiler and record it as restaurant `name`."""
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one active profiler per interpreter; concurrent crawls are run unprofiled
+            print(f"[Profile] Not profiling {name}: {e}")
+            return fn()
+        threads: List[cProfile.Profile] = []
+        token = _thread_profiles.set(threads)
+        try:
+            return fn()
+        finally:
+            profiler.disable()
+            _thread_profiles.reset(token)
+            with _thread_profiles_lock:
+                threads = list(threads)
+            self._save(name, profiler, threads, time.perf_counter() - started)
+
+    def _save(self, name: str, profiler: cProfile.Profile, threads: List[cProfile.Profile], seconds: float):
+        path = os.path.join(self.directory, f"{safe_filename(name)}.prof")
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        for thread_profiler in threads:
+            stats.add(thread_profiler)
+        stats.dump_stats(path)
+        line = json.dumps({"name": name, "file": os.path.basename(path), "seconds": round(seconds, 3)}, ensure_ascii=False)
+        with self._lock, open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def load_index(directory: str) -> List[Dict[str, Any]]:
+    """Profiled crawls in the directory, last record per restaurant wins."""
+    entries: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn line of a crashed writer
+                entries[entry["name"]] = entry
+    except FileNotFoundError:
+        pass
+    return list(entries.values())
+
+def slowest_sites(directory: str, top: int = 10) -> List[Dict[str, Any]]:
+    return sorted(load_index(directory), key=lambda e: -e["seconds"])[:top]
+
+def hottest_functions(directory: str, top: int = 20, sort: str = "tottime") -> List[Tuple[str, int, float, float]]:
+    """(function, calls, tottime, cumtime) aggregated over every profile in the directory."""
+    files = [os.path.join(directory, e["file"]) for e in load_index(directory)]
+    files = [f for f in files if os.path.exists(f)]
+    if not files:
+        return []
+    stats = pstats.Stats(*files, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append((f"{os.path.basename(filename)}:{line}({func})", nc, tt, ct))
+    key = 2 if sort == "tottime" else 3
+    return sorted(rows, key=lambda r: -r[key])[:top]
+
+def summary(directory: str, top: int = 10) -> str:
+    lines = [f"Slowest {top} sites:"]
+    for entry in slowest_sites(directory, top):
+        lines.append(f"  {entry['seconds']:>9.2f}s  {entry['name']}  ({entry['file']})")
+    lines.append("Hottest functions (own time, all sites):")
+    for func, calls, tottime, cumtime in hottest_functions(directory, top * 2):
+        lines.append(f"  {tottime:>9.3f}s own {cumtime:>9.3f}s cum {calls:>9} calls  {func}")
+    return "\n".join(lines)
+
+def write_summary(directory: str, top: int = 10) -> str:
+    text = summary(directory, top)
+    with open(os.path.join(directory, "summary.txt"), "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+    return text
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Summarize per-restaurant crawl profiles")
+    ap.add_argument("directory", nargs="?", default=os.getenv("PROFILE_DIR", "output/profiles"))
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args(argv)
+    print(summary(args.directory, args.top))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
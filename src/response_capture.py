@@ -0,0 +1,171 @@
+from __future__ import annotations
+import json, os, threading, urllib.parse
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from .image_ocr import NON_MENU_IMAGE
+from .sitemap_handler import is_menu_like
+
+# keys of dish names and prices in JSON menu data (matched as substrings of lowercased keys for prices)
+NAME_KEYS = ("name", "title", "label", "dish", "gericht", "bezeichnung", "nom", "nome")
+PRICE_KEYS = ("price", "preis", "prix", "prezzo", "cost", "amount")
+DESCRIPTION_KEYS = ("description", "beschreibung", "desc", "subtitle", "details")
+
+def json_menu_text(payload: Any, min_items: int = 3, max_items: int = 500) -> str:
+    """
+    One line per dish (name, description, price) of JSON data, found as objects having both a
+    name and a price key. Empty when fewer than `min_items` dishes are found: not a menu.
+    """
+    lines, stack = [], [payload]
+    while stack and len(lines) < max_items:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        fields = {str(k).lower(): v for k, v in node.items()}
+        name = next((fields[k] for k in NAME_KEYS if isinstance(fields.get(k), str) and fields[k].strip()), None)
+        price = next((v for k, v in fields.items()
+                      if any(p in k for p in PRICE_KEYS) and isinstance(v, (int, float, str)) and not isinstance(v, bool)), None)
+        if name and price is not None:
+            description = next((fields[k] for k in DESCRIPTION_KEYS if isinstance(fields.get(k), str)), "")
+            price = f"{price:.2f}" if isinstance(price, (int, float)) else str(price)
+            lines.append(" - ".join(part.strip() for part in (name, description, price) if part and part.strip()))
+        stack.extend(reversed([v for v in node.values() if isinstance(v, (dict, list))]))
+    return "\n".join(lines) if len(lines) >= min_items else ""
+
+class CapturedResponse:
+    """Body of a response the browser received, with the page it was loaded for."""
+    __slots__ = ("url", "kind", "body", "content_disposition", "page_url", "menu_text")
+
+    def __init__(self, url: str, kind: str, body: bytes, content_disposition: Optional[str] = None,
+                 page_url: Optional[str] = None, menu_text: str = ""):
+        self.url = url
+        self.kind = kind  # pdf, json or image
+        self.body = body
+        self.content_disposition = content_disposition
+        self.page_url = page_url
+        # dish lines of JSON menu data
+        self.menu_text = menu_text
+
+def response_kind(content_type: str, url: str) -> Optional[str]:
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    if content_type == "application/pdf" or (content_type == "application/octet-stream" and url.lower().endswith(".pdf")):
+        return "pdf"
+    if content_type == "application/json" or content_type.endswith("+json"):
+        return "json"
+    if content_type in ("image/jpeg", "image/png"):
+        return "image"
+    return None
+
+def capture_image(url: str) -> bool:
+    """Whether an image the browser loaded may be a menu: a menu-like URL that isn't a logo or icon."""
+    if NON_MENU_IMAGE.search(urllib.parse.urlparse(url).path.rsplit("/", 1)[-1]):
+        return False
+    return is_menu_like(url)
+
+class ResponseCapture:
+    """
+    PDF, JSON and image response bodies the browser already received (an embedded PDF viewer,
+    a menu image, an SPA's XHR calls), keyed by URL, so parsers don't download them again.
+    Bodies over RESPONSE_CAPTURE_MAX_BYTES are not kept, and the least recently used are
+    dropped beyond RESPONSE_CAPTURE_MAX_MB. Only JSON that looks like menu data is kept; those
+    responses are handed to the crawler as menu candidates (see take_menus()). Images are only
+    read when their URL looks like a menu (what the noise filter keeps, see capture_image()).
+    """
+    def __init__(self, max_bytes: Optional[int] = None, max_total_mb: Optional[float] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("RESPONSE_CAPTURE_MAX_BYTES", "5000000"))
+        max_total_mb = max_total_mb if max_total_mb is not None else float(os.getenv("RESPONSE_CAPTURE_MAX_MB", "64"))
+        self.max_total = int(max_total_mb * 1024 * 1024)
+        self._responses: "OrderedDict[str, CapturedResponse]" = OrderedDict()
+        self._total = 0
+        self._menus: List[CapturedResponse] = []
+        # responses arrive on the crawl thread, parsers read them in download threads
+        self._lock = threading.Lock()
+        self._stats = {"captured": 0, "bytes": 0, "hits": 0, "too_large": 0, "evicted": 0, "json_menus": 0,
+                       "images_skipped": 0}
+
+    def attach(self, ctx):
+        """Capture the responses of every page of the browser context."""
+        ctx.on("response", self._on_response)
+
+    def _on_response(self, response):
+        try:
+            if response.status != 200:
+                return
+            headers = response.headers
+            kind = response_kind(headers.get("content-type", ""), response.url)
+            if kind is None:
+                return
+            if kind == "image" and not capture_image(response.url):
+                # logos, photos and icons: most images of a page, their bodies are not read
+                self._count("images_skipped")
+                return
+            if int(headers.get("content-length") or 0) > self.max_bytes:
+                self._count("too_large")
+                return
+            body = response.body()
+            try:
+                page_url = response.frame.page.url
+            except Exception:
+                page_url = None  # e.g. service worker responses
+            self.add(response.url, kind, body, headers.get("content-disposition"), page_url)
+        except Exception as e:
+            # the page navigated away or the body was evicted by the browser
+            print(f"[Capture] Could not read {getattr(response, 'url', '?')}: {type(e).__name__}: {e}")
+
+    def add(self, url: str, kind: str, body: bytes, content_disposition: Optional[str] = None,
+            page_url: Optional[str] = None) -> Optional[CapturedResponse]:
+        """Keep a body; JSON only when it looks like menu data. Returns what was kept."""
+        if len(body) > self.max_bytes:
+            self._count("too_large")
+            return None
+        menu_text = ""
+        if kind == "json":
+            try:
+                menu_text = json_menu_text(json.loads(body))
+            except ValueError:
+                return None
+            if not menu_text:
+                return None
+        captured = CapturedResponse(url, kind, body, content_disposition, page_url, menu_text)
+        with self._lock:
+            previous = self._responses.pop(url, None)
+            if previous is not None:
+                self._total -= len(previous.body)
+            self._responses[url] = captured
+            self._total += len(body)
+            self._stats["captured"] += 1
+            self._stats["bytes"] += len(body)
+            while self._total > self.max_total and len(self._responses) > 1:
+                _, evicted = self._responses.popitem(last=False)
+                self._total -= len(evicted.body)
+                self._stats["evicted"] += 1
+            if menu_text:
+                self._menus.append(captured)
+                self._stats["json_menus"] += 1
+        return captured
+
+    def get(self, url: str, kind: Optional[str] = None) -> Optional[CapturedResponse]:
+        """The captured response of `url` (of `kind` if given), None when the browser didn't load it."""
+        with self._lock:
+            captured = self._responses.get(url) or self._responses.get(url.split("#", 1)[0])
+            if captured is None or (kind is not None and captured.kind != kind):
+                return None
+            self._responses.move_to_end(captured.url)
+            self._stats["hits"] += 1
+            return captured
+
+    def take_menus(self) -> List[CapturedResponse]:
+        """JSON menu data captured since the last call."""
+        with self._lock:
+            menus, self._menus = self._menus, []
+            return menus
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, kept_bytes=self._total)
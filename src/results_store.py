@@ -0,0 +1,262 @@
+from __future__ import annotations
+import argparse, json, sqlite3, sys, time
+from typing import Dict, Iterator, List, Optional, Tuple
+from .models import MenuItem, PageRecord, RestaurantResult
+from .output_generator import save_results
+from .utils import registrable_domain
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    input_path TEXT
+);
+CREATE TABLE IF NOT EXISTS restaurants (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_restaurants_domain ON restaurants(domain);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    restaurant_id INTEGER NOT NULL REFERENCES restaurants(id),
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cookie_banner_accept TEXT,
+    warnings TEXT NOT NULL DEFAULT '[]',
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (run_id, restaurant_id)
+);
+CREATE TABLE IF NOT EXISTS menus (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    restaurant_id INTEGER NOT NULL REFERENCES restaurants(id),
+    position INTEGER NOT NULL,
+    link TEXT NOT NULL,
+    type_code TEXT NOT NULL,
+    type_label TEXT NOT NULL,
+    format TEXT NOT NULL,
+    languages TEXT NOT NULL DEFAULT '[]',
+    button_text TEXT,
+    confidence REAL NOT NULL DEFAULT 0,
+    notes TEXT,
+    content_disposition TEXT,
+    content_hash TEXT,
+    PRIMARY KEY (run_id, restaurant_id, link)
+);
+CREATE INDEX IF NOT EXISTS idx_menus_type_code ON menus(type_code);
+CREATE INDEX IF NOT EXISTS idx_menus_content_hash ON menus(content_hash);
+CREATE INDEX IF NOT EXISTS idx_menus_restaurant ON menus(restaurant_id, run_id);
+CREATE TABLE IF NOT EXISTS pages (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    restaurant_id INTEGER NOT NULL REFERENCES restaurants(id),
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    error TEXT,
+    PRIMARY KEY (run_id, restaurant_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_content_hash ON pages(content_hash);
+"""
+
+class ResultsStore:
+    """
+    Optional SQLite backend keeping results of every run, so menus can be compared across runs.
+    Each site is upserted as soon as it is crawled; export() reproduces the output.json layout.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        # 30s busy timeout: several crawl processes may write into the same store
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def start_run(self, input_path: Optional[str] = None) -> int:
+        with self._conn:
+            cur = self._conn.execute("INSERT INTO runs (started_at, input_path) VALUES (?, ?)", (time.time(), input_path))
+        return cur.lastrowid
+
+    def finish_run(self, run_id: int):
+        with self._conn:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), run_id))
+
+    def _restaurant_id(self, name: str, url: str) -> int:
+        self._conn.execute(
+            "INSERT INTO restaurants (name, url, domain) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET url = excluded.url, domain = excluded.domain",
+            (name, url, registrable_domain(url)),
+        )
+        return self._conn.execute("SELECT id FROM restaurants WHERE name = ?", (name,)).fetchone()["id"]
+
+    def upsert_site(
+        self,
+        run_id: int,
+        result: RestaurantResult,
+        pages: Optional[List[PageRecord]] = None,
+        menu_hashes: Optional[Dict[str, Optional[str]]] = None,
+    ):
+        """Store (or replace) one restaurant's result, menus and pages for run_id in a single transaction."""
+        menu_hashes = menu_hashes or {}
+        with self._conn:
+            restaurant_id = self._restaurant_id(result.name, result.url)
+            self._conn.execute(
+                "INSERT INTO results (run_id, restaurant_id, url, status, cookie_banner_accept, warnings, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id, restaurant_id) DO UPDATE SET url = excluded.url, status = excluded.status, "
+                "cookie_banner_accept = excluded.cookie_banner_accept, warnings = excluded.warnings, "
+                "finished_at = excluded.finished_at",
+                (run_id, restaurant_id, result.url, result.status, result.cookie_banner_accept,
+                 json.dumps(result.warnings, ensure_ascii=False), time.time()),
+            )
+            self._conn.execute("DELETE FROM menus WHERE run_id = ? AND restaurant_id = ?", (run_id, restaurant_id))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO menus (run_id, restaurant_id, position, link, type_code, type_label, format, "
+                "languages, button_text, confidence, notes, content_disposition, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, restaurant_id, position, m.link, m.type_code, m.type_label, m.format,
+                     json.dumps(m.languages), m.button_text, m.confidence, m.notes, m.content_disposition,
+                     menu_hashes.get(m.link))
+                    for position, m in enumerate(result.menus)
+                ],
+            )
+            if pages is not None:
+                self._conn.execute("DELETE FROM pages WHERE run_id = ? AND restaurant_id = ?", (run_id, restaurant_id))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pages (run_id, restaurant_id, url, depth, content_hash, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run_id, restaurant_id, p.url, p.depth, p.content_hash, p.error) for p in pages],
+                )
+
+    def latest_run_id(self) -> Optional[int]:
+        row = self._conn.execute("SELECT MAX(id) AS id FROM runs").fetchone()
+        return row["id"]
+
+    def unfinished_run_id(self, input_path: Optional[str] = None) -> Optional[int]:
+        """The latest run of `input_path` that never finished (e.g. crashed), for resuming it."""
+        row = self._conn.execute("SELECT MAX(id) AS id FROM runs WHERE finished_at IS NULL AND input_path IS ?",
+                                 (input_path,)).fetchone()
+        return row["id"]
+
+    def runs(self) -> List[sqlite3.Row]:
+        return self._conn.execute(
+            "SELECT r.id, r.started_at, r.finished_at, r.input_path, COUNT(res.restaurant_id) AS restaurants "
+            "FROM runs r LEFT JOIN results res ON res.run_id = r.id GROUP BY r.id ORDER BY r.id"
+        ).fetchall()
+
+    def _menu_from_row(self, row: sqlite3.Row) -> MenuItem:
+        return MenuItem(
+            link=row["link"], type_code=row["type_code"], type_label=row["type_label"], format=row["format"],
+            languages=json.loads(row["languages"]), button_text=row["button_text"], confidence=row["confidence"],
+            notes=row["notes"], content_disposition=row["content_disposition"],
+        )
+
+    def iter_results(self, run_id: int) -> Iterator[RestaurantResult]:
+        for res in self._conn.execute(
+            "SELECT res.*, r.name FROM results res JOIN restaurants r ON r.id = res.restaurant_id "
+            "WHERE res.run_id = ? ORDER BY res.rowid", (run_id,)
+        ):
+            menus = self._conn.execute(
+                "SELECT * FROM menus WHERE run_id = ? AND restaurant_id = ? ORDER BY position",
+                (run_id, res["restaurant_id"]),
+            ).fetchall()
+            yield RestaurantResult(
+                name=res["name"], url=res["url"], cookie_banner_accept=res["cookie_banner_accept"],
+                status=res["status"], warnings=json.loads(res["warnings"]),
+                menus=[self._menu_from_row(m) for m in menus],
+            )
+
+    def export(self, out_path: str, run_id: Optional[int] = None):
+        """Write run_id (default: latest) in the output.json layout."""
+        run_id = run_id or self.latest_run_id()
+        save_results(out_path, list(self.iter_results(run_id)) if run_id else [])
+
+    def menus(self, domain: Optional[str] = None, type_code: Optional[str] = None,
+              content_hash: Optional[str] = None, run_id: Optional[int] = None) -> List[sqlite3.Row]:
+        clauses, params = [], []
+        for column, value in (("r.domain", domain), ("m.type_code", type_code),
+                              ("m.content_hash", content_hash), ("m.run_id", run_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._conn.execute(
+            "SELECT m.run_id, r.name, r.domain, m.link, m.type_code, m.format, m.confidence, m.content_hash "
+            f"FROM menus m JOIN restaurants r ON r.id = m.restaurant_id {where} ORDER BY m.run_id, r.name, m.position",
+            params,
+        ).fetchall()
+
+    def _menu_signature(self, run_id: int, restaurant_id: int) -> frozenset:
+        rows = self._conn.execute(
+            "SELECT link, type_code, content_hash FROM menus WHERE run_id = ? AND restaurant_id = ?",
+            (run_id, restaurant_id),
+        ).fetchall()
+        return frozenset((row["link"], row["type_code"], row["content_hash"]) for row in rows)
+
+    def changed_since(self, since: float) -> List[Tuple[str, int, Optional[int]]]:
+        """
+        Restaurants whose menus differ between their latest run and their last run started before `since`.
+        Returns (name, latest_run_id, baseline_run_id); baseline is None for restaurants new since then.
+        """
+        changed = []
+        for row in self._conn.execute("SELECT id, name FROM restaurants ORDER BY name").fetchall():
+            latest = self._conn.execute(
+                "SELECT MAX(run_id) AS run_id FROM results WHERE restaurant_id = ?", (row["id"],)
+            ).fetchone()["run_id"]
+            baseline = self._conn.execute(
+                "SELECT MAX(res.run_id) AS run_id FROM results res JOIN runs ON runs.id = res.run_id "
+                "WHERE res.restaurant_id = ? AND runs.started_at < ?", (row["id"], since)
+            ).fetchone()["run_id"]
+            if latest is None or latest == baseline:
+                continue
+            if baseline is None or self._menu_signature(latest, row["id"]) != self._menu_signature(baseline, row["id"]):
+                changed.append((row["name"], latest, baseline))
+        return changed
+
+def _parse_since(value: str) -> float:
+    return time.mktime(time.strptime(value, "%Y-%m-%d"))
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Query the SQLite results store")
+    ap.add_argument("--db", default="output/results.db")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("runs", help="list runs")
+    menus = sub.add_parser("menus", help="list menus, optionally filtered")
+    menus.add_argument("--domain")
+    menus.add_argument("--type", dest="type_code")
+    menus.add_argument("--hash", dest="content_hash")
+    menus.add_argument("--run", type=int)
+    changed = sub.add_parser("changed", help="restaurants whose menus changed since a date")
+    changed.add_argument("--since", required=True, help="YYYY-MM-DD")
+    export = sub.add_parser("export", help="export a run in the output.json layout")
+    export.add_argument("--run", type=int, help="run id (default: latest)")
+    export.add_argument("--out", default="output/output.json")
+    args = ap.parse_args(argv)
+
+    store = ResultsStore(args.db)
+    try:
+        if args.command == "runs":
+            for row in store.runs():
+                started = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["started_at"]))
+                state = "finished" if row["finished_at"] else "unfinished"
+                print(f"{row['id']}\t{started}\t{state}\t{row['restaurants']} restaurants\t{row['input_path'] or ''}")
+        elif args.command == "menus":
+            for row in store.menus(args.domain, args.type_code, args.content_hash, args.run):
+                print("\t".join(str(row[k]) for k in ("run_id", "name", "type_code", "format", "confidence", "link", "content_hash")))
+        elif args.command == "changed":
+            for name, latest, baseline in store.changed_since(_parse_since(args.since)):
+                print(f"{name}\trun {baseline if baseline is not None else '-'} -> run {latest}")
+        elif args.command == "export":
+            store.export(args.out, args.run)
+            print(f"Exported run {args.run or store.latest_run_id()} to {args.out}")
+    finally:
+        store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+from __future__ import annotations
+import argparse, itertools, json, os, queue, sys, threading, time, urllib.parse, uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .agent import AgentBase
+from .browser_pool import RecyclePolicy, WarmBrowser
+from .crawler import SiteCrawler
+from .models import RestaurantResult
+from .output_generator import JsonlResultSink
+from .profiling import SiteProfiler
+from .storage_state import StorageStateStore
+from .blob_store import BlobStore
+
+class CrawlService:
+    """
+    Long-running crawl worker pool.
+
+    Each worker thread owns a Playwright instance and a warm Chromium (the sync API is bound
+    to the thread that started it) and crawls submitted restaurants one after another, each
+    in a fresh browser context. Classifier LLM clients and prompts are shared process-wide
+    (see AgentBase). Finished jobs get an increasing sequence number so clients can poll
+    or stream results from a cursor.
+    """
+    def __init__(self, menutypes: Dict[str, str], workers: Optional[int] = None,
+                 storage_state_store: Optional[StorageStateStore] = None,
+                 blob_store: Optional[BlobStore] = None,
+                 sink: Optional[JsonlResultSink] = None, max_finished: Optional[int] = None,
+                 profiler: Optional[SiteProfiler] = None):
+        self.menutypes = menutypes
+        self.workers = workers or int(os.getenv("SERVICE_WORKERS", "2"))
+        self.storage_state_store = storage_state_store
+        self.blob_store = blob_store
+        self.sink = sink
+        # cProfiles every crawl into one .prof per restaurant when set
+        self.profiler = profiler
+        self.max_finished = max_finished or int(os.getenv("SERVICE_MAX_FINISHED_JOBS", "10000"))
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._finished: deque = deque()  # (seq, job id) in completion order
+        self._seq = itertools.count(1)
+        self._last_seq = 0
+        self._completions: deque = deque()  # finish timestamps for the throughput window
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._started = time.time()
+        self._browsers: List[WarmBrowser] = []
+
+    # --- lifecycle ---
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"crawl-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[Service] Started {self.workers} crawl workers")
+
+    def stop(self, timeout: Optional[float] = None):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.sink is not None:
+            self.sink.close()
+
+    # --- API ---
+
+    def submit(self, name: str, url: str, menutypes: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "name": name,
+            "url": url,
+            "menutypes": menutypes,
+            "status": "queued",
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "seconds": None,
+            "seq": None,
+            "result": None,
+        }
+        with self._cond:
+            self._jobs[job["id"]] = job
+        self._queue.put(job["id"])
+        return self._public(job)
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def results(self, since: int = 0, wait: float = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Jobs finished after sequence number `since`, waiting up to `wait` seconds for one."""
+        deadline = time.monotonic() + wait
+        with self._cond:
+            while self._last_seq <= since and wait > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            jobs = [self._public(self._jobs[job_id]) for seq, job_id in self._finished if seq > since]
+            return jobs, max(since, self._last_seq)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        window = float(os.getenv("SERVICE_THROUGHPUT_WINDOW_SECONDS", "600"))
+        with self._cond:
+            while self._completions and self._completions[0] < now - window:
+                self._completions.popleft()
+            recent = len(self._completions)
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            finished = [self._jobs[job_id]["seconds"] for _, job_id in self._finished]
+        elapsed = min(window, now - self._started)
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "running": counts.get("running", 0),
+            "jobs": counts,
+            "sites_per_minute": round(recent / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            "avg_site_seconds": round(sum(finished) / len(finished), 2) if finished else None,
+            "uptime_seconds": round(now - self._started, 1),
+            "llm_calls": AgentBase.llm_call_counts(),
+            "browsers": {
+                "launches": sum(b.launches for b in self._browsers),
+                "recycles": sum(b.recycles for b in self._browsers),
+            },
+        }
+
+    # --- workers ---
+
+    def _worker(self):
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            self._serve_jobs(lambda: p.chromium.launch(headless=True))
+
+    def _serve_jobs(self, launch: Callable[[], Any]):
+        """Take jobs until stop(); the browser is relaunched if it died or hit a recycle limit."""
+        warm = WarmBrowser(launch, RecyclePolicy())
+        with self._cond:
+            self._browsers.append(warm)
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            if warm.browser is None:
+                print(f"[Service] {threading.current_thread().name}: launching browser")
+            job = self._run(job_id, warm.get())
+            warm.after_site(job.get("navigations", 0))
+        warm.close()
+
+    def _run(self, job_id: str, browser) -> Dict[str, Any]:
+        with self._cond:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started"] = time.time()
+        try:
+            if self.profiler is not None:
+                result = self.profiler.run(job["name"], lambda: self._crawl(job, browser))
+            else:
+                result = self._crawl(job, browser)
+            status = "done"
+        except Exception as e:
+            print(f"[Service] Crawl of {job['name']} failed: {type(e).__name__}: {e}")
+            result = RestaurantResult(name=job["name"], url=job["url"], status="error",
+                                      warnings=[f"{type(e).__name__}: {e}"])
+            status = "failed"
+        if self.sink is not None:
+            with self._cond:
+                self.sink.append(result)
+        with self._cond:
+            job["status"] = status
+            job["finished"] = time.time()
+            job["seconds"] = round(job["finished"] - job["started"], 3)
+            job["result"] = result.model_dump()
+            self._last_seq = job["seq"] = next(self._seq)
+            self._finished.append((job["seq"], job_id))
+            self._completions.append(job["finished"])
+            while len(self._finished) > self.max_finished:
+                _, old = self._finished.popleft()
+                self._jobs.pop(old, None)
+            self._cond.notify_all()
+        return job
+
+    def _crawl(self, job: Dict[str, Any], browser) -> RestaurantResult:
+        crawler = SiteCrawler(job["name"], job["url"], job["menutypes"] or self.menutypes,
+                              storage_state_store=self.storage_state_store, blob_store=self.blob_store)
+        try:
+            crawler.crawl_site(browser=browser)
+        finally:
+            job["navigations"] = crawler.stats["navigations"]
+        return crawler.result()
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in job.items() if k != "menutypes"}
+
+def parse_submission(body: Dict[str, Any]) -> List[Tuple[str, str, Optional[Dict[str, str]]]]:
+    """
+    Accepts {"name", "url", "menutypes"?}, {"restaurants": [{...}, ...]} or the
+    input/restaurants.json layout {"restaurants": {name: url}}.
+    """
+    restaurants = body.get("restaurants", [body])
+    if isinstance(restaurants, dict):
+        return [(name, url, body.get("menutypes")) for name, url in restaurants.items()]
+    out = []
+    for entry in restaurants:
+        if not entry.get("name") or not entry.get("url"):
+            raise ValueError("every restaurant needs a name and a url")
+        out.append((entry["name"], entry["url"], entry.get("menutypes") or body.get("menutypes")))
+    return out
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ServiceHTTPServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, body: Any):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        service = self.server.service
+        parsed = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        path = parsed.path.rstrip("/")
+        try:
+            since = int(params.get("since", 0))
+            wait = min(float(params.get("wait", 0)), 60.0)
+        except ValueError:
+            return self._json(400, {"error": "since and wait must be numbers"})
+        if path == "/health":
+            return self._json(200, {"ok": True})
+        if path == "/stats":
+            return self._json(200, service.stats())
+        if path.startswith("/jobs/"):
+            job = service.job(path[len("/jobs/"):])
+            return self._json(200, job) if job else self._json(404, {"error": "unknown job"})
+        if path == "/results":
+            jobs, next_seq = service.results(since, wait)
+            return self._json(200, {"results": jobs, "next": next_seq})
+        if path == "/results/stream":
+            return self._stream(since)
+        return self._json(404, {"error": "not found"})
+
+    def _stream(self, since: int):
+        """NDJSON, one finished job per line as it completes, until the client disconnects."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            while True:
+                jobs, since = self.server.service.results(since, wait=15)
+                for job in jobs:
+                    self.wfile.write((json.dumps(job, ensure_ascii=False) + "\n").encode("utf-8"))
+                if not jobs:
+                    self.wfile.write(b"\n")  # keep-alive, also detects gone clients
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        if urllib.parse.urlparse(self.path).path.rstrip("/") != "/jobs":
+            return self._json(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            submissions = parse_submission(body)
+        except (ValueError, AttributeError) as e:
+            return self._json(400, {"error": str(e)})
+        jobs = [self.server.service.submit(name, url, menutypes) for name, url, menutypes in submissions]
+        self._json(202, {"jobs": jobs})
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """Local HTTP/JSON front end of a CrawlService."""
+    daemon_threads = True
+
+    def __init__(self, service: CrawlService, host: str = "127.0.0.1", port: int = 8765):
+        super().__init__((host, port), _Handler)
+        self.service = service
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Crawl service: HTTP/JSON API over a pool of warm browsers")
+    ap.add_argument("--host", default=os.getenv("SERVICE_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8765")))
+    ap.add_argument("--workers", type=int, default=None, help="crawl workers / warm browsers (default: $SERVICE_WORKERS or 2)")
+    ap.add_argument("--types", default="input/menutypes.json")
+    ap.add_argument("--sink", default=None, help="also append every result to this JSONL file")
+    ap.add_argument("--storage-state-dir", default=None)
+    ap.add_argument("--no-storage-state", action="store_true")
+    ap.add_argument("--blob-store-dir", default=None)
+    ap.add_argument("--no-blob-store", action="store_true")
+    ap.add_argument("--profile", nargs="?", const=os.getenv("PROFILE_DIR", "output/profiles"), default=None, metavar="DIR",
+                    help="cProfile every crawl, one .prof file per restaurant in DIR (default: output/profiles)")
+    args = ap.parse_args(argv)
+
+    with open(args.types, "r", encoding="utf-8") as f:
+        menutypes = json.load(f)["menus"]
+    service = CrawlService(
+        menutypes,
+        workers=args.workers,
+        storage_state_store=None if args.no_storage_state else StorageStateStore(args.storage_state_dir),
+        blob_store=None if args.no_blob_store else BlobStore(args.blob_store_dir),
+        sink=JsonlResultSink(args.sink) if args.sink else None,
+        profiler=SiteProfiler(args.profile) if args.profile else None,
+    )
+    service.start()
+    server = ServiceHTTPServer(service, args.host, args.port)
+    print(f"[Service] Listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop(timeout=30)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
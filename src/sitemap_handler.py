@@ -1,100 +1,136 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple, Optional
-from playwright.sync_api import sync_playwright, Page
-from bs4 import BeautifulSoup
-import re, time, urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple, Optional
+import os, re, threading, time, urllib.parse, zlib
+import xml.etree.ElementTree as ET
 from .utils import normalize_url, is_same_domain, canonicalize_language
-# Removed non-existent classifier import
-from .models import CrawlTask, LinkInfo, PageRecord
+
+if TYPE_CHECKING:
+    import requests
+
+# path tokens of pages that are likely menus (de/en/fr/it)
+MENU_URL_PATTERN = re.compile(
+    r"(?<![a-z])(speisekarten?|karten?|menu|menue|menü|menus|carte|carta|getraenke|getränke|drinks?|"
+    r"weine?|weinkarte|wine|vins?|vini|bevande|piatti|lunch|mittag|mittagsmenu|tagesmenu|dinner|"
+    r"dessert|cocktails?|speisen|food|essen|bar)(?![a-z])",
+    re.IGNORECASE,
+)
+
+def is_menu_like(url: str) -> bool:
+    path = urllib.parse.unquote(urllib.parse.urlparse(url).path)
+    return bool(MENU_URL_PATTERN.search(path))
+
+def _local(tag: str) -> str:
+    """Tag without its XML namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+class _Budget:
+    """Byte and URL limits shared by the concurrent fetches of one discovery."""
+    def __init__(self, max_bytes: int, max_urls: int):
+        self.bytes_left = max_bytes
+        self.urls_left = max_urls
+        self._lock = threading.Lock()
+
+    def take_bytes(self, n: int) -> bool:
+        with self._lock:
+            self.bytes_left -= n
+            return self.bytes_left >= 0
+
+    def take_url(self) -> bool:
+        with self._lock:
+            self.urls_left -= 1
+            return self.urls_left >= 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.bytes_left <= 0 or self.urls_left <= 0
 
 class SitemapHandler:
-    def parse_sitemap_xml(self, content: str, base_url: str) -> List[Tuple[str, str]]:
-        """Parse XML sitemap content and extract URLs with optional text."""
-        urls = []
+    """
+    Sitemap discovery over plain HTTP.
+
+    robots.txt and the common sitemap locations are fetched concurrently through a pooled
+    session, then referenced and nested sitemaps level by level. Documents are parsed while
+    they stream in (XMLPullParser, gzip supported), and the whole discovery is bounded by
+    SITEMAP_MAX_DEPTH (index nesting), SITEMAP_MAX_BYTES, SITEMAP_MAX_URLS and
+    SITEMAP_TIMEOUT_SECONDS.
+    """
+    def __init__(self, http_session: Optional[requests.Session] = None):
+        if http_session is None:
+            from .http_client import shared_session
+            http_session = shared_session()
+        self.http = http_session
+        self.workers = int(os.getenv("SITEMAP_FETCH_WORKERS", "8"))
+        self.max_depth = int(os.getenv("SITEMAP_MAX_DEPTH", "2"))
+        self.max_bytes = int(os.getenv("SITEMAP_MAX_BYTES", str(5_000_000)))
+        self.max_urls = int(os.getenv("SITEMAP_MAX_URLS", "5000"))
+        self.max_sitemaps = int(os.getenv("SITEMAP_MAX_SITEMAPS", "30"))
+        self.timeout = float(os.getenv("SITEMAP_TIMEOUT_SECONDS", "10"))
+        self.stats = {"documents": 0, "bytes": 0, "urls": 0}
+
+    def iter_sitemap_xml(self, chunks: Iterable[bytes]) -> Iterator[Tuple[str, str]]:
+        """
+        Stream (loc, text) pairs out of sitemap XML chunks; text is "sitemap" for entries of a
+        sitemap index, else lastmod/changefreq/priority. Only direct children of <url>/<sitemap>
+        are read, so extension entries (e.g. <image:loc> in Yoast sitemaps) don't replace the page's
+        <loc>. Stops quietly at malformed XML.
+        """
+        parser = ET.XMLPullParser(events=("start", "end"))
+        root = None
+        depth = 0  # of the element an event belongs to: 1 the root, 2 url/sitemap, 3 their fields
+        fields: Dict[str, str] = {}
         try:
-            # Try lxml first, fallback to html.parser if not available
-            try:
-                soup = BeautifulSoup(content, "xml")
-            except Exception:
-                # Fallback to html.parser if lxml is not available
-                soup = BeautifulSoup(content, "html.parser")
-            
-            # Handle sitemap index files (contain references to other sitemaps)
-            sitemap_refs = soup.find_all("sitemap")
-            for ref in sitemap_refs:
-                loc = ref.find("loc")
-                if loc and loc.text:
-                    urls.append((loc.text.strip(), "sitemap"))
-            
-            # Handle regular sitemap entries
-            url_entries = soup.find_all("url")
-            for entry in url_entries:
-                loc = entry.find("loc")
-                if loc and loc.text:
-                    url = loc.text.strip()
-                    # Try to extract meaningful text from lastmod, changefreq, or priority
-                    text_parts = []
-                    lastmod = entry.find("lastmod")
-                    if lastmod and lastmod.text:
-                        text_parts.append(f"lastmod: {lastmod.text.strip()}")
-                    changefreq = entry.find("changefreq")
-                    if changefreq and changefreq.text:
-                        text_parts.append(f"freq: {changefreq.text.strip()}")
-                    priority = entry.find("priority")
-                    if priority and priority.text:
-                        text_parts.append(f"priority: {priority.text.strip()}")
-                    
-                    text = " | ".join(text_parts) if text_parts else ""
-                    urls.append((url, text))
-            
-            # If no URLs found with BeautifulSoup, try regex fallback for malformed XML
-            if not urls:
-                import re
-                # Look for URLs in the content using regex
-                url_pattern = r'https?://[^\s<>"\']+'
-                found_urls = re.findall(url_pattern, content)
-                for url in found_urls:
-                    if is_same_domain(base_url, url):
-                        urls.append((url, "regex_fallback"))
-                    
-        except Exception as e:
+            for chunk in chunks:
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        depth += 1
+                        if root is None:
+                            root = elem
+                        continue
+                    depth -= 1
+                    tag = _local(elem.tag)
+                    if depth == 2 and tag in ("loc", "lastmod", "changefreq", "priority"):
+                        fields[tag] = (elem.text or "").strip()
+                    elif depth == 1 and tag in ("url", "sitemap"):
+                        loc = fields.pop("loc", "")
+                        if loc:
+                            if tag == "sitemap":
+                                text = "sitemap"
+                            else:
+                                text = " | ".join(f"{label}: {fields[key]}" for key, label in
+                                                  (("lastmod", "lastmod"), ("changefreq", "freq"), ("priority", "priority"))
+                                                  if fields.get(key))
+                            yield loc, text
+                        fields.clear()
+                        # drop processed entries so memory stays flat on huge sitemaps
+                        root.clear()
+        except ET.ParseError as e:
             print(f"Error parsing sitemap XML: {e}")
-            # Last resort: try to extract URLs using regex
-            try:
-                import re
-                url_pattern = r'https?://[^\s<>"\']+'
-                found_urls = re.findall(url_pattern, content)
-                for url in found_urls:
-                    if is_same_domain(base_url, url):
-                        urls.append((url, "regex_fallback"))
-            except Exception:
-                pass
-        
-        return urls
+
+    def parse_sitemap_xml(self, content: str, base_url: str) -> List[Tuple[str, str]]:
+        """Parse XML sitemap content and extract URLs with optional text."""
+        return list(self.iter_sitemap_xml([content.encode("utf-8")]))
 
     def parse_robots_txt(self, content: str, base_url: str) -> List[str]:
         """Parse robots.txt content to find sitemap references."""
         sitemaps = []
-        try:
-            for line in content.split('\n'):
-                line = line.strip()
-                if line.lower().startswith('sitemap:'):
-                    sitemap_url = line[8:].strip()
-                    if sitemap_url:
-                        sitemaps.append(sitemap_url)
-        except Exception as e:
-            print(f"Error parsing robots.txt: {e}")
-        
+        for line in content.split('\n'):
+            line = line.strip()
+            if line.lower().startswith('sitemap:'):
+                sitemap_url = line[8:].strip()
+                if sitemap_url:
+                    sitemaps.append(normalize_url(base_url, sitemap_url))
         return sitemaps
-    
+
     def get_sitemap_candidates(self, base_url: str) -> List[str]:
         """Generate common sitemap URL candidates for a given base URL."""
         parsed = urllib.parse.urlparse(base_url)
         base = f"{parsed.scheme}://{parsed.netloc}"
-        
+
         candidates = [
             f"{base}/sitemap.xml",
-            f"{base}/sitemap_index.xml", 
+            f"{base}/sitemap_index.xml",
             f"{base}/sitemap-index.xml",
             f"{base}/sitemap/sitemap.xml",
             f"{base}/sitemaps/sitemap.xml",
@@ -102,7 +138,7 @@ class SitemapHandler:
             f"{base}/sitemap/sitemap.txt",
             f"{base}/robots.txt"  # robots.txt often contains sitemap references
         ]
-        
+
         # Add language-specific variants if URL has language segments
         if re.search(r"/(de|en|fr|it)(/|$)", base_url, re.IGNORECASE):
             for lang in ["de", "en", "fr", "it"]:
@@ -110,72 +146,121 @@ class SitemapHandler:
                     f"{base}/{lang}/sitemap.xml",
                     f"{base}/sitemap_{lang}.xml"
                 ])
-        
+
         return candidates
 
-    def discover_sitemap_urls(self, page: Page, base_url: str) -> List[Tuple[str, str]]:
-        """Attempt to discover and load sitemap URLs from common locations."""
-        discovered_urls = []
-        processed_sitemaps = set()  # Avoid processing the same sitemap multiple times
-        
-        # Get sitemap candidates
-        candidates = self.get_sitemap_candidates(base_url)
-        
-        for candidate_url in candidates:
-            if candidate_url in processed_sitemaps:
-                continue
-            processed_sitemaps.add(candidate_url)
-            
+    def _chunks(self, response, gzipped: bool, budget: _Budget) -> Iterator[bytes]:
+        """Body chunks (gunzipped if needed) until the shared byte budget runs out."""
+        inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+        for chunk in response.iter_content(65536):
+            if inflate is not None:
+                # bounded so a gzip bomb can't expand past the budget in one step
+                chunk = inflate.decompress(chunk, max(budget.bytes_left, 0) + 1)
+            if not budget.take_bytes(len(chunk)):
+                print("[Sitemap] Byte budget exhausted")
+                return
+            yield chunk
+
+    def _fetch(self, url: str, base_url: str, budget: _Budget, deadline: float) -> Optional[Tuple[List[Tuple[str, str]], List[str]]]:
+        """Fetch one robots.txt/sitemap; returns (page entries, referenced sitemaps), None if there is none."""
+        entries: List[Tuple[str, str]] = []
+        refs: List[str] = []
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or budget.exhausted:
+            return None
+        try:
+            response = self.http.get(url, stream=True, timeout=(min(3.0, remaining), remaining))
+        except Exception:
+            return None
+        with response:
+            content_type = response.headers.get("content-type", "").lower()
+            # missing sitemaps often answer 200 with the site's HTML
+            if response.status_code != 200 or "html" in content_type:
+                return None
+            path = urllib.parse.urlparse(url).path.lower()
             try:
-                # Try to load the candidate URL
-                response = page.goto(candidate_url, wait_until="networkidle", timeout=10000)
-                
-                if response and response.status == 200:
-                    content = page.content()
-                    content_type = response.headers.get('content-type', '').lower()
-                    
-                    if 'xml' in content_type or candidate_url.endswith('.xml'):
-                        # Parse as XML sitemap
-                        urls = self.parse_sitemap_xml(content, base_url)
-                        discovered_urls.extend(urls)
-                        print(f"Found {len(urls)} URLs in sitemap: {candidate_url}")
-                        
-                    elif candidate_url.endswith('robots.txt'):
-                        # Parse robots.txt for sitemap references
-                        sitemap_refs = self.parse_robots_txt(content, base_url)
-                        for ref in sitemap_refs:
-                            if ref not in processed_sitemaps:
-                                processed_sitemaps.add(ref)
-                                try:
-                                    # Try to load the referenced sitemap
-                                    ref_response = page.goto(ref, wait_until="networkidle", timeout=10000)
-                                    if ref_response and ref_response.status == 200:
-                                        ref_content = page.content()
-                                        ref_urls = self.parse_sitemap_xml(ref_content, base_url)
-                                        discovered_urls.extend(ref_urls)
-                                        print(f"Found {len(ref_urls)} URLs in referenced sitemap: {ref}")
-                                except Exception as e:
-                                    print(f"Failed to load referenced sitemap {ref}: {e}")
-                                
-                    elif candidate_url.endswith('.txt'):
-                        # Parse as text sitemap (one URL per line)
-                        text_urls = []
-                        for line in content.split('\n'):
-                            line = line.strip()
-                            if line and not line.startswith('#'):
-                                text_urls.append((line, "sitemap"))
-                        discovered_urls.extend(text_urls)
-                        print(f"Found {len(text_urls)} URLs in text sitemap: {candidate_url}")
-                        
+                if path.endswith("robots.txt"):
+                    text = b"".join(self._chunks(response, False, budget)).decode("utf-8", "replace")
+                    return entries, self.parse_robots_txt(text, base_url)
+                gzipped = path.endswith(".gz") or "gzip" in content_type
+                chunks = self._chunks(response, gzipped, budget)
+                if path.endswith(".txt") or "text/plain" in content_type:
+                    pairs = self._iter_text_sitemap(chunks)
+                else:
+                    pairs = self.iter_sitemap_xml(chunks)
+                for loc, text in pairs:
+                    if text == "sitemap":
+                        refs.append(normalize_url(url, loc))
+                    elif budget.take_url():
+                        entries.append((normalize_url(url, loc), text))
+                    else:
+                        break
             except Exception as e:
-                # Silently continue if sitemap doesn't exist or fails to load
-                continue
-        
+                # zlib errors or a connection reset mid-stream: keep what was parsed
+                print(f"[Sitemap] Failed reading {url}: {type(e).__name__}: {e}")
+        return entries, refs
+
+    @staticmethod
+    def _iter_text_sitemap(chunks: Iterable[bytes]) -> Iterator[Tuple[str, str]]:
+        """One URL per line."""
+        rest = b""
+        for chunk in chunks:
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            for line in lines:
+                line = line.strip().decode("utf-8", "replace")
+                if line and not line.startswith("#"):
+                    yield line, "sitemap_txt"
+        line = rest.strip().decode("utf-8", "replace")
+        if line and not line.startswith("#"):
+            yield line, "sitemap_txt"
+
+    def discover_sitemap_urls(self, base_url: str) -> List[Tuple[str, str]]:
+        """Discover and load sitemaps of the site; returns same-domain (url, text) pairs."""
+        self.stats = {"documents": 0, "bytes": 0, "urls": 0}
+        budget = _Budget(self.max_bytes, self.max_urls)
+        deadline = time.monotonic() + self.timeout
+        discovered: List[Tuple[str, str]] = []
+        # (url, depth): robots.txt references are top-level sitemaps, index entries nest one level deeper
+        level = [(url, 0) for url in self.get_sitemap_candidates(base_url)]
+        seen = {url for url, _ in level}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sitemap") as pool:
+            while level and time.monotonic() < deadline and not budget.exhausted:
+                results = pool.map(lambda item: self._fetch(item[0], base_url, budget, deadline), level)
+                next_level = []
+                for (url, depth), result in zip(level, results):
+                    if result is None:
+                        continue
+                    entries, refs = result
+                    self.stats["documents"] += 1
+                    discovered.extend(entries)
+                    child_depth = depth if url.endswith("robots.txt") else depth + 1
+                    if child_depth > self.max_depth:
+                        continue
+                    for ref in refs:
+                        if ref not in seen and len(seen) < self.max_sitemaps:
+                            seen.add(ref)
+                            next_level.append((ref, child_depth))
+                level = next_level
+        self.stats["bytes"] = self.max_bytes - max(budget.bytes_left, 0)
+
         # Filter to same domain and canonicalize
         filtered_urls = []
-        for url, text in discovered_urls:
+        for url, text in discovered:
             if is_same_domain(base_url, url):
                 canonical_url = canonicalize_language(url)
                 filtered_urls.append((canonical_url, text))
-        
-        return filtered_urls
\ No newline at end of file
+        self.stats["urls"] = len(filtered_urls)
+        return filtered_urls
+
+    def menu_seeds(self, base_url: str, limit: Optional[int] = None) -> List[str]:
+        """Menu-like page URLs from the site's sitemaps, to seed the crawl frontier with."""
+        limit = limit if limit is not None else int(os.getenv("SITEMAP_MAX_SEEDS", "20"))
+        seeds, seen = [], set()
+        for url, _ in self.discover_sitemap_urls(base_url):
+            if url not in seen and is_menu_like(url):
+                seen.add(url)
+                seeds.append(url)
+                if len(seeds) >= limit:
+                    break
+        return seeds
@@ -0,0 +1,109 @@
+from __future__ import annotations
+import argparse, json, os, sys, time
+from typing import Any, Dict, List, Optional
+from .utils import registrable_domain, safe_filename
+
+class StorageStateStore:
+    """
+    Persists Playwright storage state (cookies + localStorage) per registrable domain,
+    so consent banners, age gates and language splash pages are cleared only once.
+
+    One JSON file per domain:
+        {"domain": ..., "saved_at": <epoch>, "cookie_accept": ..., "storage_state": {...}}
+    """
+    def __init__(self, directory: Optional[str] = None, ttl_hours: Optional[float] = None):
+        self.directory = directory or os.getenv("STORAGE_STATE_DIR", ".cache/storage_state")
+        self.ttl_seconds = float(ttl_hours if ttl_hours is not None else os.getenv("STORAGE_STATE_TTL_HOURS", "168")) * 3600
+
+    def _path(self, domain: str) -> str:
+        return os.path.join(self.directory, f"{safe_filename(domain.lower())}.json")
+
+    def _read(self, domain: str) -> Optional[Dict[str, Any]]:
+        path = self._path(domain)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[StorageState] Ignoring unreadable state {path}: {e}")
+            return None
+
+        if time.time() - entry.get("saved_at", 0) > self.ttl_seconds:
+            self._remove(domain)
+            return None
+        return entry
+
+    def load(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the storage state for url's domain, or None if missing/expired."""
+        entry = self._read(registrable_domain(url))
+        return entry.get("storage_state") if entry else None
+
+    def cookie_accept(self, url: str) -> Optional[str]:
+        """Cookie banner button text recorded when the state was saved."""
+        entry = self._read(registrable_domain(url))
+        return entry.get("cookie_accept") if entry else None
+
+    def save(self, url: str, storage_state: Dict[str, Any], cookie_accept: Optional[str] = None):
+        domain = registrable_domain(url)
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            "domain": domain,
+            "saved_at": time.time(),
+            "cookie_accept": cookie_accept,
+            "storage_state": storage_state,
+        }
+        # write-then-rename so a crash never leaves a half written state behind
+        path = self._path(domain)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def invalidate(self, domain_or_url: str) -> bool:
+        """Drop the state of a URL's or host's registrable domain (www.b.ch and b.ch are the same)."""
+        # a bare host is parsed as a network location
+        url = domain_or_url if "://" in domain_or_url else "//" + domain_or_url
+        return self._remove(registrable_domain(url))
+
+    def _remove(self, domain: str) -> bool:
+        try:
+            os.remove(self._path(domain))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def clear(self) -> int:
+        removed = 0
+        for domain in self.domains():
+            removed += self._remove(domain)
+        return removed
+
+    def domains(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Manage persisted per-domain browser storage state")
+    ap.add_argument("--dir", default=None, help="storage state directory (default: $STORAGE_STATE_DIR)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list domains with stored state")
+    inv = sub.add_parser("invalidate", help="drop stored state for the given domains or URLs")
+    inv.add_argument("targets", nargs="+")
+    sub.add_parser("clear", help="drop all stored state")
+    args = ap.parse_args(argv)
+
+    store = StorageStateStore(args.dir)
+    if args.command == "list":
+        for domain in store.domains():
+            print(domain)
+    elif args.command == "invalidate":
+        for target in args.targets:
+            print(f"{target}: {'removed' if store.invalidate(target) else 'not found'}")
+    elif args.command == "clear":
+        print(f"Removed {store.clear()} stored states")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
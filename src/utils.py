@@ -1,6 +1,6 @@
 from __future__ import annotations
-import re, urllib.parse
-from typing import Iterable, Set, TypeVar, Callable, Any
+import hashlib, re, unicodedata, urllib.parse
+from typing import Iterable, Optional, Set, TypeVar, Callable, Any
 
 LANG_SEGMENTS = re.compile(r"/(de|en|fr|it)(/|$)", re.IGNORECASE)
 LANG_QUERY = re.compile(r"[?&](lang|language)=(de|en|fr|it)\b", re.IGNORECASE)
@@ -39,6 +39,19 @@ def canonicalize_language(url: str) -> str:
     return final
 
 
+def content_fingerprint(text: str, min_chars: int = 100) -> Optional[str]:
+    """Stable hash of whitespace/case-normalized text, None when the text is too short to identify a page."""
+    normalized = " ".join((text or "").lower().split())
+    if len(normalized) < min_chars:
+        return None
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def safe_filename(name: str) -> str:
+    """Turn a restaurant/domain name into a portable file name; letters of any script are kept (NFC)."""
+    return re.sub(r"[^\w.\-]", "_", unicodedata.normalize("NFC", name)) or "_"
+
+
 def de_duplicate(seq: Iterable[str]) -> list[str]:
     seen: Set[str] = set()
     out = []
@@ -69,7 +82,7 @@ def deduplicate_by_key(items: Iterable[T], key_func: Callable[[T], Any]) -> list
     return list(seen.values())
 
 def guess_languages_from_text(s: str) -> list[str]:
-    """Very light heuristic fallback (before langdetect)."""
+    """Very light keyword heuristic; the crawler identifies languages with language_id.detect_languages."""
     s_low = s.lower()
     langs = []
     if any(w in s_low for w in ["und", "speisekarte", "getränke", "wein", "mittagessen"]): langs.append("de")
@@ -77,3 +90,20 @@ def guess_languages_from_text(s: str) -> list[str]:
     if any(w in s_low for w in ["et", "carte", "vin", "desserts"]): langs.append("fr")
     if any(w in s_low for w in ["e", "vino", "carta"]): langs.append("it")
     return de_duplicate(langs)[:3]
+
+_TLD_EXTRACT = None
+
+def _tld_extract():
+    # offline suffix list snapshot bundled with tldextract, built on first use
+    global _TLD_EXTRACT
+    if _TLD_EXTRACT is None:
+        import tldextract
+        _TLD_EXTRACT = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+    return _TLD_EXTRACT
+
+def registrable_domain(url: str) -> str:
+    """Return the registrable domain (eTLD+1) of url, e.g. 'media.chez-smith.ch' -> 'chez-smith.ch'.
+    Falls back to the hostname for IPs, localhost and unknown suffixes."""
+    parsed = urllib.parse.urlparse(url)
+    host = (parsed.hostname or "").lower()
+    return _tld_extract()(host).registered_domain or host
@@ -0,0 +1,395 @@
+from __future__ import annotations
+import argparse, json, os, socket, sqlite3, sys, threading, time, uuid
+from typing import Any, Dict, Iterator, List, Optional
+from .models import RestaurantResult
+from .output_generator import save_results
+
+class Lease:
+    """A restaurant handed to one worker until `expires` (extended by heartbeats)."""
+    __slots__ = ("job_id", "name", "url", "attempt", "token", "expires")
+
+    def __init__(self, job_id: int, name: str, url: str, attempt: int, token: str, expires: float):
+        self.job_id = job_id
+        self.name = name
+        self.url = url
+        self.attempt = attempt
+        self.token = token
+        self.expires = expires
+
+class WorkQueue:
+    """
+    Interface of the shared crawl queue. A restaurant is leased to one worker at a time;
+    if the worker stops heartbeating before complete()/fail(), the lease expires and the
+    restaurant becomes visible to other workers again. Failed attempts are retried with
+    exponential backoff up to `max_attempts`, then parked as dead.
+
+    SQLiteWorkQueue works on one machine or a shared filesystem; a network queue
+    (Redis, SQS, Postgres, ...) only has to implement these methods.
+    """
+    def enqueue(self, restaurants: Dict[str, str]) -> int:
+        raise NotImplementedError
+
+    def lease(self, worker_id: str) -> Optional[Lease]:
+        raise NotImplementedError
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """Extend the lease; False if it was lost (expired and taken over)."""
+        raise NotImplementedError
+
+    def complete(self, lease: Lease, result: RestaurantResult) -> bool:
+        raise NotImplementedError
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        raise NotImplementedError
+
+    def remaining(self) -> int:
+        """Restaurants not done or dead yet (pending or leased)."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def results(self) -> Iterator[RestaurantResult]:
+        raise NotImplementedError
+
+    def get_meta(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set_meta(self, key: str, value: str):
+        raise NotImplementedError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, available_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    WorkQueue in a SQLite file (WAL mode). Leases are taken in an IMMEDIATE transaction so two
+    workers never get the same restaurant. Connections are per thread, so the heartbeat thread
+    of a worker can share the queue object.
+    """
+    def __init__(self, path: str, visibility_timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None, retry_backoff: Optional[float] = None):
+        self.path = path
+        self.visibility_timeout = visibility_timeout or float(os.getenv("WORK_QUEUE_VISIBILITY_TIMEOUT", "600"))
+        self.max_attempts = max_attempts or int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else float(os.getenv("WORK_QUEUE_RETRY_BACKOFF", "30"))
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, restaurants: Dict[str, str]) -> int:
+        """Add restaurants not in the queue yet; returns how many were added."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (name, url, updated_at) VALUES (?, ?, ?)",
+                [(name, url, now) for name, url in restaurants.items()],
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def lease(self, worker_id: str) -> Optional[Lease]:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = conn.execute(
+                    "SELECT id, name, url, attempts FROM jobs "
+                    "WHERE (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?) "
+                    "ORDER BY id LIMIT 1", (now, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                if row["attempts"] >= self.max_attempts:
+                    # expired lease on the last attempt: the worker died on it every time
+                    conn.execute(
+                        "UPDATE jobs SET state = 'dead', lease_owner = NULL, lease_token = NULL, lease_expires = NULL, "
+                        "last_error = COALESCE(last_error, 'lease expired'), updated_at = ? WHERE id = ?", (now, row["id"]),
+                    )
+                    continue
+                token = uuid.uuid4().hex
+                expires = now + self.visibility_timeout
+                conn.execute(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_owner = ?, lease_token = ?, "
+                    "lease_expires = ?, updated_at = ? WHERE id = ?", (worker_id, token, expires, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+                return Lease(row["id"], row["name"], row["url"], row["attempts"] + 1, token, expires)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _update_leased(self, lease: Lease, sql: str, params: tuple) -> bool:
+        cur = self._conn().execute(f"{sql} WHERE id = ? AND lease_token = ? AND state = 'leased'",
+                                   params + (lease.job_id, lease.token))
+        return cur.rowcount == 1
+
+    def heartbeat(self, lease: Lease) -> bool:
+        expires = time.time() + self.visibility_timeout
+        if self._update_leased(lease, "UPDATE jobs SET lease_expires = ?", (expires,)):
+            lease.expires = expires
+            return True
+        return False
+
+    def complete(self, lease: Lease, result: RestaurantResult) -> bool:
+        return self._update_leased(
+            lease,
+            "UPDATE jobs SET state = 'done', result = ?, lease_owner = NULL, lease_token = NULL, "
+            "lease_expires = NULL, updated_at = ?",
+            (json.dumps(result.model_dump(), ensure_ascii=False), time.time()),
+        )
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        now = time.time()
+        if lease.attempt >= self.max_attempts:
+            return self._update_leased(
+                lease,
+                "UPDATE jobs SET state = 'dead', last_error = ?, lease_owner = NULL, lease_token = NULL, "
+                "lease_expires = NULL, updated_at = ?", (error, now),
+            )
+        retry_at = now + self.retry_backoff * 2 ** (lease.attempt - 1)
+        return self._update_leased(
+            lease,
+            "UPDATE jobs SET state = 'pending', available_at = ?, last_error = ?, lease_owner = NULL, "
+            "lease_token = NULL, lease_expires = NULL, updated_at = ?", (retry_at, error, now),
+        )
+
+    def requeue_dead(self) -> int:
+        """Give dead restaurants a fresh set of attempts."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET state = 'pending', attempts = 0, available_at = 0, updated_at = ? WHERE state = 'dead'",
+            (time.time(),),
+        )
+        return cur.rowcount
+
+    def remaining(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        counts = {row["state"]: row["n"] for row in conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")}
+        workers = {
+            row["lease_owner"]: row["n"] for row in conn.execute(
+                "SELECT lease_owner, COUNT(*) AS n FROM jobs WHERE state = 'leased' GROUP BY lease_owner")
+        }
+        return {"jobs": counts, "leased_by": workers, "retries": conn.execute(
+            "SELECT COALESCE(SUM(attempts - 1), 0) FROM jobs WHERE attempts > 1").fetchone()[0]}
+
+    def dead(self) -> List[sqlite3.Row]:
+        return self._conn().execute("SELECT name, url, attempts, last_error FROM jobs WHERE state = 'dead' ORDER BY id").fetchall()
+
+    def results(self) -> Iterator[RestaurantResult]:
+        """Finished restaurants in queue order."""
+        for row in self._conn().execute("SELECT result FROM jobs WHERE state = 'done' ORDER BY id"):
+            yield RestaurantResult.model_validate_json(row["result"])
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self._conn().execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+class _Heartbeat:
+    """Background thread extending a lease every `interval` seconds while the crawl runs."""
+    def __init__(self, queue: WorkQueue, lease: Lease, interval: float):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.queue.heartbeat(self.lease):
+                print(f"[Worker] Lease on {self.lease.name} lost")
+                self.lost = True
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def run_worker(queue: WorkQueue, crawl, worker_id: Optional[str] = None, poll_interval: float = 5.0,
+               heartbeat_interval: Optional[float] = None, on_result=None, exit_when_empty: bool = True) -> int:
+    """
+    Lease restaurants and crawl them until the queue is drained. `crawl(name, url)` returns a
+    RestaurantResult; `on_result(result)` is called for every completed site (e.g. to upsert
+    into a shared ResultsStore). Returns the number of sites completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    timeout = getattr(queue, "visibility_timeout", 600.0)
+    heartbeat_interval = heartbeat_interval or max(1.0, timeout / 3)
+    completed = 0
+    while True:
+        lease = queue.lease(worker_id)
+        if lease is None:
+            if exit_when_empty and queue.remaining() == 0:
+                break
+            time.sleep(poll_interval)  # leased elsewhere or waiting for a retry backoff
+            continue
+        print(f"[Worker] {worker_id} crawling {lease.name} (attempt {lease.attempt})")
+        with _Heartbeat(queue, lease, heartbeat_interval) as hb:
+            try:
+                result = crawl(lease.name, lease.url)
+                error = None
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+        if hb.lost:
+            continue  # another worker owns the restaurant now
+        if error is not None:
+            print(f"[Worker] {lease.name} failed: {error}")
+            queue.fail(lease, error)
+            continue
+        if queue.complete(lease, result):
+            completed += 1
+            if on_result is not None:
+                on_result(result)
+    print(f"[Worker] {worker_id} done, {completed} sites completed")
+    return completed
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Shared crawl queue: enqueue restaurants, run workers on any number of nodes")
+    ap.add_argument("--queue", default=os.getenv("WORK_QUEUE_PATH", "output/queue.db"), help="SQLite queue file (shared filesystem for several nodes)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    enqueue = sub.add_parser("enqueue", help="add restaurants to the queue")
+    enqueue.add_argument("--input", default="input/restaurants.json")
+    enqueue.add_argument("--db", default=os.getenv("RESULTS_DB"), help="SQLite results store workers record this run in")
+    work = sub.add_parser("work", help="lease and crawl restaurants until the queue is drained")
+    work.add_argument("--types", default="input/menutypes.json")
+    work.add_argument("--worker-id", default=None)
+    work.add_argument("--keep-running", action="store_true", help="wait for new restaurants instead of exiting when drained")
+    work.add_argument("--storage-state-dir", default=None)
+    work.add_argument("--no-storage-state", action="store_true")
+    work.add_argument("--blob-store-dir", default=None)
+    work.add_argument("--no-blob-store", action="store_true")
+    work.add_argument("--profile", nargs="?", const=os.getenv("PROFILE_DIR", "output/profiles"), default=None, metavar="DIR",
+                      help="cProfile every crawl, one .prof file per restaurant in DIR (default: output/profiles)")
+    sub.add_parser("status", help="job counts, active workers and dead restaurants")
+    sub.add_parser("requeue-dead", help="retry restaurants that ran out of attempts")
+    export = sub.add_parser("export", help="write finished restaurants in the output.json layout")
+    export.add_argument("--out", default="output/output.json")
+    args = ap.parse_args(argv)
+
+    queue = SQLiteWorkQueue(args.queue)
+    if args.command == "enqueue":
+        with open(args.input, "r", encoding="utf-8") as f:
+            restaurants = json.load(f)["restaurants"]
+        print(f"Enqueued {queue.enqueue(restaurants)} of {len(restaurants)} restaurants into {args.queue}")
+        if args.db and queue.get_meta("results_db") is None:
+            from .results_store import ResultsStore
+            store = ResultsStore(args.db)
+            queue.set_meta("results_db", args.db)
+            queue.set_meta("run_id", str(store.start_run(args.input)))
+            store.close()
+    elif args.command == "work":
+        _work(queue, args)
+    elif args.command == "status":
+        print(json.dumps(queue.stats(), indent=2))
+        for row in queue.dead():
+            print(f"dead: {row['name']} ({row['attempts']} attempts): {row['last_error']}")
+    elif args.command == "requeue-dead":
+        print(f"Requeued {queue.requeue_dead()} restaurants")
+    elif args.command == "export":
+        results = list(queue.results())
+        save_results(args.out, results)
+        print(f"Exported {len(results)} restaurants to {args.out}")
+    return 0
+
+def _work(queue: SQLiteWorkQueue, args):
+    from playwright.sync_api import sync_playwright
+    from .browser_pool import WarmBrowser
+    from .crawler import SiteCrawler
+    from .storage_state import StorageStateStore
+    from .blob_store import BlobStore
+    from .profiling import SiteProfiler
+
+    with open(args.types, "r", encoding="utf-8") as f:
+        menutypes = json.load(f)["menus"]
+    storage_state_store = None if args.no_storage_state else StorageStateStore(args.storage_state_dir)
+    blob_store = None if args.no_blob_store else BlobStore(args.blob_store_dir)
+    # workers of other processes may write to the same directory, so nothing is reset
+    profiler = SiteProfiler(args.profile) if args.profile else None
+    store, run_id = None, queue.get_meta("run_id")
+    if queue.get_meta("results_db"):
+        from .results_store import ResultsStore
+        store = ResultsStore(queue.get_meta("results_db"))
+    with sync_playwright() as p:
+        warm, crawler = WarmBrowser(lambda: p.chromium.launch(headless=True)), None
+
+        def crawl(name: str, url: str) -> RestaurantResult:
+            # one warm browser per worker (recycled on its limits), a fresh context per site
+            nonlocal crawler
+            crawler = SiteCrawler(name, url, menutypes, storage_state_store=storage_state_store, blob_store=blob_store)
+            try:
+                if profiler is not None:
+                    profiler.run(name, lambda: crawler.crawl_site(browser=warm.get()))
+                else:
+                    crawler.crawl_site(browser=warm.get())
+            finally:
+                warm.after_site(crawler.stats["navigations"])
+            return crawler.result()
+
+        def on_result(result: RestaurantResult):
+            if store is not None:
+                store.upsert_site(int(run_id), result, crawler.pages, crawler.menu_content_hashes())
+
+        run_worker(queue, crawl, args.worker_id, on_result=on_result, exit_when_empty=not args.keep_running)
+        warm.close()
+    if store is not None:
+        if queue.remaining() == 0:
+            store.finish_run(int(run_id))
+        store.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+from __future__ import annotations
+import multiprocessing, os, threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+class ProcessWorkerPool:
+    """
+    Worker processes for CPU-bound document work (PyMuPDF parsing, OCR). The work then neither
+    holds the GIL of the crawl threads nor takes the crawler down with a crashing document.
+    Each subclass has one pool per process (see shared()). Its size comes from the
+    `workers_env` variable, and 0 runs the work in the calling thread.
+    """
+    workers_env = ""
+    label = "Worker"
+    _shared: Dict[type, "ProcessWorkerPool"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers if workers is not None else int(os.getenv(self.workers_env, str(min(2, os.cpu_count() or 1))))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        with ProcessWorkerPool._shared_lock:
+            pool = ProcessWorkerPool._shared.get(cls)
+            if pool is None:
+                pool = ProcessWorkerPool._shared[cls] = cls()
+            return pool
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the crawler process runs threads (browsers, service workers), forking it isn't safe
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def run(self, fn: Callable[..., Any], *args, default: Any = None) -> Any:
+        """fn(*args) in a worker process; `default` if the worker died on it."""
+        if self.workers <= 0:
+            return fn(*args)
+        try:
+            return self._pool().submit(fn, *args).result()
+        except BrokenProcessPool:
+            # a worker died (e.g. on a malformed document): start a fresh pool next time
+            print(f"[{self.label}] Worker died, restarting the pool")
+            self.shutdown()
+            return default
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
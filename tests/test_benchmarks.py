@@ -0,0 +1,111 @@
+"""
+Tests for the offline benchmark fixtures in benchmarks/
+"""
+import json
+import os
+import pytest
+import requests
+from benchmarks.fixture_server import CORPUS_DIR, FixtureServer, list_sites
+from benchmarks.crawl_bench import summarize
+from benchmarks.import_time import check as check_import_time
+from benchmarks.stub_llm import ScriptedRules, StubConfig, StubLLMServer
+
+
+class TestFixtureServer:
+    """Test the local corpus server"""
+
+    def test_corpus_sites(self):
+        """Every corpus site should have an index page and expected menus"""
+        sites = list_sites()
+        assert {"cookie_banner", "js_heavy", "pdf_menus", "deep_tree"} <= set(sites)
+        for site in sites:
+            assert os.path.exists(os.path.join(CORPUS_DIR, site, "expected.json"))
+
+    def test_serves_rendered_pdf_with_ranges(self):
+        """PDFs should be rendered from text and support byte ranges"""
+        with FixtureServer(os.path.join(CORPUS_DIR, "pdf_menus")) as server:
+            full = requests.get(server.url + "menus/mittag.pdf", timeout=5)
+            part = requests.get(server.url + "menus/mittag.pdf", headers={"Range": "bytes=0-9"}, timeout=5)
+            missing = requests.get(server.url + "menus/none.pdf", timeout=5)
+
+        assert full.status_code == 200
+        assert full.content.startswith(b"%PDF")
+        assert part.status_code == 206
+        assert part.content == full.content[:10]
+        assert missing.status_code == 404
+        assert server.requests["/menus/mittag.pdf"] == 2
+
+
+class TestBenchmarkReport:
+    """Test report aggregation"""
+
+    def test_summarize(self):
+        """Totals should aggregate pages, stages and per-site averages"""
+        site = {"wall_seconds": 2.0, "pages": 4, "navigations": 3, "llm_calls_total": 6, "stage_seconds": {"navigation": 1.0}}
+        totals = summarize({"a": site, "b": site})
+        assert totals["pages_per_second"] == 2.0
+        assert totals["llm_calls_per_site"] == 6
+        assert totals["stage_seconds"] == {"navigation": 2.0}
+
+
+def chat(server, system, user):
+    body = {"model": "x", "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}]}
+    return requests.post(server.base_url + "/chat/completions", json=body, timeout=5)
+
+
+class TestStubLLM:
+    """Test the OpenAI-compatible stub endpoint"""
+
+    def test_rules_answer_classifier_prompts(self):
+        """The scripted rules should recognise both classifier prompts and answer in their schema"""
+        rules = ScriptedRules()
+        with open("prompts/small_noise_classifier.txt", encoding="utf-8") as f:
+            noise = [{"role": "system", "content": f.read()},
+                     {"role": "user", "content": '{"links": [{"url": "https://a.ch/speisekarte", "text": "Menu"}, {"url": "https://a.ch/jobs", "text": "Jobs"}]}'}]
+        with open("prompts/menu_classifier.txt", encoding="utf-8") as f:
+            menu = [{"role": "system", "content": f.read()},
+                    {"role": "user", "content": '{"PAGE_URL": "https://a.ch/mittag.pdf", "PAGE_CONTENT": "Mittagsmenu mit Salat 12.50, Suppe 8.00, Pasta 19.50"}'}]
+
+        assert rules.kind(noise) == "noise" and rules.kind(menu) == "menu"
+        links = json.loads(rules.answer("noise", noise))["links"]
+        assert [link["confidence"] for link in links] == [0.1, 0.9]
+        verdict = json.loads(rules.answer("menu", menu))["menus"][0]
+        assert verdict["type_code"] == "oct_lunch"
+        assert verdict["format"] == "pdf"
+
+    def test_counts_requests_and_injects_errors(self):
+        """Every request should be counted; error_rate=1 should fail every request"""
+        with StubLLMServer() as server:
+            ok = chat(server, "other", "hello")
+            stats = server.stats()
+        with StubLLMServer(config=StubConfig(error_rate=1.0)) as failing:
+            bad = chat(failing, "other", "hello")
+            failed = failing.stats()
+
+        assert ok.status_code == 200
+        assert ok.json()["choices"][0]["message"]["content"] == "{}"
+        assert stats["totals"]["requests"] == 1
+        assert bad.status_code == 500
+        assert failed["totals"]["errors"] == 1
+
+    def test_prefix_cache(self):
+        """A prompt sharing its start with an earlier one should report those tokens as cached"""
+        with StubLLMServer() as server:
+            first = chat(server, "system " * 100, "page one")
+            second = chat(server, "system " * 100, "page two")
+            stats = server.stats()
+
+        assert first.json()["usage"]["prompt_tokens_details"]["cached_tokens"] == 0
+        cached = second.json()["usage"]["prompt_tokens_details"]["cached_tokens"]
+        assert cached >= 175
+        assert stats["totals"]["cached_prompt_tokens"] == cached
+
+
+class TestImportTime:
+    """Test that the entry points keep heavy dependencies lazy"""
+
+    def test_no_heavy_imports_at_startup(self):
+        """Importing src.main should not load langchain, fitz, playwright, bs4, requests, ..."""
+        result = check_import_time("src.main", budget_ms=float("inf"))
+        assert result["heavy_imports"] == []
+        assert result["total_ms"] > 0
@@ -0,0 +1,154 @@
+"""
+Unit tests for the content-addressed document store in src/blob_store.py
+"""
+import os
+import pytest
+from benchmarks.fixture_server import FixtureServer, render_pdf
+from src.agent import MenuClassifier
+from src.blob_store import BlobStore, main, sha256
+from src.http_client import pooled_session
+from src.models import CrawlTask, MenuItem
+from src.parser import PDFPageParser
+from src.pdf_analysis import PDFAnalysisPool
+
+MENU = "Speisekarte\n" + "\n".join(f"Gericht {i} mit Beilage CHF {10 + i}.50" for i in range(30))
+
+
+def analysis(text="menu"):
+    return {"text": text, "page_count": 1, "pages": [0], "digest": None}
+
+
+class TestBlobStore:
+    """Test storing, verdicts and garbage collection"""
+
+    def test_roundtrip(self, tmp_path):
+        """Documents are found by the hash of their bytes"""
+        store = BlobStore(str(tmp_path))
+        data = b"%PDF-1.4 menu"
+        store.put(sha256(data), data, analysis())
+        assert store.get(sha256(data))["analysis"]["text"] == "menu"
+        assert store.read(sha256(data)) == data
+        assert store.get(sha256(b"other")) is None
+        assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+    def test_verdicts_per_classifier_key(self, tmp_path):
+        """A stored "not a menu" differs from no verdict, and verdicts survive a re-put"""
+        store = BlobStore(str(tmp_path))
+        digest = sha256(b"doc")
+        store.put(digest, b"doc", analysis())
+        store.set_verdict(digest, "a", None)
+        store.put(digest, b"doc", analysis("new text"))
+        assert store.verdict(digest, "a") == (True, None)
+        assert store.verdict(digest, "b") == (False, None)
+
+    def test_gc_evicts_least_recently_used(self, tmp_path):
+        """Entries not used for the longest time go first"""
+        store = BlobStore(str(tmp_path))
+        digests = []
+        for i in range(3):
+            data = os.urandom(1000)
+            digests.append(sha256(data))
+            store.put(digests[-1], data, analysis())
+            for path in store._paths(digests[-1]):
+                os.utime(path, (1000 + i, 1000 + i))
+        store.get(digests[0])  # touched: now the most recent
+        assert store.gc(max_bytes=store.size() - 1) == 1
+        assert store.get(digests[1]) is None
+        assert store.get(digests[0]) and store.get(digests[2])
+
+    def test_size_cap(self, tmp_path):
+        """Writes over BLOB_STORE_MAX_MB trigger garbage collection"""
+        store = BlobStore(str(tmp_path), max_mb=0.0025)
+        for _ in range(5):
+            data = os.urandom(1000)
+            store.put(sha256(data), data, analysis())
+        assert store.size() <= 2500
+        assert store.stats()["evicted"] >= 3
+
+    def test_size_tracked_on_rewrites(self, tmp_path):
+        """Re-putting an entry and adding verdicts keep the tracked size equal to the files on disk"""
+        store = BlobStore(str(tmp_path))
+        data = os.urandom(1000)
+        digest = sha256(data)
+        store.put(digest, data, analysis())
+        assert store.size() > 0
+        for _ in range(3):
+            store.put(digest, data, analysis("more text"))
+        store.set_verdict(digest, "a", {"type_code": "oct_menu"})
+        assert store.size() == sum(size for _, size, _ in store.entries())
+
+    def test_gc_command_trims_to_cap(self, tmp_path, capsys):
+        """The gc command evicts down to the given cap, not to the low-water mark"""
+        store = BlobStore(str(tmp_path))
+        for _ in range(20):
+            data = os.urandom(100)
+            store.put(sha256(data), data, analysis())
+        total = store.size()
+        main(["--dir", str(tmp_path), "gc", "--max-mb", str((total - 1) / 1_000_000)])
+        assert "Evicted 1 documents" in capsys.readouterr().out
+
+    def test_gc_to_low_water_mark(self, tmp_path):
+        """Collection frees room below the cap, so the next writes don't collect again"""
+        store = BlobStore(str(tmp_path), max_mb=0.01)
+        while not store.stats()["evicted"]:
+            data = os.urandom(1000)
+            store.put(sha256(data), data, analysis())
+        assert store.size() <= 0.9 * store.max_bytes
+        evicted = store.stats()["evicted"]
+        data = os.urandom(100)
+        store.put(sha256(data), data, analysis())
+        assert store.stats()["evicted"] == evicted
+
+
+class TestPDFReuse:
+    """Test that known PDFs skip analysis and classification"""
+
+    @pytest.fixture
+    def server(self, tmp_path):
+        site = tmp_path / "site"
+        site.mkdir()
+        data = render_pdf(MENU)
+        for name in ("menu.pdf", "copy.pdf"):
+            (site / name).write_bytes(data)
+        with FixtureServer(str(site)) as server:
+            yield server
+
+    def parser(self, url, store):
+        return PDFPageParser(None, CrawlTask(url=url, depth=1), {"oct_menu": "Menu"}, http_session=pooled_session(),
+                             blob_store=store)
+
+    def test_same_pdf_from_another_url(self, server, tmp_path, monkeypatch):
+        """A second URL with the same bytes reuses text and verdict"""
+        store = BlobStore(str(tmp_path / "blobs"))
+        calls = []
+
+        def classify(self, **kwargs):
+            calls.append(kwargs["page_url"])
+            return MenuItem(link=kwargs["page_url"], type_code="oct_menu", type_label="Menu", format="pdf",
+                            languages=["de"], confidence=0.9)
+        monkeypatch.setattr(MenuClassifier, "classify", classify)
+
+        first = self.parser(server.url + "menu.pdf", store)
+        first.classify(first.analyze())
+        assert first.reused is None
+
+        monkeypatch.setattr(PDFAnalysisPool, "analyze", lambda *args: pytest.fail("analyzed again"))
+        second = self.parser(server.url + "copy.pdf", store)
+        item = second.classify(second.analyze())
+        assert second.reused == "verdict"
+        assert calls == [server.url + "menu.pdf"]
+        assert item.link == server.url + "copy.pdf"
+        assert item.languages == ["de"] and item.confidence == 0.9
+        assert second.content_fingerprint == first.content_fingerprint
+
+    def test_classifier_errors_not_stored(self, server, tmp_path, monkeypatch):
+        """A failed classification is retried next time"""
+        store = BlobStore(str(tmp_path / "blobs"))
+
+        def classify(self, **kwargs):
+            self.failed = True
+        monkeypatch.setattr(MenuClassifier, "classify", classify)
+        parser = self.parser(server.url + "menu.pdf", store)
+        analyzed = parser.analyze()
+        parser.classify(analyzed)
+        assert store.verdict(analyzed.digest, MenuClassifier({"oct_menu": "Menu"}).cache_key()) == (False, None)
@@ -0,0 +1,206 @@
+"""
+Unit tests for page/context/browser recycling in src/browser_pool.py and SiteCrawler
+"""
+import subprocess
+import sys
+import pytest
+from src.browser_pool import RecyclePolicy, WarmBrowser, children_rss_kb, process_rss_kb
+from src.crawler import SiteCrawler
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connected = False
+
+    def new_context(self, **options):
+        ctx = FakeContext(options)
+        self.contexts.append(ctx)
+        return ctx
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, options):
+        self.options = options
+        self.pages = []
+        self.closed = False
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def new_page(self):
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+    def storage_state(self):
+        return {"cookies": [{"name": "consent", "value": "yes"}], "origins": []}
+
+    def close(self):
+        self.closed = True
+
+
+class TestRecyclePolicy:
+    """Test recycle limits"""
+
+    def test_env_defaults(self, monkeypatch):
+        """Limits are read from the environment"""
+        monkeypatch.setenv("PAGE_RECYCLE_NAVIGATIONS", "7")
+        monkeypatch.setenv("BROWSER_RSS_LIMIT_MB", "0")
+        policy = RecyclePolicy()
+        assert policy.page_navigations == 7
+        assert policy.browser_rss_mb == 0
+
+    def test_explicit_values_win(self, monkeypatch):
+        """Arguments override the environment"""
+        monkeypatch.setenv("CONTEXT_RECYCLE_NAVIGATIONS", "7")
+        assert RecyclePolicy(context_navigations=3).context_navigations == 3
+
+
+class TestWarmBrowser:
+    """Test the long-lived pool browser"""
+
+    def make(self, **policy):
+        launched = []
+
+        def launch():
+            launched.append(FakeBrowser())
+            return launched[-1]
+        return WarmBrowser(launch, RecyclePolicy(**{"page_navigations": 0, "context_navigations": 0,
+                                                    "browser_navigations": 0, "browser_rss_mb": 0, **policy})), launched
+
+    def test_reused_between_sites(self):
+        """The browser is launched once while under its limits"""
+        warm, launched = self.make(browser_navigations=10)
+        assert warm.get() is warm.get()
+        warm.after_site(4)
+        warm.get()
+        assert len(launched) == 1
+
+    def test_recycled_after_navigation_limit(self):
+        """A browser that served browser_navigations is closed and relaunched"""
+        warm, launched = self.make(browser_navigations=10)
+        warm.get()
+        warm.after_site(6)
+        warm.after_site(6)
+        assert not launched[0].connected
+        warm.get()
+        assert len(launched) == 2
+        assert warm.stats() == {"launches": 2, "recycles": 1, "navigations": 0}
+
+    def test_recycled_over_rss_limit(self):
+        """Browser processes over browser_rss_mb trigger a relaunch"""
+        warm, launched = self.make(browser_rss_mb=100)
+        warm.get()
+        warm.after_site(1, browser_rss_kb=50 * 1024)
+        assert launched[0].connected
+        warm.after_site(1, browser_rss_kb=150 * 1024)
+        assert not launched[0].connected
+
+    def test_relaunched_after_crash(self):
+        """A disconnected browser is replaced on the next get()"""
+        warm, launched = self.make()
+        warm.get().connected = False
+        warm.get()
+        assert len(launched) == 2
+
+
+class TestCrawlerRecycling:
+    """Test page and context recycling inside one site"""
+
+    def crawler(self, **policy):
+        crawler = SiteCrawler("R", "https://r.ch/", {}, recycle_policy=RecyclePolicy(browser_navigations=0, browser_rss_mb=0, **policy))
+        browser = FakeBrowser()
+        crawler._ctx = browser.new_context()
+        return crawler, browser
+
+    def test_page_replaced(self):
+        """The page is closed and replaced every page_navigations"""
+        crawler, browser = self.crawler(page_navigations=2, context_navigations=0)
+        first = crawler._current_page(browser)
+        crawler.stats["navigations"] = 1
+        assert crawler._current_page(browser) is first
+        crawler.stats["navigations"] = 2
+        second = crawler._current_page(browser)
+        assert second is not first and first.closed
+        assert crawler.stats["pages_recycled"] == 1
+
+    def test_context_replaced_with_storage_state(self):
+        """A recycled context carries the cookies over"""
+        crawler, browser = self.crawler(page_navigations=0, context_navigations=3)
+        crawler._current_page(browser)
+        crawler.stats["navigations"] = 3
+        crawler._current_page(browser)
+        old, new = browser.contexts
+        assert old.closed
+        assert new.options["storage_state"]["cookies"][0]["name"] == "consent"
+        assert len(new.handlers["response"]) == 1  # the response capture follows the context
+        assert crawler.stats["contexts_recycled"] == 1
+
+    def test_context_kept_while_recording(self):
+        """The context is never replaced while a HAR archive records it"""
+        crawler, browser = self.crawler(page_navigations=0, context_navigations=1)
+        crawler._har_archive = object()
+        crawler._current_page(browser)
+        crawler.stats["navigations"] = 5
+        crawler._current_page(browser)
+        assert len(browser.contexts) == 1
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+class TestMemory:
+    """Test RSS measurements"""
+
+    def test_process_rss(self):
+        """The current process has a positive RSS"""
+        assert process_rss_kb() > 0
+
+    def test_children_rss(self):
+        """Children RSS is a number even without browsers"""
+        assert children_rss_kb() >= 0
+
+    def test_rss_limit_per_browser(self):
+        """Each warm browser is measured by its own processes, not those of the other browsers"""
+        processes = []
+
+        class ProcessBrowser(FakeBrowser):
+            def __init__(self, megabytes):
+                super().__init__()
+                script = f"import sys, time; b = b'x' * ({megabytes} << 20); print(flush=True); time.sleep(60)"
+                self.process = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE)
+                self.process.stdout.readline()
+                processes.append(self.process)
+
+            def close(self):
+                super().close()
+                self.process.kill()
+
+        policy = RecyclePolicy(page_navigations=0, context_navigations=0, browser_navigations=0, browser_rss_mb=60)
+        small, large = WarmBrowser(lambda: ProcessBrowser(1), policy), WarmBrowser(lambda: ProcessBrowser(80), policy)
+        try:
+            small.get(), large.get()
+            assert small.rss_kb() < 60 * 1024 < large.rss_kb()
+            assert children_rss_kb() > 60 * 1024
+            small.after_site(1)
+            large.after_site(1)
+            assert small.browser is not None and small.recycles == 0
+            assert large.browser is None and large.recycles == 1
+        finally:
+            for process in processes:
+                process.kill()
+                process.wait()
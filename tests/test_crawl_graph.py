@@ -0,0 +1,74 @@
+"""
+Unit tests for the internal crawl graph in src/crawl_graph.py
+"""
+import pytest
+from src.crawl_graph import CrawlGraph, GraphTask
+from src.link_extractor import LinkExtractor
+
+
+class TestCrawlGraph:
+    """Test URL interning, parent pointers and export"""
+
+    def test_urls_are_interned_by_canonical_form(self):
+        """Language variants of a seen URL should not create new nodes"""
+        graph = CrawlGraph()
+        root = graph.add("https://example.com/de/")
+        child = graph.add("https://example.com/de/menu", parent=root)
+
+        assert graph.add("https://example.com/en/menu", parent=root) is None
+        assert graph.node_id("https://example.com/fr/menu") == child
+        assert len(graph) == 2
+
+    def test_depth_and_call_stack_follow_parents(self):
+        """Depth and call stack should be derived from parent pointers"""
+        graph = CrawlGraph()
+        root = graph.add("https://example.com/")
+        mid = graph.add("https://example.com/food", parent=root)
+        leaf = graph.add("https://example.com/food/lunch.pdf", parent=mid)
+
+        assert graph.depth(leaf) == 2
+        assert graph.call_stack(leaf) == ["https://example.com/", "https://example.com/food"]
+        assert graph.path(leaf)[-1] == "https://example.com/food/lunch.pdf"
+
+    def test_export_includes_menu_paths(self):
+        """Export should list nodes and the path to each menu link"""
+        graph = CrawlGraph()
+        root = graph.add("https://example.com/")
+        menu = graph.add("https://example.com/menu", parent=root)
+        graph.mark_visited(root)
+
+        exported = graph.to_dict(["https://example.com/menu"])
+
+        assert exported["nodes"][0] == {"id": 0, "url": "https://example.com/", "parent": None, "depth": 0, "visited": True}
+        assert exported["nodes"][menu]["parent"] == root
+        assert exported["menus"] == [{"link": "https://example.com/menu", "path": ["https://example.com/", "https://example.com/menu"]}]
+
+
+    def test_pruned_subtree(self):
+        """Nodes below a pruned node should report as pruned, the node itself should not"""
+        graph = CrawlGraph()
+        root = graph.add("https://example.com/")
+        menu = graph.add("https://example.com/wine", parent=root)
+        child = graph.add("https://example.com/wine/red", parent=menu)
+        grandchild = graph.add("https://example.com/wine/red/1", parent=child)
+        sibling = graph.add("https://example.com/lunch", parent=root)
+        graph.prune(menu)
+
+        assert graph.is_pruned(menu) is False
+        assert graph.is_pruned(child) is True
+        assert graph.is_pruned(grandchild) is True
+        assert graph.is_pruned(sibling) is False
+
+class TestGraphTask:
+    """Test GraphTask as a CrawlTask stand-in"""
+
+    def test_graph_task_works_with_link_extractor(self):
+        """LinkExtractor should accept a GraphTask like a CrawlTask"""
+        graph = CrawlGraph()
+        node = graph.add("https://example.com/")
+        for depth in range(3):
+            node = graph.add(f"https://example.com/{depth}", parent=node)
+        task = GraphTask(graph, node)
+
+        assert task.depth == 3
+        assert LinkExtractor(max_depth=2).extract(None, task) == []
@@ -0,0 +1,49 @@
+"""
+Unit tests for HAR record/replay in src/har_archive.py
+"""
+import json
+import os
+import pytest
+import requests
+from benchmarks.fixture_server import CORPUS_DIR, FixtureServer
+from src.har_archive import HarArchive
+from src.parser import PDFPageParser
+from src.models import CrawlTask
+
+
+def pdf_parser(url, session):
+    return PDFPageParser(None, CrawlTask(url=url, depth=1, call_stack=[]), {}, http_session=session)
+
+
+class TestHarArchive:
+    """Test recording requests traffic and replaying it offline"""
+
+    def test_record_then_replay_offline(self, tmp_path):
+        """A recorded PDF download should replay byte for byte with the server gone"""
+        archive_dir = str(tmp_path / "site")
+        with FixtureServer(os.path.join(CORPUS_DIR, "pdf_menus")) as server:
+            url = server.url + "menus/mittag.pdf"
+            recorder = HarArchive(archive_dir, "record")
+            live = pdf_parser(url, recorder.session()).analyze()
+            recorder.close()
+
+        replay = HarArchive(archive_dir, "replay")
+        replayed = pdf_parser(url, replay.session()).analyze()
+
+        assert live.text and replayed.text == live.text
+        assert replayed.content_disposition == live.content_disposition
+        with open(os.path.join(archive_dir, "http.har"), encoding="utf-8") as f:
+            assert json.load(f)["log"]["entries"][0]["request"]["url"] == url
+
+    def test_replay_never_goes_online(self, tmp_path):
+        """Unrecorded URLs should fail in replay instead of hitting the network"""
+        replay = HarArchive(str(tmp_path / "empty"), "replay")
+        with pytest.raises(requests.ConnectionError):
+            replay.session().get("http://127.0.0.1:9/menu.pdf", timeout=1)
+        with pytest.raises(FileNotFoundError):
+            replay.attach(object())
+
+    def test_invalid_mode(self, tmp_path):
+        """Only record and replay are valid modes"""
+        with pytest.raises(ValueError):
+            HarArchive(str(tmp_path), "live")
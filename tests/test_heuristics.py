@@ -51,6 +51,23 @@ class TestHeuristicFiltering:
         assert "https://example.com/logo.jpg" not in urls
         assert "https://example.com/photo.png" not in urls
 
+    def test_keeps_menu_images(self):
+        """Image links named or labelled like menus should reach the image parser"""
+        filter_instance = LinkNoiseFilter()
+        links = [
+            LinkInfo(url="https://example.com/img/speisekarte-2025.jpg", text=""),
+            LinkInfo(url="https://example.com/img/IMG_2231.png", text="Unsere Weinkarte"),
+            LinkInfo(url="https://example.com/img/terrasse.jpg", text="Terrasse"),
+            LinkInfo(url="https://example.com/menu.svg", text="Menu"),
+        ]
+
+        with patch.object(filter_instance._noise_classifier, 'classify', return_value=[]) as classify:
+            result = filter_instance.filter(links)
+
+        assert [link.url for link in result] == ["https://example.com/img/speisekarte-2025.jpg",
+                                                 "https://example.com/img/IMG_2231.png"]
+        classify.assert_called_once_with([])
+
 
 # Import patch for the tests
 from unittest.mock import patch
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Unit tests for image menus: preprocessing and OCR in src/image_ocr.py and ImagePageParser
+"""
+import math
+import fitz
+import pytest
+from benchmarks.fixture_server import FixtureServer
+from src import image_ocr
+from src.http_client import pooled_session
+from src.image_ocr import ImageOCRPool, OCRBudget, analyze_image, binarize, text_density
+from src.models import CrawlTask
+from src.parser import ImagePageParser
+
+MENU = "Speisekarte\n" + "\n".join(f"Gericht {i} mit Beilage CHF {10 + i}.50" for i in range(40))
+
+
+def menu_png():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 545, 790), MENU, fontsize=11)
+    data = page.get_pixmap(dpi=150).tobytes("png")
+    doc.close()
+    return data
+
+
+def photo_png(width=800, height=600):
+    samples = bytes(int(127 + 120 * math.sin(x / 90) * math.cos(y / 70)) for y in range(height) for x in range(width))
+    return fitz.Pixmap(fitz.csGRAY, width, height, samples, 0).tobytes("png")
+
+
+class TestPreprocessing:
+    """Test binarization and the text-likeness measure"""
+
+    def test_binarize(self):
+        """Dark pixels become black, light ones white"""
+        assert binarize(bytes([10, 250, 240, 20])) == bytes([0, 255, 255, 0])
+
+    def test_text_denser_than_photo(self):
+        """Rendered text has far more black/white transitions than a smooth photo"""
+        def density(data):
+            pix = fitz.Pixmap(fitz.csGRAY, fitz.Pixmap(data))
+            return text_density(binarize(pix.samples))
+        assert density(menu_png()) > 0.01 > density(photo_png())
+
+
+class TestAnalyzeImage:
+    """Test the cheap skips before OCR"""
+
+    def test_small_image(self):
+        """Thumbnails are skipped by their size"""
+        assert analyze_image(photo_png(120, 90)).skipped == "small"
+
+    def test_photo(self):
+        """Photos with little text-like structure are skipped"""
+        assert analyze_image(photo_png()).skipped == "photo"
+
+    def test_unsupported(self):
+        """Undecodable data is skipped"""
+        assert analyze_image(b"RIFF\x00\x00\x00\x00WEBPVP8 ").skipped == "unsupported"
+
+    def test_text_image_reaches_ocr(self, monkeypatch):
+        """A large text image passes the checks after downscaling and only lacks Tesseract"""
+        monkeypatch.setattr(image_ocr, "_tessdata", "")
+        result = analyze_image(menu_png(), max_side=600)
+        assert result.skipped == "no_ocr"
+        assert (result.width, result.height) == (1240, 1755)
+        assert result.text_density > 0.01
+
+    @pytest.mark.skipif(not image_ocr.tessdata(), reason="Tesseract is not installed")
+    def test_ocr(self):
+        """Menu text is read from the image"""
+        assert "Speisekarte" in analyze_image(menu_png(), languages="eng").text
+
+
+class TestImagePageParser:
+    """Test downloads, skips and the per-site budget"""
+
+    @pytest.fixture
+    def server(self, tmp_path):
+        (tmp_path / "karte.png").write_bytes(menu_png())
+        (tmp_path / "logo.png").write_bytes(menu_png())
+        (tmp_path / "tiny.png").write_bytes(photo_png(40, 30))
+        with FixtureServer(str(tmp_path)) as server:
+            yield server
+
+    @pytest.fixture
+    def ocr(self, monkeypatch):
+        """OCR available, analysis inline; returns the images handed to OCR"""
+        seen = []
+        monkeypatch.setattr(ImageOCRPool, "available", lambda self: True)
+        monkeypatch.setattr(ImageOCRPool, "analyze", lambda self, data: seen.append(data) or image_ocr.ImageAnalysis(MENU))
+        return seen
+
+    def parser(self, url, budget=None):
+        return ImagePageParser(None, CrawlTask(url=url, depth=1), {"oct_menu": "Menu"}, http_session=pooled_session(),
+                               budget=budget)
+
+    def test_logo_not_downloaded(self, server, ocr):
+        """Logos are skipped by name without a request"""
+        assert self.parser(server.url + "logo.png").analyze().skipped == "name"
+        assert server.requests.get("/logo.png", 0) == 0
+
+    def test_small_download(self, server, ocr):
+        """Images under IMAGE_MIN_BYTES never reach OCR"""
+        assert self.parser(server.url + "tiny.png").analyze().skipped == "small"
+        assert ocr == []
+
+    def test_size_limit(self, server, ocr, monkeypatch):
+        """Images over IMAGE_MAX_BYTES are not read to the end"""
+        monkeypatch.setenv("IMAGE_MAX_BYTES", "20000")
+        assert self.parser(server.url + "karte.png").analyze().skipped == "large"
+
+    def test_budget(self, server, ocr):
+        """At most the site budget of images is analyzed"""
+        budget = OCRBudget(limit=1)
+        first = self.parser(server.url + "karte.png", budget)
+        second = self.parser(server.url + "karte.png", budget)
+        assert first.analyze().text == MENU
+        skipped = second.analyze()
+        assert skipped.skipped == "budget"
+        assert second.classify(skipped) is None
+        assert budget.stats() == {"analyzed": 1, "skipped": {"budget": 1}}
+
+    def test_without_ocr(self, server):
+        """Without Tesseract images are skipped before downloading"""
+        if image_ocr.tessdata():
+            pytest.skip("Tesseract is installed")
+        assert self.parser(server.url + "karte.png").analyze().skipped == "no_ocr"
+        assert server.requests.get("/karte.png", 0) == 0
@@ -0,0 +1,47 @@
+"""
+Unit tests for the trigram language identifier in src/language_id.py
+"""
+import pytest
+from src.language_id import LanguageIdentifier, detect_languages, language_scores, trigrams
+
+
+class TestTrigrams:
+    """Test trigram extraction"""
+
+    def test_words_padded(self):
+        """Words are lowercased and padded, digits and punctuation split words"""
+        assert trigrams("Rösti, 24.50") == [" rö", "rös", "öst", "sti", "ti "]
+
+
+class TestDetection:
+    """Test single-language and multilingual detection"""
+
+    @pytest.mark.parametrize("lang, text", [
+        ("de", "Kalbsbratwurst mit Zwiebelsauce und Rösti 24.50"),
+        ("en", "Grilled salmon with lemon butter and new potatoes"),
+        ("fr", "Notre chef vous recommande aujourd'hui les chanterelles fraîches à la crème"),
+        ("it", "Cotoletta di maiale impanata con patatine fritte"),
+    ])
+    def test_single_language(self, lang, text):
+        """Unseen menu lines are attributed to their language"""
+        assert detect_languages(text) == [lang]
+
+    def test_bilingual_menu_ranked(self):
+        """Each language of a bilingual menu gets its share of the text"""
+        text = ("Vorspeisen\nGemischter Salat mit Hausdressing und gerösteten Kernen 9.50\n"
+                "Starters\nMixed salad with house dressing and roasted seeds 9.50\n"
+                "Hauptgang\nRindsfilet mit Kräuterbutter und Gemüse der Saison 48.00\n")
+        scores = language_scores(text)
+        assert abs(sum(scores.values()) - 1) < 0.001
+        assert detect_languages(text) == ["de", "en"]
+        assert scores["de"] > scores["en"] > 0.2
+
+    def test_no_letters(self):
+        """Text without letters has no languages"""
+        assert language_scores("12.50 / 18.00") == {}
+        assert detect_languages("") == []
+
+    def test_deterministic(self):
+        """Separately built identifiers give identical scores"""
+        text = "Menu du jour avec soupe ou salade"
+        assert LanguageIdentifier().scores(text) == LanguageIdentifier().scores(text)
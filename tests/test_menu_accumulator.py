@@ -0,0 +1,66 @@
+"""
+Unit tests for the indexed menu-item accumulator in src/menu_accumulator.py
+"""
+import pytest
+from src.menu_accumulator import MenuAccumulator
+from src.models import MenuItem
+from src.utils import content_fingerprint
+
+
+def make_item(link, type_code="oct_menu", confidence=0.8, languages=None):
+    return MenuItem(
+        link=link,
+        type_code=type_code,
+        type_label=type_code,
+        format="integrated",
+        languages=languages or [],
+        confidence=confidence,
+    )
+
+
+class TestMenuAccumulator:
+    """Test merging by canonical URL and content fingerprint"""
+
+    def test_language_variants_merge(self, sample_menutypes):
+        """The same menu under /de/ and /en/ should be kept once with united languages"""
+        acc = MenuAccumulator(sample_menutypes)
+        acc.add(make_item("https://example.com/de/menu", languages=["de"]))
+        acc.add(make_item("https://example.com/en/menu", languages=["en"]))
+
+        assert len(acc) == 1
+        assert acc.items()[0].languages == ["de", "en"]
+
+    def test_highest_confidence_verdict_wins(self, sample_menutypes):
+        """A better verdict should replace the stored one but keep the first link"""
+        acc = MenuAccumulator(sample_menutypes)
+        acc.add(make_item("https://example.com/menu", type_code="oct_menu", confidence=0.7))
+        acc.add(make_item("https://example.com/menu", type_code="wine_menu", confidence=0.9))
+        acc.add(make_item("https://example.com/menu", type_code="lunch_menu", confidence=0.75))
+
+        item = acc.items()[0]
+        assert item.type_code == "wine_menu"
+        assert item.confidence == 0.9
+        assert item.link == "https://example.com/menu"
+
+    def test_same_content_under_different_urls_merges(self, sample_menutypes):
+        """Items classified from identical content should merge via the fingerprint"""
+        text = "Tagesmenu Suppe 9.50 Salat 12.00 Schnitzel mit Pommes 28.00 Dessert 8.00 " * 3
+        fingerprint = content_fingerprint(text)
+        acc = MenuAccumulator(sample_menutypes)
+        acc.add(make_item("https://example.com/menu"), fingerprint)
+        acc.add(make_item("https://example.com/karte?id=7"), content_fingerprint(text.upper()))
+
+        assert len(acc) == 1
+        assert acc.fingerprint_for("https://example.com/karte?id=7") == fingerprint
+
+    def test_short_text_has_no_fingerprint(self):
+        """Near-empty pages should not be identified by content"""
+        assert content_fingerprint("Menu") is None
+
+    def test_confirmed_specific(self, sample_menutypes):
+        """Only specific, confident menus below the landing pages confirm a subtree"""
+        acc = MenuAccumulator(sample_menutypes)
+        assert acc.is_confirmed_specific(make_item("u", "wine_menu", 0.9), depth=2) is True
+        assert acc.is_confirmed_specific(make_item("u", "wine_menu", 0.9), depth=1) is False
+        assert acc.is_confirmed_specific(make_item("u", "oct_menu", 0.9), depth=2) is False
+        assert acc.is_confirmed_specific(make_item("u", "wine_menu", 0.5), depth=2) is False
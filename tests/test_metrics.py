@@ -0,0 +1,68 @@
+"""
+Unit tests for the span/timer API in src/metrics.py
+"""
+import json
+from src.metrics import Timings, collect, span, write_reports
+
+
+class TestTimings:
+    """Test aggregation and export of stage timings"""
+
+    def test_summary_percentiles(self):
+        """Summary should report count, total, nearest-rank p50/p95 and max"""
+        timings = Timings()
+        for i in range(1, 101):
+            timings.add("navigation", i / 100)
+        s = timings.summary()["navigation"]
+        assert s["count"] == 100
+        assert s["total"] == 50.5
+        assert (s["p50"], s["p95"], s["max"]) == (0.5, 0.95, 1.0)
+
+    def test_merge(self):
+        """Merging site timings should pool their samples"""
+        run, a, b = Timings(), Timings(), Timings()
+        a.add("pdf_download", 1.0)
+        b.add("pdf_download", 3.0)
+        run.merge(a)
+        run.merge(b)
+        assert run.summary()["pdf_download"]["count"] == 2
+        assert run.totals() == {"pdf_download": 4.0}
+
+    def test_prometheus_text(self):
+        """Prometheus export should contain quantiles, sum, count and max per stage"""
+        timings = Timings()
+        timings.add("menu_classifier", 2.0)
+        text = timings.to_prometheus()
+        assert '# TYPE crawler_stage_seconds summary' in text
+        assert 'crawler_stage_seconds{stage="menu_classifier",quantile="0.95"} 2.0' in text
+        assert 'crawler_stage_seconds_count{stage="menu_classifier"} 1' in text
+        assert 'crawler_stage_seconds_max{stage="menu_classifier"} 2.0' in text
+
+    def test_write_reports(self, tmp_path):
+        """JSON summary and the .prom file should be written side by side"""
+        run = Timings()
+        run.add("navigation", 0.25)
+        write_reports(str(tmp_path / "metrics.json"), run, {"a": run.summary()}, {"duration": 1.0})
+        payload = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+        assert payload["run"]["navigation"]["count"] == 1
+        assert payload["sites"]["a"]["navigation"]["max"] == 0.25
+        assert "crawler_stage_seconds_sum" in (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+
+
+class TestSpan:
+    """Test span recording"""
+
+    def test_noop_outside_collect(self):
+        """Spans outside collect() should record nothing and be shared no-ops"""
+        assert span("a") is span("b")
+
+    def test_records_into_active_timings(self):
+        """Spans inside collect() should record into its Timings, nested spans included"""
+        timings = Timings()
+        with collect(timings):
+            with span("page_parse"):
+                with span("pdf_download"):
+                    pass
+        with span("page_parse"):
+            pass
+        assert {k: v["count"] for k, v in timings.summary().items()} == {"page_parse": 1, "pdf_download": 1}
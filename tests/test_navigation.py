@@ -0,0 +1,200 @@
+"""
+Unit tests for adaptive navigation timeouts, the circuit breaker, the readiness probe and tab prefetching in src/navigation.py
+"""
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from src.navigation import HostTimeouts, NavigationSkipped, TabPrefetcher, navigate, new_wait_stats
+
+
+class FakePage:
+    """goto() fails with a timeout for the wait_until values in `timeout_on`"""
+    def __init__(self, timeout_on=(), ready=True):
+        self.timeout_on = timeout_on
+        self.ready = ready
+        self.gotos = []
+
+    def goto(self, url, wait_until=None, timeout=None):
+        self.gotos.append((wait_until, timeout))
+        if wait_until in self.timeout_on:
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded")
+
+    def wait_for_function(self, expression, arg=None, polling=None, timeout=None):
+        if not self.ready:
+            raise PlaywrightTimeoutError("not ready")
+
+
+class FakeTab(FakePage):
+    """A tab that follows the prefetch script at once; `broken` tabs never finish loading"""
+    def __init__(self, broken=False):
+        super().__init__()
+        self.url = "about:blank"
+        self.broken = broken
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def evaluate(self, script, url):
+        self.url = url
+
+    def wait_for_url(self, predicate, wait_until=None, timeout=None):
+        if self.broken or not predicate(self.url):
+            raise PlaywrightTimeoutError("Timeout")
+
+
+class FakeContext:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.tabs = []
+
+    def new_page(self):
+        self.tabs.append(FakeTab(self.broken))
+        return self.tabs[-1]
+
+
+@pytest.fixture
+def timeouts(monkeypatch):
+    monkeypatch.setenv("NAV_TIMEOUT_MS", "15000")
+    monkeypatch.setenv("NAV_TIMEOUT_MIN_MS", "2000")
+    monkeypatch.setenv("NAV_TIMEOUT_MAX_MS", "20000")
+    monkeypatch.setenv("NAV_TIMEOUT_MULTIPLIER", "3")
+    monkeypatch.setenv("NAV_TIMEOUT_MIN_SAMPLES", "3")
+    monkeypatch.setenv("NAV_BREAKER_FAILURES", "2")
+    return HostTimeouts()
+
+
+class TestHostTimeouts:
+    """Test timeouts derived from observed latency"""
+
+    def test_default_until_enough_samples(self, timeouts):
+        """A host with few samples gets the default timeout"""
+        timeouts.record_success("a.ch", 1.0)
+        assert timeouts.timeout_ms("a.ch") == 15000
+
+    def test_timeout_from_p95(self, timeouts):
+        """The timeout is p95 times the multiplier"""
+        for seconds in (1.0, 1.0, 2.0):
+            timeouts.record_success("a.ch", seconds)
+        assert timeouts.timeout_ms("a.ch") == 6000
+
+    def test_timeout_clamped(self, timeouts):
+        """Fast hosts keep the minimum, slow hosts the maximum"""
+        for _ in range(3):
+            timeouts.record_success("fast.ch", 0.1)
+            timeouts.record_success("slow.ch", 30.0)
+        assert timeouts.timeout_ms("fast.ch") == 2000
+        assert timeouts.timeout_ms("slow.ch") == 20000
+
+    def test_breaker_opens_and_resets(self, timeouts):
+        """Consecutive timeouts open the breaker, a success closes it"""
+        timeouts.record_timeout("a.ch")
+        assert timeouts.allow("a.ch")
+        timeouts.record_timeout("a.ch")
+        assert not timeouts.allow("a.ch")
+        assert timeouts.allow("b.ch")
+        timeouts.breaker_cooldown = 0
+        timeouts.record_timeout("a.ch")
+        assert timeouts.allow("a.ch")
+        timeouts.record_success("a.ch", 0.5)
+        assert timeouts.snapshot()["a.ch"]["failures"] == 0
+
+    def test_host_key(self):
+        """Hosts are keyed by lower-case hostname"""
+        assert HostTimeouts.host("https://WWW.Example.ch:8443/menu") == "www.example.ch"
+
+
+class TestNavigate:
+    """Test navigation with retries, skips and readiness"""
+
+    def test_fast_path(self, timeouts):
+        """A page that loads is navigated once and its latency recorded"""
+        waits = new_wait_stats()
+        page = FakePage()
+        assert navigate(page, "https://a.ch/", timeouts, waits) == 1
+        assert page.gotos == [("domcontentloaded", 15000)]
+        assert timeouts.snapshot()["a.ch"]["samples"] == 1
+        assert waits == new_wait_stats()
+
+    def test_retry_with_commit(self, timeouts):
+        """A timed out load is retried once waiting only for the response"""
+        waits = new_wait_stats()
+        page = FakePage(timeout_on=("domcontentloaded",))
+        assert navigate(page, "https://a.ch/", timeouts, waits) == 2
+        assert page.gotos[1] == ("commit", 20000)
+        assert waits["timeouts"] == 1 and waits["retries"] == 1
+
+    def test_dead_host_skipped(self, timeouts):
+        """Once the breaker opens, further navigations to the host are skipped"""
+        waits = new_wait_stats()
+        page = FakePage(timeout_on=("domcontentloaded", "commit"))
+        for url in ("https://dead.ch/", "https://dead.ch/a"):
+            with pytest.raises(PlaywrightTimeoutError):
+                navigate(page, url, timeouts, waits)
+        with pytest.raises(NavigationSkipped):
+            navigate(page, "https://dead.ch/menu", timeouts, waits)
+        assert len(page.gotos) == 4
+
+    def test_slow_host_not_skipped(self, timeouts):
+        """Loads that only succeed on the retry keep the breaker closed"""
+        waits = new_wait_stats()
+        page = FakePage(timeout_on=("domcontentloaded",))
+        for i in range(5):
+            assert navigate(page, f"https://slow.ch/{i}", timeouts, waits) == 2
+        assert waits["retries"] == 5 and waits["skipped"] == 0
+        assert timeouts.snapshot()["slow.ch"]["failures"] == 0
+
+    def test_unsettled_page_still_read(self, timeouts):
+        """A page that never settles is counted but not treated as an error"""
+        waits = new_wait_stats()
+        assert navigate(FakePage(ready=False), "https://a.ch/", timeouts, waits) == 1
+        assert waits["ready_timeouts"] == 1
+
+
+class TestTabPrefetcher:
+    """Test speculative loads of the next frontier pages into spare tabs"""
+
+    def test_prefetched_tab_taken(self, timeouts):
+        """At most `tabs` URLs are prefetched, and a prefetched URL is handed over loaded"""
+        ctx = FakeContext()
+        prefetcher = TabPrefetcher(tabs=2)
+        prefetcher.prefetch(ctx, ["https://a.ch/1", "https://a.ch/2", "https://a.ch/3"], timeouts)
+        assert [tab.url for tab in ctx.tabs] == ["https://a.ch/1", "https://a.ch/2"]
+        assert prefetcher.take("https://a.ch/3", timeouts, new_wait_stats()) is None
+        assert prefetcher.take("https://a.ch/1", timeouts, new_wait_stats()) is ctx.tabs[0]
+        assert prefetcher.stats == {"started": 2, "used": 1, "wasted": 0}
+        assert timeouts.snapshot()["a.ch"]["samples"] == 0
+
+    def test_stale_prefetch_closes_tab(self, timeouts):
+        """A URL that left the head of the frontier has its tab closed, the next prefetch gets a new one"""
+        ctx = FakeContext()
+        prefetcher = TabPrefetcher(tabs=1)
+        prefetcher.prefetch(ctx, ["https://a.ch/pruned"], timeouts)
+        prefetcher.keep(["https://a.ch/next"])
+        prefetcher.prefetch(ctx, ["https://a.ch/next"], timeouts)
+        assert ctx.tabs[0].closed and ctx.tabs[1].url == "https://a.ch/next"
+        assert prefetcher.stats["wasted"] == 1
+
+    def test_released_tab_reused(self, timeouts):
+        """A tab handed back after reading its page serves the next prefetch"""
+        ctx = FakeContext()
+        prefetcher = TabPrefetcher(tabs=1)
+        prefetcher.prefetch(ctx, ["https://a.ch/1"], timeouts)
+        prefetcher.release(prefetcher.take("https://a.ch/1", timeouts, new_wait_stats()))
+        prefetcher.prefetch(ctx, ["https://a.ch/2"], timeouts)
+        assert len(ctx.tabs) == 1 and ctx.tabs[0].url == "https://a.ch/2"
+
+    def test_failed_load_falls_back(self, timeouts):
+        """A prefetch that doesn't load is given up and the caller navigates itself"""
+        prefetcher = TabPrefetcher(tabs=1)
+        prefetcher.prefetch(FakeContext(broken=True), ["https://a.ch/1"], timeouts)
+        assert prefetcher.take("https://a.ch/1", timeouts, new_wait_stats()) is None
+        assert prefetcher.stats == {"started": 1, "used": 0, "wasted": 1}
+        assert prefetcher._spare == []
+
+    def test_open_breaker_not_prefetched(self, timeouts):
+        """Hosts skipped by the circuit breaker are not prefetched"""
+        timeouts.record_timeout("dead.ch")
+        timeouts.record_timeout("dead.ch")
+        ctx = FakeContext()
+        TabPrefetcher(tabs=2).prefetch(ctx, ["https://dead.ch/"], timeouts)
+        assert ctx.tabs == []
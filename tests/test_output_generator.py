@@ -0,0 +1,49 @@
+"""
+Unit tests for result output in src/output_generator.py
+"""
+import json
+import pytest
+from src.output_generator import JsonlResultSink
+from src.models import RestaurantResult
+
+
+class TestJsonlResultSink:
+    """Test streaming, resume and finalize of the JSONL result sink"""
+
+    def test_finalize_produces_restaurants_document(self, tmp_path, sample_menu_item):
+        """finalize should write the classic {"restaurants": [...]} layout"""
+        sink_path = tmp_path / "out.jsonl"
+        out_path = tmp_path / "output.json"
+        with JsonlResultSink(str(sink_path), fsync_every=1) as sink:
+            sink.append(RestaurantResult(name="a", url="https://a.ch", menus=[sample_menu_item]))
+            sink.append(RestaurantResult(name="b", url="https://b.ch", status="no_menus_found"))
+        JsonlResultSink(str(sink_path)).finalize(str(out_path))
+
+        payload = json.loads(out_path.read_text(encoding="utf-8"))
+        assert [r["name"] for r in payload["restaurants"]] == ["a", "b"]
+        assert payload["restaurants"][0]["menus"][0]["link"] == sample_menu_item.link
+
+    def test_resume_ignores_torn_line(self, tmp_path):
+        """A half-written last line from a crash should be ignored and repaired on append"""
+        sink_path = tmp_path / "out.jsonl"
+        with JsonlResultSink(str(sink_path)) as sink:
+            sink.append(RestaurantResult(name="a", url="https://a.ch"))
+        with open(sink_path, "a", encoding="utf-8") as f:
+            f.write('{"name": "b", "url": "ht')
+
+        sink = JsonlResultSink(str(sink_path))
+        assert sink.completed_names() == {"a"}
+        sink.append(RestaurantResult(name="b", url="https://b.ch"))
+        sink.close()
+        assert sink.completed_names() == {"a", "b"}
+
+    def test_later_lines_win_and_reset(self, tmp_path):
+        """Re-crawled restaurants should keep their latest result, reset should start over"""
+        sink = JsonlResultSink(str(tmp_path / "out.jsonl"))
+        sink.append(RestaurantResult(name="a", url="https://a.ch", status="no_menus_found"))
+        sink.append(RestaurantResult(name="a", url="https://a.ch", status="ok"))
+        sink.close()
+
+        assert [r.status for r in sink.read()] == ["ok"]
+        sink.reset()
+        assert sink.completed_names() == set()
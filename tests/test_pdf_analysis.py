@@ -0,0 +1,56 @@
+"""
+Unit tests for PDF page sampling and the analysis worker pool in src/pdf_analysis.py
+"""
+import pytest
+from benchmarks.fixture_server import render_pdf
+from src.pdf_analysis import PDFAnalysisPool, analyze_pdf
+
+MENU_PAGE = "Mittagsmenü\n" + "\n".join(f"Tagesgericht {i} mit Salat CHF {18 + i}.50" for i in range(12))
+
+
+class TestAnalyzePdf:
+    """Test page sampling under a character budget"""
+
+    def test_cover_page_skipped(self):
+        """A short cover page doesn't crowd out the menu page"""
+        data = render_pdf("Restaurant Sonne\f" + MENU_PAGE)
+        result = analyze_pdf(data, 'inline; filename="menu.pdf"', max_chars=len(MENU_PAGE))
+        assert result.page_count == 2
+        assert result.pages == [1]
+        assert result.text.startswith("Mittagsmenü")
+        assert result.content_disposition == 'inline; filename="menu.pdf"'
+
+    def test_pages_in_document_order(self):
+        """Sampled pages are joined in document order within the budget"""
+        data = render_pdf("Vorspeisen " * 20 + "\fKurz\f" + "Hauptgang " * 30)
+        result = analyze_pdf(data, max_chars=10_000)
+        assert result.pages == [0, 1, 2]
+        assert result.text.index("Vorspeisen") < result.text.index("Hauptgang")
+
+    def test_early_exit_on_menu_signal(self):
+        """Reading stops once the budget is full of menu-looking text"""
+        data = render_pdf("\f".join([MENU_PAGE] * 6))
+        result = analyze_pdf(data, max_chars=300, max_pages=6, min_signal=5)
+        assert result.pages == [0]
+        assert len(result.text) <= 300
+
+    def test_not_a_pdf(self):
+        """Garbage gives an empty analysis instead of an error"""
+        result = analyze_pdf(b"<html>not found</html>", "attachment")
+        assert (result.text, result.page_count, result.content_disposition) == ("", 0, "attachment")
+
+
+class TestAnalysisPool:
+    """Test analysis in worker processes"""
+
+    @pytest.mark.parametrize("workers", [0, 1])
+    def test_pool_matches_inline(self, workers):
+        """The process pool returns the same analysis as the inline path"""
+        pool = PDFAnalysisPool(workers=workers)
+        try:
+            result = pool.analyze(render_pdf("Deckblatt\f" + MENU_PAGE), "inline")
+        finally:
+            pool.shutdown()
+        assert result.page_count == 2
+        assert "Tagesgericht 0" in result.text
+        assert result.content_disposition == "inline"
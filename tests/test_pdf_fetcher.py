@@ -0,0 +1,143 @@
+"""
+Unit tests for ranged first-page PDF fetching in src/pdf_fetcher.py
+"""
+import functools
+import threading
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+import fitz
+import pytest
+from benchmarks.fixture_server import FixtureServer, render_pdf
+from src.http_client import pooled_session
+from src.pdf_fetcher import PDFFetcher, parse_linearization
+
+PAGES = "\f".join(f"Seite {i}\n" + "\n".join(f"Gericht {i}-{j} mit Beilage {j * 7 % 13} CHF {10 + j}.50" for j in range(40))
+                  for i in range(30))
+
+
+def first_page(data):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return doc.page_count, doc.load_page(0).get_text()
+
+
+@pytest.fixture
+def pdf_site(tmp_path):
+    (tmp_path / "menu.pdf.txt").write_text(PAGES, encoding="utf-8")
+    return str(tmp_path)
+
+
+class TestLinearization:
+    """Test the linearization dictionary parser"""
+
+    def test_linearized(self):
+        """/L and /E are read from a linearized document"""
+        data = render_pdf(PAGES, linear=True)
+        params = parse_linearization(data)
+        assert params["L"] == len(data)
+        assert 0 < params["E"] < len(data)
+        assert params["N"] == 30
+
+    def test_not_linearized(self):
+        """Ordinary documents have no linearization parameters"""
+        assert parse_linearization(render_pdf(PAGES)) is None
+
+
+class TestRangedFetch:
+    """Test fetching only what the first page needs"""
+
+    def test_linearized_first_page_only(self, pdf_site):
+        """A linearized PDF is read from its first page section and xref tail"""
+        with FixtureServer(pdf_site, linear_pdfs=True) as server:
+            fetcher = PDFFetcher(pooled_session(), max_bytes=50_000, head_bytes=1024)
+            fetched = fetcher.fetch(server.url + "menu.pdf")
+            assert fetched.strategy == "linearized"
+            assert fetched.bytes_transferred < fetched.size
+            assert fetched.content_disposition == 'inline; filename="menu.pdf"'
+            page_count, text = first_page(fetched.data)
+            assert page_count == 30
+            assert "Seite 0" in text
+            assert fetcher.stats()["bytes"] == server.bytes_sent
+
+    def test_xref_in_head_over_budget(self, tmp_path):
+        """A linearized PDF whose xref is in the head is not downloaded beyond MAX_PDF_BYTES"""
+        head = b"%PDF-1.4\n1 0 obj\n<< /Linearized 1 /L 20000 /E 200 /T 100 /N 1 /O 3 >>\nendobj\n"
+        (tmp_path / "big.pdf").write_bytes(head + b" " * (20000 - len(head)))
+        with FixtureServer(str(tmp_path)) as server:
+            fetched = PDFFetcher(pooled_session(), max_bytes=4096, head_bytes=1024).fetch(server.url + "big.pdf")
+        assert fetched.strategy == "linearized"
+        assert fetched.bytes_transferred == len(fetched.data) == 1024
+
+    def test_large_pdf_head_and_tail(self, pdf_site):
+        """A PDF over the byte budget gets its head and xref tail"""
+        with FixtureServer(pdf_site) as server:
+            fetched = PDFFetcher(pooled_session(), max_bytes=6000, head_bytes=1024, tail_bytes=2000,
+                                 sparse_limit=1_000_000).fetch(server.url + "menu.pdf")
+            assert fetched.strategy == "head_tail"
+            assert fetched.bytes_transferred <= 6000 < fetched.size
+            assert "Seite 0" in first_page(fetched.data)[1]
+
+    def test_sparse_limit(self, pdf_site):
+        """A PDF over the sparse limit is read head-only instead of being assembled at full size"""
+        with FixtureServer(pdf_site) as server:
+            fetched = PDFFetcher(pooled_session(), max_bytes=6000, head_bytes=1024, tail_bytes=2000).fetch(server.url + "menu.pdf")
+            assert fetched.size > 4 * 6000
+            assert fetched.strategy == "truncated"
+            assert len(fetched.data) == 6000
+
+    def test_small_pdf_complete(self, pdf_site):
+        """A PDF within the budget is completed with one more range"""
+        with FixtureServer(pdf_site) as server:
+            fetched = PDFFetcher(pooled_session(), max_bytes=1_000_000, head_bytes=1024).fetch(server.url + "menu.pdf")
+            assert fetched.strategy == "complete"
+            assert fetched.requests == 2
+            assert len(fetched.data) == fetched.size
+
+
+class TestWithoutRanges:
+    """Test servers that ignore Range headers"""
+
+    def test_bounded_download(self, tmp_path):
+        """The first response is read as the bounded full download"""
+        data = render_pdf(PAGES)
+        (tmp_path / "menu.pdf").write_bytes(data)
+        handler = functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_path))
+        handler.log_message = lambda *args: None
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/menu.pdf"
+            fetched = PDFFetcher(pooled_session(), max_bytes=1_000_000, head_bytes=1024).fetch(url)
+            assert fetched.strategy == "complete"
+            assert fetched.requests == 1
+            assert fetched.data == data
+            truncated = PDFFetcher(pooled_session(), max_bytes=4096, head_bytes=1024).fetch(url)
+            assert truncated.strategy == "truncated"
+            assert len(truncated.data) == 4096
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_partial_without_content_range(self):
+        """A 206 without a usable Content-Range is not taken for the whole document"""
+        data = render_pdf(PAGES)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = data[:1024] if self.headers.get("Range") else data
+                self.send_response(206 if self.headers.get("Range") else 200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/menu.pdf"
+            fetched = PDFFetcher(pooled_session(), max_bytes=1_000_000, head_bytes=1024).fetch(url)
+            assert fetched.strategy == "complete"
+            assert fetched.requests == 2
+            assert fetched.data == data
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,61 @@
+"""
+Unit tests for per-restaurant profiling in src/profiling.py
+"""
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.profiling import SiteProfiler, hottest_functions, profiled, slowest_sites, summary
+
+
+def slow_helper(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+class TestSiteProfiler:
+    """Test profile files, slowest sites and the hottest functions summary"""
+
+    def test_profiles_written_per_site(self, tmp_path):
+        """Each profiled crawl should write its own .prof file and index entry"""
+        profiler = SiteProfiler(str(tmp_path))
+        assert profiler.run("Fast Site", lambda: slow_helper(0.01)) == 0.01
+        profiler.run("Slow/Site", lambda: slow_helper(0.05))
+
+        assert sorted(os.listdir(tmp_path)) == ["Fast_Site.prof", "Slow_Site.prof", "profiles.jsonl"]
+        assert [e["name"] for e in slowest_sites(str(tmp_path), top=1)] == ["Slow/Site"]
+
+    def test_hottest_functions_across_sites(self, tmp_path):
+        """Function stats should be aggregated over all profiles"""
+        profiler = SiteProfiler(str(tmp_path))
+        profiler.run("a", lambda: slow_helper(0.01))
+        profiler.run("b", lambda: slow_helper(0.01))
+
+        rows = {func: calls for func, calls, _, _ in hottest_functions(str(tmp_path), top=50)}
+        helper = next(func for func in rows if "slow_helper" in func)
+        assert rows[helper] == 2
+        assert "Slowest" in summary(str(tmp_path))
+
+    def test_reset(self, tmp_path):
+        """reset should drop profiles of previous runs"""
+        profiler = SiteProfiler(str(tmp_path))
+        profiler.run("a", lambda: None)
+        profiler.reset()
+        assert slowest_sites(str(tmp_path)) == []
+
+    def test_worker_threads_merged(self, tmp_path):
+        """Calls profiled() in worker threads are part of the crawl's profile"""
+        profiler = SiteProfiler(str(tmp_path))
+
+        def crawl():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, profiled(slow_helper), 0.01) for _ in range(3)]
+                return [f.result() for f in futures]
+        assert profiler.run("a", crawl) == [0.01] * 3
+
+        rows = {func: calls for func, calls, _, _ in hottest_functions(str(tmp_path), top=50)}
+        assert rows[next(func for func in rows if "slow_helper" in func)] == 3
+
+    def test_profiled_without_profile(self):
+        """Outside a profiled crawl the call just runs"""
+        assert profiled(slow_helper)(0) == 0
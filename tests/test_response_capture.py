@@ -0,0 +1,143 @@
+"""
+Unit tests for the browser response capture in src/response_capture.py and its use by the parsers
+"""
+import json
+import pytest
+from benchmarks.fixture_server import FixtureServer, render_pdf
+from src.agent import MenuClassifier
+from src.http_client import pooled_session
+from src.models import CrawlTask, MenuItem
+from src.parser import JSONPageParser, PDFPageParser
+from src.response_capture import ResponseCapture, capture_image, json_menu_text, response_kind
+
+MENU = "Speisekarte\n" + "\n".join(f"Gericht {i} mit Beilage CHF {10 + i}.50" for i in range(30))
+DISHES = {"data": {"categories": [{"title": "Ramen", "items": [
+    {"name": "Tonkotsu Ramen", "description": "pork broth, chashu", "price": 24.5},
+    {"name": "Shoyu Ramen", "description": "soy chicken broth", "price": 22},
+    {"name": "Miso Ramen", "priceChf": "23.50"},
+]}]}}
+
+
+class FakeResponse:
+    def __init__(self, url, body, content_type, status=200, page_url="https://a.ch/menu"):
+        self.url = url
+        self.status = status
+        self.headers = {"content-type": content_type, "content-length": str(len(body))}
+        self._body = body
+        self.frame = type("Frame", (), {"page": type("Page", (), {"url": page_url})()})()
+
+    def body(self):
+        return self._body
+
+
+class TestJSONMenus:
+    """Test recognising menu data in JSON"""
+
+    def test_dishes_found_nested(self):
+        """Objects with a name and a price become dish lines, wherever they are nested"""
+        assert json_menu_text(DISHES).splitlines() == [
+            "Tonkotsu Ramen - pork broth, chashu - 24.50",
+            "Shoyu Ramen - soy chicken broth - 22.00",
+            "Miso Ramen - 23.50",
+        ]
+
+    def test_other_json_ignored(self):
+        """Data without enough priced items is not a menu"""
+        assert json_menu_text({"user": {"name": "x"}, "cart": [{"name": "Gift card", "price": 50}]}) == ""
+        assert json_menu_text([1, 2, "three"]) == ""
+
+    def test_response_kinds(self):
+        """PDF, JSON and JPEG/PNG responses are captured, nothing else"""
+        assert response_kind("application/pdf", "https://a.ch/x") == "pdf"
+        assert response_kind("application/octet-stream", "https://a.ch/karte.pdf") == "pdf"
+        assert response_kind("application/ld+json; charset=utf-8", "https://a.ch/x") == "json"
+        assert response_kind("image/png", "https://a.ch/x.png") == "image"
+        assert response_kind("text/html", "https://a.ch/") is None
+
+
+class TestResponseCapture:
+    """Test which bodies are kept and for how long"""
+
+    def test_bodies_keyed_by_url(self):
+        """Bodies are found by URL (ignoring the fragment) and kind"""
+        capture = ResponseCapture(max_bytes=1000, max_total_mb=1)
+        capture._on_response(FakeResponse("https://a.ch/karte.pdf", b"%PDF-1.4", "application/pdf"))
+        assert capture.get("https://a.ch/karte.pdf#page=2").body == b"%PDF-1.4"
+        assert capture.get("https://a.ch/karte.pdf", "image") is None
+        assert capture.get("https://a.ch/other.pdf") is None
+
+    def test_size_caps(self):
+        """Bodies over the per-body cap are skipped, the least recently used go over the total cap"""
+        capture = ResponseCapture(max_bytes=600 * 1024, max_total_mb=1)
+        capture._on_response(FakeResponse("https://a.ch/karte.png", b"x" * (700 * 1024), "image/png"))
+        for name in ("a", "b", "c"):
+            capture.add(f"https://a.ch/{name}.png", "image", b"x" * (400 * 1024))
+            if name == "b":
+                capture.get("https://a.ch/a.png")
+        assert capture.get("https://a.ch/b.png") is None
+        assert capture.get("https://a.ch/a.png") and capture.get("https://a.ch/c.png")
+        assert capture.stats()["too_large"] == 1 and capture.stats()["evicted"] == 1
+
+    def test_only_menu_images_read(self):
+        """Image bodies are only read for menu-like URLs that aren't logos or icons"""
+        read = []
+
+        class CountingResponse(FakeResponse):
+            def body(self):
+                read.append(self.url)
+                return super().body()
+        capture = ResponseCapture()
+        for url in ("https://a.ch/img/hero.jpg", "https://a.ch/menu/logo.png", "https://a.ch/img/speisekarte.jpg"):
+            capture._on_response(CountingResponse(url, b"x", "image/jpeg"))
+        assert read == ["https://a.ch/img/speisekarte.jpg"]
+        assert capture.get("https://a.ch/img/speisekarte.jpg", "image")
+        assert capture.stats()["images_skipped"] == 2
+        assert capture_image("https://a.ch/Men%C3%BC.png") and not capture_image("https://a.ch/menu-icon.png")
+
+    def test_only_menu_json_kept(self):
+        """JSON menu data is kept and handed out once as a candidate, other JSON is dropped"""
+        capture = ResponseCapture()
+        capture._on_response(FakeResponse("https://a.ch/api/menu", json.dumps(DISHES).encode(), "application/json"))
+        capture._on_response(FakeResponse("https://a.ch/api/user", b'{"name": "x"}', "application/json"))
+        capture._on_response(FakeResponse("https://a.ch/api/menu2", b'{"name": "x"}', "application/json", status=304))
+        menus = capture.take_menus()
+        assert [m.url for m in menus] == ["https://a.ch/api/menu"]
+        assert menus[0].page_url == "https://a.ch/menu"
+        assert capture.take_menus() == []
+        assert capture.get("https://a.ch/api/user") is None
+
+
+class TestParsersUseCapture:
+    """Test that parsers read captured bodies instead of downloading"""
+
+    def test_pdf_not_downloaded_again(self, tmp_path, monkeypatch):
+        """A PDF the browser received is analyzed without a request"""
+        monkeypatch.setenv("PDF_ANALYSIS_WORKERS", "0")
+        data = render_pdf(MENU)
+        (tmp_path / "karte.pdf").write_bytes(data)
+        with FixtureServer(str(tmp_path)) as server:
+            capture = ResponseCapture()
+            capture.add(server.url + "karte.pdf", "pdf", data, "inline; filename=karte.pdf")
+            parser = PDFPageParser(None, CrawlTask(url=server.url + "karte.pdf", depth=1), {"oct_menu": "Menu"},
+                                   http_session=pooled_session(), capture=capture)
+            analysis = parser.analyze()
+            assert server.requests.get("/karte.pdf", 0) == 0
+        assert "Gericht 3" in analysis.text
+        assert analysis.content_disposition == "inline; filename=karte.pdf"
+
+    def test_json_menu_linked_to_its_page(self, monkeypatch):
+        """A menu found in JSON data is an integrated menu of the page that loaded it"""
+        seen = []
+
+        def classify(self, **kwargs):
+            seen.append(kwargs)
+            return MenuItem(link=kwargs["page_url"], type_code="oct_menu", type_label="Menu", format="pdf",
+                            languages=["en"], confidence=0.9)
+        monkeypatch.setattr(MenuClassifier, "classify", classify)
+        captured = ResponseCapture().add("https://a.ch/api/menu", "json", json.dumps(DISHES).encode(),
+                                         page_url="https://a.ch/menu")
+        parser = JSONPageParser(None, CrawlTask(url="https://a.ch/api/menu", depth=2), {"oct_menu": "Menu"}, captured)
+        item = parser.parse()
+        assert seen[0]["page_text"].startswith("Tonkotsu Ramen")
+        assert (item.link, item.format) == ("https://a.ch/menu", "integrated")
+        assert parser.content_fingerprint
@@ -0,0 +1,72 @@
+"""
+Unit tests for the SQLite results store in src/results_store.py
+"""
+import json
+import time
+import pytest
+from src.results_store import ResultsStore
+from src.models import MenuItem, PageRecord, RestaurantResult
+
+
+def make_result(name, links, status="ok"):
+    menus = [
+        MenuItem(link=link, type_code="oct_lunch", type_label="Lunch", format="pdf", languages=["de"], confidence=0.9)
+        for link in links
+    ]
+    return RestaurantResult(name=name, url=f"https://www.{name}.ch/", status=status, menus=menus)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    yield store
+    store.close()
+
+
+class TestResultsStore:
+    """Test upserts, queries and export"""
+
+    def test_upsert_replaces_site_within_run(self, store):
+        """Upserting a site twice in one run should keep only the latest menus"""
+        run = store.start_run("input/restaurants.json")
+        store.upsert_site(run, make_result("a", ["https://a.ch/1.pdf", "https://a.ch/2.pdf"]))
+        store.upsert_site(run, make_result("a", ["https://a.ch/3.pdf"]), pages=[PageRecord(url="https://a.ch/", content_hash="h")])
+
+        rows = store.menus(domain="a.ch")
+        assert [row["link"] for row in rows] == ["https://a.ch/3.pdf"]
+
+    def test_unfinished_run_resumed(self, store):
+        """The latest unfinished run of the same input is found for --resume"""
+        done = store.start_run("input/restaurants.json")
+        store.finish_run(done)
+        assert store.unfinished_run_id("input/restaurants.json") is None
+        crashed = store.start_run("input/restaurants.json")
+        store.start_run("input/other.json")
+        assert store.unfinished_run_id("input/restaurants.json") == crashed
+
+    def test_export_reproduces_output_layout(self, store, tmp_path):
+        """export should write the same document layout as output.json"""
+        run = store.start_run()
+        store.upsert_site(run, make_result("a", ["https://a.ch/1.pdf"]))
+        store.upsert_site(run, make_result("b", [], status="no_menus_found"))
+        out = tmp_path / "export.json"
+        store.export(str(out))
+
+        payload = json.loads(out.read_text(encoding="utf-8"))
+        assert payload["restaurants"][0] == make_result("a", ["https://a.ch/1.pdf"]).model_dump()
+        assert payload["restaurants"][1]["status"] == "no_menus_found"
+
+    def test_changed_since(self, store):
+        """Only restaurants whose menus differ from the baseline run should be reported"""
+        first = store.start_run()
+        store.upsert_site(first, make_result("a", ["https://a.ch/1.pdf"]), menu_hashes={"https://a.ch/1.pdf": "h1"})
+        store.upsert_site(first, make_result("b", ["https://b.ch/1.pdf"]))
+        since = time.time() + 0.01
+        time.sleep(0.02)
+        second = store.start_run()
+        store.upsert_site(second, make_result("a", ["https://a.ch/1.pdf"]), menu_hashes={"https://a.ch/1.pdf": "h2"})
+        store.upsert_site(second, make_result("b", ["https://b.ch/1.pdf"]))
+        store.upsert_site(second, make_result("c", ["https://c.ch/1.pdf"]))
+
+        assert store.changed_since(since) == [("a", second, first), ("c", second, None)]
+        assert [row["link"] for row in store.menus(content_hash="h2")] == ["https://a.ch/1.pdf"]
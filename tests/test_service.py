@@ -0,0 +1,104 @@
+"""
+Unit tests for the crawl service and its HTTP API in src/service.py
+"""
+import json
+import threading
+import pytest
+import requests
+from src.models import MenuItem, RestaurantResult
+from src.profiling import SiteProfiler, load_index
+from src.service import CrawlService, ServiceHTTPServer, parse_submission
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connected = False
+
+
+class FakeCrawlService(CrawlService):
+    """Runs the real job queue with a fake browser and crawl"""
+    launches = 0
+
+    def _worker(self):
+        def launch():
+            FakeCrawlService.launches += 1
+            return FakeBrowser()
+        self._serve_jobs(launch)
+
+    def _crawl(self, job, browser):
+        if "broken" in job["url"]:
+            raise RuntimeError("navigation failed")
+        menu = MenuItem(link=job["url"] + "menu.pdf", type_code="oct_menu", type_label="Menu", format="pdf")
+        return RestaurantResult(name=job["name"], url=job["url"], menus=[menu])
+
+
+@pytest.fixture
+def server():
+    FakeCrawlService.launches = 0
+    service = FakeCrawlService({"oct_menu": "Menu"}, workers=1)
+    service.start()
+    http = ServiceHTTPServer(service, port=0)
+    thread = threading.Thread(target=http.serve_forever, daemon=True)
+    thread.start()
+    yield http
+    http.shutdown()
+    http.server_close()
+    service.stop(timeout=5)
+
+
+class TestCrawlService:
+    """Test job submission, polling, failures and stats"""
+
+    def test_submit_and_poll(self, server):
+        """Submitted restaurants should come back as RestaurantResults, reusing one warm browser"""
+        resp = requests.post(server.url + "/jobs", json={"restaurants": {"a": "https://a.ch/", "b": "https://b.ch/"}}, timeout=5)
+        assert resp.status_code == 202
+        ids = [job["id"] for job in resp.json()["jobs"]]
+
+        results, since = [], 0
+        while len(results) < 2:
+            page = requests.get(server.url + f"/results?since={since}&wait=5", timeout=10).json()
+            results += page["results"]
+            since = page["next"]
+
+        assert [job["id"] for job in results] == ids
+        assert results[0]["result"]["menus"][0]["link"] == "https://a.ch/menu.pdf"
+        assert requests.get(server.url + f"/jobs/{ids[1]}", timeout=5).json()["status"] == "done"
+        assert FakeCrawlService.launches == 1
+
+    def test_failed_crawl_reported(self, server):
+        """A crawl raising should produce a failed job with an error result, not kill the worker"""
+        job = requests.post(server.url + "/jobs", json={"name": "x", "url": "https://broken.ch/"}, timeout=5).json()["jobs"][0]
+        page = requests.get(server.url + "/results?wait=5", timeout=10).json()
+        assert page["results"][0]["status"] == "failed"
+        assert page["results"][0]["result"]["status"] == "error"
+
+        stats = requests.get(server.url + "/stats", timeout=5).json()
+        assert stats["queue_depth"] == 0
+        assert stats["jobs"] == {"failed": 1}
+
+    def test_bad_requests(self, server):
+        """Malformed submissions and unknown jobs should be client errors"""
+        assert requests.post(server.url + "/jobs", json={"restaurants": [{"name": "x"}]}, timeout=5).status_code == 400
+        assert requests.get(server.url + "/jobs/nope", timeout=5).status_code == 404
+
+    def test_crawls_profiled(self, tmp_path):
+        """With a profiler every crawl writes its own profile"""
+        service = FakeCrawlService({"oct_menu": "Menu"}, workers=1, profiler=SiteProfiler(str(tmp_path)))
+        service.start()
+        service.submit("a", "https://a.ch/")
+        service.results(wait=5)
+        service.stop(timeout=5)
+        assert [entry["name"] for entry in load_index(str(tmp_path))] == ["a"]
+
+    def test_parse_submission_layouts(self):
+        """Single restaurant, list and name->url mapping should all be accepted"""
+        assert parse_submission({"name": "a", "url": "u"}) == [("a", "u", None)]
+        assert parse_submission({"restaurants": [{"name": "a", "url": "u", "menutypes": {"x": "X"}}]}) == [("a", "u", {"x": "X"})]
+        assert parse_submission({"restaurants": {"a": "u"}}) == [("a", "u", None)]
@@ -0,0 +1,123 @@
+"""
+Unit tests for HTTP sitemap discovery and streaming parsing in src/sitemap_handler.py
+"""
+import gzip
+import pytest
+from benchmarks.fixture_server import FixtureServer
+from src.http_client import pooled_session
+from src.sitemap_handler import SitemapHandler, is_menu_like
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*paths):
+    return f'<?xml version="1.0"?><urlset {NS}>' + "".join(f"<url><loc>{p}</loc></url>" for p in paths) + "</urlset>"
+
+
+def index(*paths):
+    return f'<?xml version="1.0"?><sitemapindex {NS}>' + "".join(f"<sitemap><loc>{p}</loc></sitemap>" for p in paths) + "</sitemapindex>"
+
+
+@pytest.fixture
+def site(tmp_path):
+    def serve(files):
+        for name, content in files.items():
+            path = tmp_path / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content if isinstance(content, bytes) else content.encode("utf-8"))
+        return FixtureServer(str(tmp_path))
+    return serve
+
+
+class TestStreamingParse:
+    """Test the incremental XML parser"""
+
+    def test_entries_and_index_refs(self):
+        """Page entries carry their metadata, index entries are marked as sitemaps"""
+        handler = SitemapHandler(http_session=object())
+        xml = (f'<urlset {NS}><url><loc>https://a.ch/menu</loc><lastmod>2025-01-01</lastmod>'
+               f'<priority>0.8</priority></url></urlset>')
+        assert handler.parse_sitemap_xml(xml, "https://a.ch/") == [("https://a.ch/menu", "lastmod: 2025-01-01 | priority: 0.8")]
+        assert handler.parse_sitemap_xml(index("https://a.ch/s1.xml"), "https://a.ch/") == [("https://a.ch/s1.xml", "sitemap")]
+
+    def test_image_entries_ignored(self):
+        """<image:loc> entries of a page (Yoast image sitemaps) don't replace the page's <loc>"""
+        handler = SitemapHandler(http_session=object())
+        images = "".join(f"<image:image><image:loc>https://a.ch/wp-content/uploads/{name}.png</image:loc></image:image>"
+                         for name in ("logo", "team"))
+        xml = (f'<urlset {NS} xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+               f'<url><loc>https://a.ch/speisekarte/</loc><lastmod>2025-01-01</lastmod>{images}</url>'
+               f'<url><loc>https://a.ch/kontakt/</loc></url></urlset>')
+        assert handler.parse_sitemap_xml(xml, "https://a.ch/") == [("https://a.ch/speisekarte/", "lastmod: 2025-01-01"),
+                                                                   ("https://a.ch/kontakt/", "")]
+
+    def test_chunks_split_anywhere(self):
+        """Documents fed in tiny chunks parse the same as whole ones"""
+        handler = SitemapHandler(http_session=object())
+        data = urlset(*(f"https://a.ch/p{i}" for i in range(50))).encode("utf-8")
+        chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+        assert [loc for loc, _ in handler.iter_sitemap_xml(chunks)] == [f"https://a.ch/p{i}" for i in range(50)]
+
+    def test_malformed_keeps_parsed_entries(self):
+        """Entries before a syntax error are kept"""
+        handler = SitemapHandler(http_session=object())
+        xml = f'<urlset {NS}><url><loc>https://a.ch/a</loc></url><url><loc>https://a.ch/b</loc></ur'
+        assert handler.parse_sitemap_xml(xml + "x></urlset>", "https://a.ch/") == [("https://a.ch/a", "")]
+
+
+class TestMenuLike:
+    """Test the menu-like URL heuristic"""
+
+    @pytest.mark.parametrize("url", ["https://a.ch/de/speisekarte", "https://a.ch/karten/mittag.html",
+                                     "https://a.ch/fr/carte-des-vins", "https://a.ch/menu.pdf", "https://a.ch/drinks/"])
+    def test_menu_urls(self, url):
+        """Menu words in the path match"""
+        assert is_menu_like(url)
+
+    @pytest.mark.parametrize("url", ["https://a.ch/barrierefrei", "https://a.ch/kontakt", "https://menu.ch/about"])
+    def test_other_urls(self, url):
+        """Words containing menu words and the host name don't match"""
+        assert not is_menu_like(url)
+
+
+class TestDiscovery:
+    """Test sitemap discovery over HTTP against a local server"""
+
+    def test_robots_index_and_gzip(self, site):
+        """robots.txt references and nested gzip sitemaps are followed"""
+        with site({
+            "robots.txt": "User-agent: *\nSitemap: /maps/index.xml\n",
+            "maps/index.xml": index("/maps/pages.xml.gz"),
+            "maps/pages.xml.gz": gzip.compress(urlset("/speisekarte", "/team").encode("utf-8")),
+        }) as server:
+            handler = SitemapHandler(pooled_session())
+            urls = [url for url, _ in handler.discover_sitemap_urls(server.url)]
+            assert urls == [server.url + "speisekarte", server.url + "team"]
+            assert handler.menu_seeds(server.url) == [server.url + "speisekarte"]
+            assert handler.stats["documents"] == 3
+
+    def test_depth_limit(self, site, monkeypatch):
+        """Indexes nested deeper than SITEMAP_MAX_DEPTH are not fetched"""
+        monkeypatch.setenv("SITEMAP_MAX_DEPTH", "1")
+        with site({
+            "sitemap.xml": index("/level1.xml"),
+            "level1.xml": index("/level2.xml"),
+            "level2.xml": urlset("/menu"),
+        }) as server:
+            assert SitemapHandler(pooled_session()).discover_sitemap_urls(server.url) == []
+            assert server.requests.get("/level2.xml", 0) == 0
+
+    def test_url_limit(self, site, monkeypatch):
+        """Discovery stops at SITEMAP_MAX_URLS entries"""
+        monkeypatch.setenv("SITEMAP_MAX_URLS", "10")
+        with site({"sitemap.xml": urlset(*(f"/p{i}" for i in range(100)))}) as server:
+            assert len(SitemapHandler(pooled_session()).discover_sitemap_urls(server.url)) == 10
+
+    def test_html_and_text_sitemaps(self, site):
+        """HTML answers are ignored, text sitemaps are read line by line"""
+        with site({
+            "sitemap.xml": "<html><body>Not a sitemap</body></html>",
+            "sitemap.txt": "/weinkarte\n# comment\n/galerie\n",
+        }) as server:
+            urls = [url for url, _ in SitemapHandler(pooled_session()).discover_sitemap_urls(server.url)]
+            assert urls == [server.url + "weinkarte", server.url + "galerie"]
@@ -0,0 +1,67 @@
+"""
+Unit tests for persisted browser storage state in src/storage_state.py
+"""
+import json
+import os
+import pytest
+from src.storage_state import StorageStateStore
+from src.utils import registrable_domain
+
+
+STATE = {"cookies": [{"name": "consent", "value": "1", "domain": ".example.ch"}], "origins": []}
+
+
+class TestRegistrableDomain:
+    """Test registrable domain extraction"""
+
+    def test_subdomain_collapsed(self):
+        """Subdomains should map to the registrable domain"""
+        assert registrable_domain("https://media.chez-smith.ch/de/") == "chez-smith.ch"
+
+    def test_ip_falls_back_to_host(self):
+        """IP hosts have no public suffix and should use the hostname"""
+        assert registrable_domain("http://127.0.0.1:8080/menu") == "127.0.0.1"
+
+
+class TestStorageStateStore:
+    """Test StorageStateStore persistence, expiry and invalidation"""
+
+    def test_save_and_load_shared_by_domain(self, tmp_path):
+        """State saved for one URL should be loaded for any URL of the same domain"""
+        store = StorageStateStore(str(tmp_path), ttl_hours=1)
+        store.save("https://www.example.ch/de/", STATE, cookie_accept="Alle akzeptieren")
+
+        assert store.load("https://example.ch/menu") == STATE
+        assert store.cookie_accept("https://shop.example.ch/") == "Alle akzeptieren"
+        assert store.load("https://other.ch/") is None
+
+    def test_expired_state_is_dropped(self, tmp_path):
+        """Expired state should not be loaded and should be removed"""
+        store = StorageStateStore(str(tmp_path), ttl_hours=1)
+        store.save("https://example.ch/", STATE)
+        path = os.path.join(str(tmp_path), "example.ch.json")
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        entry["saved_at"] -= 2 * 3600
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+        assert store.load("https://example.ch/") is None
+        assert not os.path.exists(path)
+
+    def test_invalidate_and_clear(self, tmp_path):
+        """invalidate should accept domains or URLs, clear should drop everything"""
+        store = StorageStateStore(str(tmp_path))
+        store.save("https://a.ch/", STATE)
+        store.save("https://b.ch/", STATE)
+        store.save("https://c.ch/", STATE)
+
+        assert store.invalidate("a.ch") is True
+        assert store.invalidate("https://www.b.ch/x") is True
+        assert store.invalidate("a.ch") is False
+        assert store.domains() == ["c.ch"]
+        store.save("https://b.ch/", STATE)
+        assert store.invalidate("WWW.B.CH") is True
+        assert store.domains() == ["c.ch"]
+        assert store.clear() == 1
+        assert store.domains() == []
@@ -8,7 +8,8 @@ from src.utils import (
     canonicalize_language, 
     de_duplicate, 
     deduplicate_by_key,
-    guess_languages_from_text
+    guess_languages_from_text,
+    safe_filename
 )
 
 
@@ -84,6 +85,20 @@ class TestDeDuplicate:
         assert result == ["b", "a", "c"]
 
 
+class TestSafeFilename:
+    """Test file names derived from restaurant and domain names"""
+
+    def test_unicode_letters_kept(self):
+        """Names differing only in non-ASCII letters don't collide"""
+        assert safe_filename("Bären") != safe_filename("Büren")
+        assert safe_filename("Bären") == safe_filename("Ba\u0308ren") == "Bären"
+
+    def test_separators_replaced(self):
+        """Path separators, spaces and reserved characters become underscores"""
+        assert safe_filename("Slow/Site: Zürich*") == "Slow_Site__Zürich_"
+        assert safe_filename("") == "_"
+
+
 class TestGuessLanguagesFromText:
     """Test language detection heuristics"""
     
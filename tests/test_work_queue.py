@@ -0,0 +1,89 @@
+"""
+Unit tests for the shared crawl queue in src/work_queue.py
+"""
+import threading
+import time
+import pytest
+from src.models import RestaurantResult
+from src.work_queue import SQLiteWorkQueue, run_worker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = SQLiteWorkQueue(str(tmp_path / "queue.db"), visibility_timeout=60, max_attempts=2, retry_backoff=0)
+    yield q
+    q.close()
+
+
+def result_for(name, url):
+    return RestaurantResult(name=name, url=url)
+
+
+class TestSQLiteWorkQueue:
+    """Test leasing, visibility timeouts, retries and dead letters"""
+
+    def test_enqueue_is_idempotent(self, queue):
+        """Re-enqueueing known restaurants should not duplicate them"""
+        assert queue.enqueue({"a": "https://a.ch/", "b": "https://b.ch/"}) == 2
+        assert queue.enqueue({"a": "https://a.ch/", "c": "https://c.ch/"}) == 1
+        assert queue.remaining() == 3
+
+    def test_lease_is_exclusive(self, queue):
+        """A leased restaurant should not be handed to a second worker"""
+        queue.enqueue({"a": "https://a.ch/"})
+        first = queue.lease("w1")
+        assert first.name == "a" and first.attempt == 1
+        assert queue.lease("w2") is None
+        assert queue.complete(first, result_for("a", "https://a.ch/"))
+        assert queue.remaining() == 0
+        assert [r.name for r in queue.results()] == ["a"]
+
+    def test_expired_lease_is_taken_over(self, queue):
+        """Without heartbeats the lease expires and the old holder can no longer complete"""
+        queue.visibility_timeout = 0.05
+        queue.enqueue({"a": "https://a.ch/"})
+        stale = queue.lease("w1")
+        time.sleep(0.1)
+        fresh = queue.lease("w2")
+        assert fresh.attempt == 2
+        assert not queue.heartbeat(stale)
+        assert not queue.complete(stale, result_for("a", "https://a.ch/"))
+        assert queue.complete(fresh, result_for("a", "https://a.ch/"))
+
+    def test_retries_then_dead(self, queue):
+        """Failures should be retried up to max_attempts, then parked as dead"""
+        queue.enqueue({"a": "https://a.ch/"})
+        queue.fail(queue.lease("w1"), "boom 1")
+        queue.fail(queue.lease("w1"), "boom 2")
+        assert queue.lease("w1") is None
+        assert queue.stats()["jobs"] == {"dead": 1}
+        assert queue.dead()[0]["last_error"] == "boom 2"
+        assert queue.requeue_dead() == 1
+        assert queue.lease("w1").attempt == 1
+
+
+class TestRunWorker:
+    """Test the worker loop"""
+
+    def test_workers_share_the_queue(self, queue):
+        """Two concurrent workers should crawl every restaurant exactly once"""
+        restaurants = {f"r{i}": f"https://r{i}.ch/" for i in range(12)}
+        queue.enqueue(restaurants)
+        crawled, lock = [], threading.Lock()
+
+        def crawl(name, url):
+            with lock:
+                crawled.append(name)
+            if name == "r3" and crawled.count("r3") == 1:
+                raise RuntimeError("flaky site")
+            return result_for(name, url)
+
+        threads = [threading.Thread(target=run_worker, args=(queue, crawl, f"w{i}"), kwargs={"poll_interval": 0.01})
+                   for i in range(2)]
+        [t.start() for t in threads]
+        [t.join(10) for t in threads]
+
+        assert sorted(r.name for r in queue.results()) == sorted(restaurants)
+        assert crawled.count("r3") == 2
+        assert len(crawled) == 13
+        assert queue.stats()["retries"] == 1
@@ -1,8 +1,13 @@
 """
 Integration tests for main workflow components
 """
+import threading
+from concurrent.futures import Future
 import pytest
 from unittest.mock import Mock, patch
+from src.agent import MenuClassifier
+from src.crawl_graph import GraphTask
+from src.crawler import SiteCrawler
 from src.main import should_escalate, map_type_label
 from src.models import MenuItem, RestaurantResult, CrawlTask, LinkInfo
 
@@ -83,4 +88,170 @@ class TestCrawlTaskWorkflow:
         
         assert task.url == "https://example.com/menu"
         assert task.depth == 2
-        assert task.call_stack == ["https://example.com"]
\ No newline at end of file
+        assert task.call_stack == ["https://example.com"]
+
+class TestClassifierMessages:
+    """Test the request layout of the menu classifier"""
+
+    def test_static_prefix(self):
+        """The system message is byte-identical across pages and the user message holds only page data"""
+        import json
+        from src.agent import MenuClassifier
+        menutypes = {"oct_menu": "Menu", "oct_wine": "Weinkarte"}
+        classifier = MenuClassifier(menutypes)
+        first = classifier.messages("A", "https://a.ch/", "https://a.ch/karte", "Salat 12.50", "Karte", menutypes)
+        second = classifier.messages("B", "https://b.ch/", "https://b.ch/wein.pdf", "Merlot 9.00", "Wein",
+                                     dict(reversed(menutypes.items())), "inline; filename=wein.pdf")
+
+        assert first[0].content == second[0].content
+        assert first[0].content.endswith('MENU_TYPES: {"oct_menu": "Menu", "oct_wine": "Weinkarte"}\n'
+                                         'MENU_FORMATS: ["pdf", "viewer", "integrated", "image", "none"]\n')
+        payload = json.loads(second[1].content)
+        assert "MENU_TYPES" not in payload and "MENU_FORMATS" not in payload
+        assert list(payload)[-1] == "PAGE_CONTENT"
+
+
+class ScriptedLLM:
+    """Answers classifier requests from the stub rules; `drop_above` leaves the last page out of larger batches"""
+
+    def __init__(self, drop_above=None, fail_batches=False):
+        from benchmarks.stub_llm import ScriptedRules
+        self.rules = ScriptedRules()
+        self.drop_above = drop_above
+        self.fail_batches = fail_batches
+        self.requests = []
+
+    def invoke(self, msgs):
+        import json
+        payload = json.loads(msgs[-1].content)
+        self.requests.append(len(payload.get("PAGES", [None])))
+        if "PAGES" in payload and self.fail_batches:
+            raise ConnectionError("batch rejected")
+        answer = json.loads(self.rules.answer("menu", [{"role": "user", "content": msgs[-1].content}]))
+        if "PAGES" in payload and self.drop_above and len(payload["PAGES"]) > self.drop_above:
+            answer["pages"] = answer["pages"][:-1]
+        return Mock(content=json.dumps(answer))
+
+
+class TestBatchClassification:
+    """Test packing several pages into one menu classifier request"""
+
+    MENU = "Mittagsmenu: Salat 12.50, Suppe 8.00, Pasta 19.50, Dessert 7.50"
+
+    def pages(self, n):
+        return [{"page_url": f"https://a.ch/p{i}", "page_title": f"Page {i}",
+                 "page_text": self.MENU if i % 2 == 0 else "Kontakt und Anfahrt"} for i in range(n)]
+
+    def classifier(self, llm):
+        from src.agent import MenuClassifier
+        classifier = MenuClassifier({"oct_menu": "Menu", "oct_lunch": "Lunch"})
+        classifier.llm = llm
+        return classifier
+
+    def test_pack(self):
+        """Batches respect the token and page limits, an oversized page goes alone"""
+        from src.agent import MenuClassifier
+        pages = self.pages(5)
+        pages[2]["page_text"] = "x" * 4000
+        assert MenuClassifier.page_tokens(pages[0]) < 100
+        assert self.classifier(ScriptedLLM()).pack(pages, 200, 8) == [[0, 1], [2], [3, 4]]
+        assert self.classifier(ScriptedLLM()).pack(self.pages(5), 6000, 2) == [[0, 1], [2, 3], [4]]
+
+    def test_one_request_per_batch(self):
+        """Verdicts are mapped back to their pages by page ID"""
+        llm = ScriptedLLM()
+        items = self.classifier(llm).classify_batch("A", "https://a.ch/", self.pages(3), {"oct_lunch": "Lunch"})
+        assert llm.requests == [3]
+        assert [item.link if item else None for item in items] == ["https://a.ch/p0", None, "https://a.ch/p2"]
+        assert items[0].type_code == "oct_lunch" and items[0].type_label == "Lunch"
+
+    def test_missing_verdicts_resplit(self):
+        """Pages left out of an answer are sent again in halves"""
+        llm = ScriptedLLM(drop_above=2)
+        classifier = self.classifier(llm)
+        items = classifier.classify_batch("A", "https://a.ch/", self.pages(4), {"oct_lunch": "Lunch"})
+        assert llm.requests == [4, 1]
+        assert [bool(item) for item in items] == [True, False, True, False]
+        assert classifier.batch_stats == {"requests": 1, "pages": 4, "resplits": 1, "single": 1}
+
+    def test_failed_batches_fall_back_to_single_pages(self):
+        """A failing batch request is split down to single-page requests"""
+        llm = ScriptedLLM(fail_batches=True)
+        items = self.classifier(llm).classify_batch("A", "https://a.ch/", self.pages(4), {"oct_lunch": "Lunch"})
+        assert llm.requests == [4, 2, 1, 1, 2, 1, 1]
+        assert [bool(item) for item in items] == [True, False, True, False]
+
+
+class TestCrawlerPipeline:
+    """Test the bounded stages between the crawl thread and the LLM calls"""
+
+    def test_stages_bounded_and_applied_in_order(self, monkeypatch):
+        """The crawl thread goes on until PIPELINE_DEPTH stages are in flight, results are applied in order"""
+        monkeypatch.setenv("PIPELINE_DEPTH", "2")
+        monkeypatch.setenv("PIPELINE_WORKERS", "2")
+        crawler = SiteCrawler("R", "https://r.ch/", {})
+        release = threading.Event()
+        applied = []
+        crawler._run_stage(lambda: release.wait(5) and "a", applied.append)
+        crawler._run_stage(lambda: "b", applied.append)
+        assert applied == [] and len(crawler._pending_stages) == 2
+        release.set()
+        crawler._run_stage(lambda: "c", applied.append)
+        assert applied == ["a"]
+        crawler._collect_stages(wait=True)
+        assert applied == ["a", "b", "c"]
+        crawler._stage_executor.shutdown()
+
+    def test_inline_without_pipeline(self, monkeypatch):
+        """PIPELINE_DEPTH=0 runs each stage right away on the crawl thread"""
+        monkeypatch.setenv("PIPELINE_DEPTH", "0")
+        crawler = SiteCrawler("R", "https://r.ch/", {})
+        applied = []
+        crawler._run_stage(lambda: threading.current_thread().name, applied.append)
+        assert applied == ["MainThread"] and crawler._stage_executor is None
+
+    def test_documents_classified_in_pipeline(self, monkeypatch):
+        """A downloaded document's verdict is taken in a pipeline thread, its reuse counted on the crawl thread"""
+        monkeypatch.setenv("PIPELINE_DEPTH", "2")
+        crawler = SiteCrawler("R", "https://r.ch/", {})
+        threads = []
+
+        class DocumentParser:
+            content_fingerprint = None
+            reused = None
+
+            def classify(self, analysis, page_title):
+                threads.append(threading.current_thread().name)
+                self.reused = "analysis"
+                return None
+
+        future = Future()
+        future.set_result("analysis")
+        crawler._pending_documents.append((0, GraphTask(crawler._graph, 0), DocumentParser(), "Menu", future))
+        crawler._collect_documents(wait=True)
+        crawler._collect_stages(wait=True)
+        assert threads[0].startswith("pipeline")
+        assert crawler._pdf_reused["analysis"] == 1 and crawler.stats["pages"] == 1
+        crawler._stage_executor.shutdown()
+
+    def test_batch_stats_merged_on_crawl_thread(self, monkeypatch):
+        """Each batch has its own classifier, their counts are summed when the verdicts are applied"""
+        monkeypatch.setenv("PIPELINE_DEPTH", "2")
+        classifiers = []
+
+        def classify_batch(self, site_name, site_url, pages, *args):
+            classifiers.append(self)
+            self.batch_stats["requests"] += 1
+            self.batch_stats["pages"] += len(pages)
+            return [None] * len(pages)
+        monkeypatch.setattr(MenuClassifier, "classify_batch", classify_batch)
+        crawler = SiteCrawler("R", "https://r.ch/", {})
+        task = GraphTask(crawler._graph, 0)
+        parser = type("Parser", (), {"content_fingerprint": None})()
+        for pages in (2, 3):
+            crawler._pending_pages = [(0, task, parser, {"page_text": ""})] * pages
+            crawler._classify_pending()
+        crawler._collect_stages(wait=True)
+        assert len(set(map(id, classifiers))) == 2
+        assert crawler._batch_stats == {"requests": 2, "pages": 5, "resplits": 0, "single": 0}
+        crawler._stage_executor.shutdown()